@@ -0,0 +1,140 @@
+"""
+Teste de carga da API (src/api/main.py) com latências p50/p99 por endpoint.
+
+Sem --url, sobe a API em processo sobre um SQLite temporário populado com
+dados sintéticos (dublê local do MySQL). Com --url, mede uma API já no ar.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_api.py --requisicoes 2000 --concorrencia 16
+    python benchmarks/bench_api.py --url http://127.0.0.1:8000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'api'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'etl'))
+import load  # noqa: E402
+
+UFS = ['SP', 'RJ', 'MG', 'RS', 'PR', 'BA', 'CE', 'PE', 'SC', 'GO']
+TRIMESTRES = ['1T', '2T', '3T', '4T']
+
+
+def popular_sqlite(engine, operadoras: int, anos: int, lancamentos: int = 1, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    registros = [f'{300000 + i}' for i in range(operadoras)]
+    with engine.begin() as conn:
+        conn.execute(text("""CREATE TABLE operadoras (registro_ans VARCHAR(20) PRIMARY KEY, cnpj VARCHAR(20),
+            razao_social VARCHAR(255), nome_fantasia VARCHAR(255), modalidade VARCHAR(100))"""))
+        conn.execute(text("""CREATE TABLE despesas_detalhadas (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            registro_ans VARCHAR(20) NOT NULL, trimestre CHAR(2), ano INT, valor_despesa DECIMAL(15,2))"""))
+        conn.execute(text("CREATE INDEX idx_registro ON despesas_detalhadas (registro_ans)"))
+        conn.execute(text("CREATE INDEX idx_ano_trimestre ON despesas_detalhadas (ano, trimestre)"))
+        conn.execute(text("""CREATE TABLE despesas_trimestrais (registro_ans VARCHAR(20) NOT NULL, ano INT NOT NULL,
+            trimestre CHAR(2) NOT NULL, total DECIMAL(17,2), n_lancamentos INT,
+            PRIMARY KEY (registro_ans, ano, trimestre))"""))
+        conn.execute(text("""CREATE TABLE media_mercado_trimestral (ano INT NOT NULL, trimestre CHAR(2) NOT NULL,
+            media_mercado DECIMAL(17,2), total_mercado DECIMAL(19,2), qtd_operadoras INT,
+            PRIMARY KEY (ano, trimestre))"""))
+        conn.execute(text("""CREATE TABLE despesas_agregadas (razao_social VARCHAR(255), uf CHAR(2),
+            registro_ans VARCHAR(20) PRIMARY KEY, modalidade VARCHAR(100), total_despesas DECIMAL(15,2),
+            media_trimestral DECIMAL(15,2), desvio_padrao DECIMAL(15,2))"""))
+        conn.execute(text("INSERT INTO operadoras VALUES (:r, :c, :n, :f, :m)"), [
+            {'r': r, 'c': f'{i:014d}', 'n': f'OPERADORA SINTETICA {i}', 'f': f'SAUDE {i}', 'm': 'Medicina de Grupo'}
+            for i, r in enumerate(registros)
+        ])
+        conn.execute(text("INSERT INTO despesas_detalhadas (registro_ans, trimestre, ano, valor_despesa) "
+                          "VALUES (:r, :t, :a, :v)"), [
+            {'r': r, 't': t, 'a': 2025 - a, 'v': round(rng.uniform(1e4, 1e8), 2)}
+            for r in registros for a in range(anos) for t in TRIMESTRES for _ in range(lancamentos)
+        ])
+        conn.execute(text("INSERT INTO despesas_agregadas VALUES (:n, :u, :r, 'Medicina de Grupo', :t, :m, 0)"), [
+            {'n': f'OPERADORA SINTETICA {i}', 'u': rng.choice(UFS), 'r': r, 't': 1e6 * (i + 1), 'm': 2.5e5 * (i + 1)}
+            for i, r in enumerate(registros)
+        ])
+        for comando in load.SQL_ROLLUPS:
+            conn.execute(text(comando))
+    return registros
+
+
+def subir_api_local(operadoras: int, anos: int, pasta: str) -> tuple[str, list[str]]:
+    import uvicorn
+    import database_utils
+    from main import app
+
+    engine = database_utils.criar_engine(f'sqlite:///{os.path.join(pasta, "api.db")}')
+    registros = popular_sqlite(engine, operadoras, anos)
+    database_utils.set_engine(engine)
+
+    servidor = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=0, log_level='warning'))
+    threading.Thread(target=servidor.run, daemon=True).start()
+    while not servidor.started:
+        time.sleep(0.05)
+    porta = servidor.servers[0].sockets[0].getsockname()[1]
+    return f'http://127.0.0.1:{porta}', registros
+
+
+def percentil(valores: list[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', help='API já no ar; sem ela, sobe uma API local sobre SQLite.')
+    parser.add_argument('--requisicoes', type=int, default=1_000, help='Requisições por endpoint.')
+    parser.add_argument('--concorrencia', type=int, default=8)
+    parser.add_argument('--operadoras', type=int, default=2_000)
+    parser.add_argument('--anos', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        if args.url:
+            base = args.url.rstrip('/')
+            pagina = requests.get(f'{base}/api/operadoras', params={'limite': 100}, timeout=30).json()
+            registros = [o['registro_ans'] for o in pagina['dados']]
+        else:
+            base, registros = subir_api_local(args.operadoras, args.anos, pasta)
+
+        sessao = requests.Session()
+        sessao.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=args.concorrencia))
+        rng = random.Random(1)
+        cenarios = {
+            'listagem': lambda: (f'{base}/api/operadoras', {'limite': 50, 'cursor': rng.choice(registros)}),
+            'busca': lambda: (f'{base}/api/operadoras', {'busca': f'SINTETICA {rng.randint(1, 99)}'}),
+            'sugestoes': lambda: (f'{base}/api/operadoras/sugestoes', {'q': f'saude {rng.randint(1, 99)}'}),
+            'historico': lambda: (f'{base}/api/operadoras/{rng.choice(registros)}/despesas', {}),
+            'uf': lambda: (f'{base}/api/estatisticas/uf', {}),
+            'analise': lambda: (f'{base}/api/analises/acima-da-media', {}),
+        }
+
+        def medir(cenario) -> float:
+            url, params = cenario()
+            inicio = time.perf_counter()
+            resposta = sessao.get(url, params=params, timeout=30)
+            resposta.raise_for_status()
+            return (time.perf_counter() - inicio) * 1000
+
+        for nome, cenario in cenarios.items():
+            with ThreadPoolExecutor(max_workers=args.concorrencia) as executor:
+                inicio = time.perf_counter()
+                latencias = list(executor.map(lambda _: medir(cenario), range(args.requisicoes)))
+                duracao = time.perf_counter() - inicio
+            print(f'{nome:<10} p50 {statistics.median(latencias):7.2f} ms  p99 {percentil(latencias, 99):7.2f} ms  '
+                  f'{args.requisicoes / duracao:8.1f} req/s')
+
+        print(f"cache: {sessao.get(f'{base}/api/cache/estatisticas', timeout=30).json()}")
+        print(f"busca: {sessao.get(f'{base}/api/busca/estatisticas', timeout=30).json()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Latência do índice de busca de operadoras (src/api/busca.py) para
+autocompletar, comparada ao LIKE '%...%' da listagem sobre SQLite.
+
+Monta o índice com operadoras sintéticas (nomes acentuados, CNPJ e registro),
+mede tempo de montagem, memória (tracemalloc) e p50/p99 de consultas por
+prefixo de nome, várias palavras, CNPJ com máscara e registro ANS. Também
+confere cada resposta contra uma varredura linear com a mesma regra.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_busca.py --operadoras 50000 --consultas 2000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'api'))
+import busca  # noqa: E402
+
+PALAVRAS = ['SAÚDE', 'ASSISTÊNCIA', 'MÉDICA', 'ODONTOLÓGICA', 'UNIÃO', 'COOPERATIVA', 'SÃO', 'JOSÉ', 'PLANO',
+            'VIDA', 'SERVIÇOS', 'HOSPITALARES', 'CLÍNICA', 'BEM', 'ESTAR', 'NORDESTE', 'PAULISTA', 'MINEIRA']
+MODALIDADES = ['Cooperativa Médica', 'Medicina de Grupo', 'Autogestão', 'Odontologia de Grupo']
+
+
+def gerar_operadoras(quantidade: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    linhas = []
+    for i in range(quantidade):
+        nome = ' '.join(rng.sample(PALAVRAS, rng.randint(2, 4)))
+        linhas.append({
+            'registro_ans': f'{300000 + i}',
+            'cnpj': f'{rng.randrange(10**13, 10**14):014d}',
+            'razao_social': f'{nome} {i} LTDA',
+            'nome_fantasia': f'{rng.choice(PALAVRAS)} {i}',
+            'modalidade': rng.choice(MODALIDADES),
+        })
+    return linhas
+
+
+def gerar_consultas(linhas: list[dict], quantidade: int, seed: int = 1) -> dict:
+    rng = random.Random(seed)
+
+    def prefixo_nome():
+        palavra = rng.choice(linhas)['razao_social'].split()[0]
+        return palavra[:rng.randint(1, len(palavra))].lower()
+
+    def varias_palavras():
+        partes = rng.choice(linhas)['razao_social'].split()
+        return ' '.join([partes[0], partes[1][:3]])
+
+    def cnpj_mascara():
+        c = rng.choice(linhas)['cnpj']
+        return f'{c[:2]}.{c[2:5]}.{c[5:8]}'
+
+    return {
+        'prefixo de nome': [prefixo_nome() for _ in range(quantidade)],
+        'várias palavras': [varias_palavras() for _ in range(quantidade)],
+        'CNPJ com máscara': [cnpj_mascara() for _ in range(quantidade)],
+        'registro ANS': [rng.choice(linhas)['registro_ans'][:rng.randint(3, 6)] for _ in range(quantidade)],
+    }
+
+
+def preparar_conferencia(linhas: list[dict]) -> list[tuple]:
+    # Palavras normalizadas e dígitos de cada operadora, para a varredura linear
+    return [(
+        linha['registro_ans'],
+        set(busca.normalizar(linha['razao_social']).split()) | set(busca.normalizar(linha['nome_fantasia']).split()),
+        (busca.apenas_digitos(linha['cnpj']), busca.apenas_digitos(linha['registro_ans'])),
+    ) for linha in linhas]
+
+
+def conferir(conferencia: list[tuple], termo: str, resultado: list[dict], limite: int) -> bool:
+    # Varredura linear com a regra do índice: cada palavra digitada é prefixo de uma palavra do nome
+    digitos = busca.apenas_digitos(termo)
+    if digitos and not any(c.isalpha() for c in termo):
+        esperados = {r for r, _, chaves in conferencia if any(c.startswith(digitos) for c in chaves)}
+    else:
+        tokens = busca.normalizar(termo).split()
+        esperados = {r for r, palavras, _ in conferencia
+                     if all(any(p.startswith(t) for p in palavras) for t in tokens)}
+    obtidos = [r['registro_ans'] for r in resultado]
+    return len(set(obtidos)) == len(obtidos) and set(obtidos) <= esperados \
+        and len(obtidos) == min(len(esperados), limite)
+
+
+def percentil(valores: list[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--operadoras', type=int, default=50_000)
+    parser.add_argument('--consultas', type=int, default=1_000, help='Consultas por tipo.')
+    parser.add_argument('--limite', type=int, default=10)
+    parser.add_argument('--conferir', type=int, default=50, help='Consultas por tipo conferidas por varredura.')
+    args = parser.parse_args()
+
+    linhas = gerar_operadoras(args.operadoras)
+    # tracemalloc deixa a montagem mais lenta: tempo e memória medidos em montagens separadas
+    inicio = time.perf_counter()
+    indice = busca.Indice(linhas)
+    montagem = time.perf_counter() - inicio
+    tracemalloc.start()
+    indice = busca.Indice(linhas)
+    memoria = tracemalloc.get_traced_memory()[0] / 2**20
+    tracemalloc.stop()
+    print(f'{args.operadoras:,} operadoras, {len(indice.tokens):,} tokens: montagem {montagem * 1000:.0f} ms, '
+          f'{memoria:.1f} MiB (tracemalloc), {indice.bytes_estimados() / 2**20:.1f} MiB (estimado)')
+
+    banco = sqlite3.connect(':memory:')
+    banco.execute('CREATE TABLE operadoras (registro_ans TEXT PRIMARY KEY, cnpj TEXT, razao_social TEXT, '
+                  'nome_fantasia TEXT, modalidade TEXT)')
+    banco.execute('CREATE INDEX idx_cnpj ON operadoras (cnpj)')
+    banco.executemany('INSERT INTO operadoras VALUES (:registro_ans, :cnpj, :razao_social, :nome_fantasia, '
+                      ':modalidade)', linhas)
+    sql_like = ('SELECT * FROM operadoras WHERE razao_social LIKE ? OR nome_fantasia LIKE ? OR cnpj LIKE ? '
+                'OR registro_ans = ? ORDER BY registro_ans LIMIT ?')
+
+    conferencia = preparar_conferencia(linhas)
+    for tipo, termos in gerar_consultas(linhas, args.consultas).items():
+        latencias, erradas = [], 0
+        for k, termo in enumerate(termos):
+            inicio = time.perf_counter()
+            resultado = indice.buscar(termo, args.limite)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            if k < args.conferir and not conferir(conferencia, termo, resultado, args.limite):
+                erradas += 1
+
+        latencias_sql = []
+        for termo in termos[:min(len(termos), 200)]:
+            inicio = time.perf_counter()
+            banco.execute(sql_like, (f'%{termo}%', f'%{termo}%', f'{termo}%', termo, args.limite)).fetchall()
+            latencias_sql.append((time.perf_counter() - inicio) * 1000)
+
+        print(f'{tipo:<18} índice p50 {statistics.median(latencias):6.3f} ms  p99 {percentil(latencias, 99):6.3f} ms'
+              f'   | LIKE p50 {statistics.median(latencias_sql):7.2f} ms'
+              + (f'   {erradas} respostas divergentes!' if erradas else ''))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Tempo total de carga do CADOP somando transformação e enriquecimento.
+
+Antes cada etapa relia o CSV latin1: a transformação montava dois dicts
+por REGISTRO_OPERADORA e o enriquecimento limpava o CNPJ de todas as linhas
+e deduplicava. Agora cadop.carregar() parseia uma vez, normaliza o CNPJ uma
+vez e grava o cache compacto (data/estado/cadop_<hash>.pkl); a segunda etapa
+do mesmo processo reaproveita a memória, e execuções seguintes leem o pickle.
+Também compara o mapeamento registro -> nome/CNPJ via dict e via índice.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_cadop.py --operadoras 200000 --linhas 2000000
+"""
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+RAIZ_TEMPORARIA = tempfile.mkdtemp(prefix='bench_cadop_')
+os.environ['ETL_RAIZ_DADOS'] = RAIZ_TEMPORARIA
+os.environ.setdefault('ETL_METRICAS', '0')
+PASTA_ETL = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'etl')
+sys.path.insert(0, PASTA_ETL)
+sys.path.insert(0, os.path.join(PASTA_ETL, 'analysis'))
+import cadop  # noqa: E402
+import enrichment  # noqa: E402
+import transformation  # noqa: E402
+
+UFS = ['SP', 'RJ', 'MG', 'RS', 'PR', 'BA', 'CE', 'PE', 'SC', 'GO']
+MODALIDADES = ['Cooperativa Médica', 'Medicina de Grupo', 'Autogestão', 'Odontologia de Grupo']
+
+
+def gerar_cadop(caminho: str, operadoras: int, seed: int = 0) -> None:
+    # Mesmo layout do Relatorio_cadop.csv: CNPJ sem máscara, latin1, colunas extras
+    rng = np.random.default_rng(seed)
+    registros = np.arange(300000, 300000 + operadoras)
+    pd.DataFrame({
+        'REGISTRO_OPERADORA': registros.astype(str),
+        'CNPJ': (rng.integers(10**12, 10**14, operadoras)).astype(str),
+        'Razao_Social': [f'OPERADORA DE SAÚDE {r} LTDA' for r in registros],
+        'Nome_Fantasia': [f'SAÚDE {r}' for r in registros],
+        'Modalidade': rng.choice(MODALIDADES, operadoras),
+        'Logradouro': 'RUA DAS ACÁCIAS',
+        'Cidade': 'São Paulo',
+        'UF': rng.choice(UFS, operadoras),
+        'Data_Registro_ANS': '2001-01-01',
+    }).to_csv(caminho, sep=';', index=False, encoding='latin1')
+
+
+def carga_antiga() -> tuple:
+    # Caminho anterior: cada etapa relê o CSV; o enriquecimento ainda limpa e deduplica o CNPJ
+    caminho = cadop.caminho_cadop()
+    df = pd.read_csv(caminho, sep=';', encoding='latin1', usecols=['REGISTRO_OPERADORA', 'CNPJ', 'Razao_Social'],
+                     dtype={'REGISTRO_OPERADORA': str, 'CNPJ': str})
+    mapa_nomes = df.set_index('REGISTRO_OPERADORA')['Razao_Social'].to_dict()
+    mapa_cnpjs = df.set_index('REGISTRO_OPERADORA')['CNPJ'].to_dict()
+
+    df_cadop = pd.read_csv(caminho, sep=';', encoding='latin1', dtype=str,
+                           usecols=['CNPJ', 'REGISTRO_OPERADORA', 'Modalidade', 'UF'])
+    df_cadop['KEY_CNPJ'] = enrichment.limpar_cnpj_vetorizado(df_cadop['CNPJ'])
+    df_cadop = df_cadop.drop_duplicates(subset=['KEY_CNPJ'], keep='last')
+    return mapa_nomes, mapa_cnpjs, df_cadop
+
+
+def carga_nova() -> tuple:
+    # As duas etapas chamam o mesmo carregador
+    return transformation.carregar_cadop(), enrichment.carregar_cadop()
+
+
+def cronometrar(funcao, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--operadoras', type=int, default=100_000)
+    parser.add_argument('--linhas', type=int, default=1_000_000, help='Linhas (registro, trimestre) a mapear.')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    pasta_raw = os.path.join(RAIZ_TEMPORARIA, 'raw')
+    os.makedirs(pasta_raw, exist_ok=True)
+    gerar_cadop(os.path.join(pasta_raw, cadop.NOMES_CADOP[1]), args.operadoras)
+    tamanho = os.path.getsize(cadop.caminho_cadop()) / 2**20
+    print(f'CADOP sintético: {args.operadoras:,} operadoras, {tamanho:.1f} MiB')
+
+    def sem_cache():
+        cadop._em_memoria.clear()
+        for cache in glob.glob(os.path.join(cadop.estado_incremental.PASTA_ESTADO, 'cadop_*.pkl')):
+            os.remove(cache)
+        return carga_nova()
+
+    def cache_em_disco():
+        cadop._em_memoria.clear()
+        return carga_nova()
+
+    medidas = {
+        'antes (2 leituras do CSV)': cronometrar(carga_antiga, args.repeticoes),
+        'depois, sem cache': cronometrar(sem_cache, args.repeticoes),
+        'depois, cache em disco': cronometrar(cache_em_disco, args.repeticoes),
+        'depois, mesmo processo': cronometrar(carga_nova, args.repeticoes),
+    }
+    base = medidas['antes (2 leituras do CSV)']
+    for nome, duracao in medidas.items():
+        print(f'{nome:<28}{duracao:9.3f} s  {base / duracao:6.1f}x')
+
+    # Mapeamento registro -> nome/CNPJ sobre somas parciais sintéticas
+    mapa_nomes, mapa_cnpjs, _ = carga_antiga()
+    por_registro = transformation.carregar_cadop()
+    rng = np.random.default_rng(1)
+    regs = pd.Series((300000 + rng.integers(0, int(args.operadoras * 1.1), args.linhas)).astype(str))
+    t_dict = cronometrar(lambda: (regs.map(mapa_nomes), regs.map(mapa_cnpjs)), args.repeticoes)
+    t_indice = cronometrar(lambda: (regs.map(por_registro['RazaoSocial']), regs.map(por_registro['CNPJ'])),
+                           args.repeticoes)
+    print(f'map por dict:   {t_dict:.3f} s   map por índice: {t_indice:.3f} s  ({args.linhas:,} linhas)')
+    iguais = regs.map(mapa_nomes).equals(regs.map(por_registro['RazaoSocial']))
+    print(f'Mapeamentos equivalentes: {iguais}')
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        shutil.rmtree(RAIZ_TEMPORARIA, ignore_errors=True)
@@ -0,0 +1,138 @@
+"""
+Vazão (linhas/s) da carga direta DataFrame -> MySQL (load.carregar_dataframe)
+com diferentes tamanhos de lote, comparada ao caminho antigo: gravar o CSV e
+importar com LOAD DATA LOCAL INFILE. Por fim mede a carga incremental
+(load.carregar_incremental) depois de alterar um único trimestre.
+
+Precisa de um MySQL local (ex.: docker run -e MYSQL_ROOT_PASSWORD=root -p 3306:3306 mysql:8
+com local_infile habilitado). Usa as credenciais DB_* do .env e cria o banco
+indicado em --banco, que é descartado ao final.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_carga_mysql.py --linhas 200000 --lotes 500 5000 20000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import mysql.connector
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'etl'))
+import load  # noqa: E402
+
+UFS = ['SP', 'RJ', 'MG', 'RS', 'PR', 'BA', 'CE', 'PE', 'SC', 'GO']
+TRIMESTRES = ['1T', '2T', '3T', '4T']
+
+
+def gerar_enriquecido(linhas: int, operadoras: int = 1_000, seed: int = 0) -> pd.DataFrame:
+    """
+    DataFrame no formato da saída de enrichment.executar_pipeline_completo:
+    uma linha por operadora e trimestre (2015 a 2025), como o consolidado.
+    """
+    rng = np.random.default_rng(seed)
+    periodos = 11 * len(TRIMESTRES)
+    operadoras = max(operadoras, -(-linhas // periodos))
+    posicao = np.arange(linhas)
+    ids, periodo = posicao % operadoras, posicao // operadoras
+    return pd.DataFrame({
+        'CNPJ': pd.Series(ids + 10**13).astype(str),
+        'RazaoSocial': pd.Series(ids).map(lambda i: f'OPERADORA {i} LTDA'),
+        'Trimestre': np.array(TRIMESTRES)[periodo % len(TRIMESTRES)],
+        'Ano': 2015 + periodo // len(TRIMESTRES),
+        'ValorDespesas': rng.uniform(10, 1_000_000, linhas).round(2),
+        'CNPJ_Valido': rng.random(linhas) > 0.05,
+        'RegistroANS': pd.Series(ids + 300000).astype(str),
+        'Modalidade': 'Cooperativa Médica',
+        'UF': rng.choice(UFS, linhas),
+    })
+
+
+def criar_tabelas(cursor, banco: str) -> None:
+    cursor.execute(f'DROP DATABASE IF EXISTS {banco}')
+    cursor.execute(f'CREATE DATABASE {banco}')
+    cursor.execute(f'USE {banco}')
+    with open(os.path.join(load.SQL_DIR, '01_ddl_estrutura.sql'), encoding='utf-8') as f:
+        comandos = load.split_sql_statements(f.read())
+    for comando in comandos:
+        if comando.upper().startswith('CREATE TABLE'):
+            cursor.execute(comando)
+
+
+def carga_via_csv(cursor, df: pd.DataFrame) -> float:
+    # Caminho antigo: CSV em disco + LOAD DATA com CAST/REPLACE por linha
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'consolidado.csv').replace('\\', '/')
+        inicio = time.perf_counter()
+        df.to_csv(caminho, index=False, sep=';', encoding='utf-8', decimal=',', lineterminator='\r\n')
+        cursor.execute('TRUNCATE TABLE despesas_detalhadas')
+        cursor.execute(f"""
+            LOAD DATA LOCAL INFILE '{caminho}'
+            INTO TABLE despesas_detalhadas
+            CHARACTER SET utf8mb4
+            FIELDS TERMINATED BY ';'
+            LINES TERMINATED BY '\\r\\n'
+            IGNORE 1 ROWS
+            (cnpj, razao_social, trimestre, @v_ano, @v_valor, cnpj_valido, registro_ans, modalidade, uf)
+            SET
+                ano = CAST(@v_ano AS UNSIGNED),
+                valor_despesa = CAST(REPLACE(@v_valor, ',', '.') AS DECIMAL(15,2))
+        """)
+        return time.perf_counter() - inicio
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=200_000)
+    parser.add_argument('--lotes', type=int, nargs='+', default=[500, 5_000, 20_000])
+    parser.add_argument('--banco', default='bench_carga')
+    parser.add_argument('--sem-csv', action='store_true', help='Não mede o caminho CSV + LOAD DATA.')
+    args = parser.parse_args()
+
+    df = gerar_enriquecido(args.linhas)
+    dados = load.preparar_despesas_detalhadas(df)
+    print(f'{len(df):,} linhas sintéticas geradas')
+
+    conn = load.get_db_connection()
+    cursor = conn.cursor()
+    try:
+        criar_tabelas(cursor, args.banco)
+
+        if not args.sem_csv:
+            try:
+                duracao = carga_via_csv(cursor, df)
+                print(f'CSV + LOAD DATA:      {duracao:7.2f} s  {len(df) / duracao:12,.0f} linhas/s')
+            except mysql.connector.Error as err:
+                print(f'CSV + LOAD DATA indisponível ({err}); habilite local_infile no servidor.')
+
+        for lote in args.lotes:
+            resultado = load.carregar_dataframe(cursor, dados, 'despesas_detalhadas', tamanho_lote=lote)
+            cursor.execute('SELECT COUNT(*) FROM despesas_detalhadas')
+            total = cursor.fetchone()[0]
+            print(f'Direto, lote {lote:>6}: {resultado["segundos"]:7.2f} s  '
+                  f'{resultado["linhas_s"]:12,.0f} linhas/s  ({total:,} linhas após o RENAME)')
+
+        # Incremental: a primeira carga registra as impressões, a segunda só
+        # regrava o trimestre alterado e a terceira (idêntica) não grava nada
+        df_agg = df.groupby(['RazaoSocial', 'UF', 'RegistroANS', 'Modalidade'])['ValorDespesas'].agg(
+            Total_Despesas='sum', Media_Trimestral='mean', Desvio_Padrao='std').reset_index().fillna(0)
+        load.carregar_incremental(cursor, df, df_agg)
+        alvo = (df['Ano'] == df['Ano'].max()) & (df['Trimestre'] == '4T')
+        df.loc[alvo, 'ValorDespesas'] += 1
+        for rotulo in ('um trimestre alterado', 'sem alterações'):
+            inicio = time.perf_counter()
+            load.carregar_incremental(cursor, df, df_agg)
+            cursor.execute('SELECT COUNT(*) FROM despesas_detalhadas')
+            print(f'Incremental, {rotulo}: {time.perf_counter() - inicio:.2f} s '
+                  f'({cursor.fetchone()[0]:,} linhas na tabela)')
+    finally:
+        cursor.execute(f'DROP DATABASE IF EXISTS {args.banco}')
+        cursor.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
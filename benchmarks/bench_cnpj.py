@@ -0,0 +1,90 @@
+"""
+Benchmark e conferência da validação de CNPJ vetorizada do enrichment.
+
+Gera um corpus aleatório (CNPJs válidos, com pontuação, DV trocado, dígitos
+repetidos, curtos, longos, vazios e nulos), confere que validar_cnpj_vetorizado
+concorda com validar_cnpj_matematicamente linha a linha e mede o speedup.
+O caminho escalar é cronometrado numa amostra e extrapolado para o total.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_cnpj.py --linhas 10000000 --operadoras 1500
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'etl', 'analysis'))
+import enrichment  # noqa: E402
+
+
+def cnpj_valido(rng) -> str:
+    base = ''.join(str(d) for d in rng.integers(0, 10, size=12))
+    dv1 = enrichment._digito_verificador(int(np.dot([int(c) for c in base], enrichment.PESOS_DV1)))
+    dv2 = enrichment._digito_verificador(int(np.dot([int(c) for c in base + str(dv1)], enrichment.PESOS_DV2)))
+    return f'{base}{dv1}{dv2}'
+
+
+def gerar_corpus(distintos: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    corpus = []
+    for _ in range(distintos):
+        tipo = rng.integers(0, 9)
+        valido = cnpj_valido(rng)
+        if tipo == 0:
+            corpus.append(f'{valido[:2]}.{valido[2:5]}.{valido[5:8]}/{valido[8:12]}-{valido[12:]}')
+        elif tipo == 1:
+            corpus.append(valido[:13] + str((int(valido[13]) + 1) % 10))
+        elif tipo == 2:
+            corpus.append(str(rng.integers(0, 10)) * 14)
+        elif tipo == 3:
+            corpus.append(valido.lstrip('0')[: rng.integers(1, 14)])
+        elif tipo == 4:
+            corpus.append(valido + str(rng.integers(0, 10)))
+        elif tipo == 5:
+            corpus.append(rng.choice([None, '', 'N/D', ' ']))
+        elif tipo == 6:
+            corpus.append(''.join(str(d) for d in rng.integers(0, 10, size=14)))
+        else:
+            corpus.append(valido)
+    return corpus
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=10_000_000)
+    parser.add_argument('--operadoras', type=int, default=1_500, help='CNPJs distintos no corpus de linhas.')
+    parser.add_argument('--corpus', type=int, default=200_000, help='CNPJs distintos na conferência.')
+    parser.add_argument('--amostra-escalar', type=int, default=200_000)
+    args = parser.parse_args()
+
+    # 1. Conferência linha a linha num corpus grande de valores distintos
+    conferencia = pd.Series(gerar_corpus(args.corpus, seed=1), dtype=object)
+    esperado = conferencia.apply(enrichment.validar_cnpj_matematicamente).to_numpy()
+    obtido = enrichment.validar_cnpj_vetorizado(conferencia).to_numpy()
+    divergencias = int((esperado != obtido).sum())
+    print(f'Conferência: {len(conferencia):,} CNPJs, {int(esperado.sum()):,} válidos, {divergencias} divergências')
+
+    # 2. Speedup na escala do consolidado (operadoras repetidas por trimestre)
+    rng = np.random.default_rng(2)
+    distintos = np.array(gerar_corpus(args.operadoras, seed=3), dtype=object)
+    serie = pd.Series(distintos[rng.integers(0, len(distintos), size=args.linhas)])
+
+    inicio = time.perf_counter()
+    enrichment.validar_cnpj_vetorizado(serie)
+    t_vetorizado = time.perf_counter() - inicio
+
+    amostra = serie.iloc[:args.amostra_escalar]
+    inicio = time.perf_counter()
+    amostra.apply(enrichment.limpar_cnpj).apply(enrichment.validar_cnpj_matematicamente)
+    t_escalar = (time.perf_counter() - inicio) * len(serie) / len(amostra)
+
+    print(f'{len(serie):,} linhas: escalar ~{t_escalar:.1f} s (extrapolado), '
+          f'vetorizado {t_vetorizado:.2f} s, speedup ~{t_escalar / t_vetorizado:.0f}x')
+
+
+if __name__ == '__main__':
+    main()
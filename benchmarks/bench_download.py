@@ -0,0 +1,123 @@
+"""
+Exercita o downloader de extraction.py contra um servidor HTTP local.
+
+O servidor de apoio serve uma pasta temporária com ETag, Last-Modified,
+Accept-Ranges e respostas 206, imitando o FTP/PDA da ANS. O script mede a
+vazão de cada arquivo e verifica os três cenários: download completo,
+execução repetida (tudo pulado pelo manifesto) e retomada de um .part.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_download.py --mb 50 --trimestres 4
+"""
+import argparse
+import email.utils
+import hashlib
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'etl'))
+import extraction  # noqa: E402
+
+
+class HandlerComRange(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _cabecalhos(self, caminho: str, inicio: int, fim: int, total: int, parcial: bool) -> None:
+        estado = os.stat(caminho)
+        etag = '"' + hashlib.md5(f'{estado.st_size}-{estado.st_mtime_ns}'.encode()).hexdigest() + '"'
+        self.send_response(206 if parcial else 200)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', email.utils.formatdate(estado.st_mtime, usegmt=True))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(fim - inicio + 1))
+        if parcial:
+            self.send_header('Content-Range', f'bytes {inicio}-{fim}/{total}')
+        self.end_headers()
+
+    def _responder(self, com_corpo: bool) -> None:
+        caminho = self.translate_path(self.path)
+        if not os.path.isfile(caminho):
+            self.send_error(404)
+            return
+        total = os.path.getsize(caminho)
+        inicio, fim, parcial = 0, total - 1, False
+        intervalo = re.match(r'bytes=(\d+)-$', self.headers.get('Range', ''))
+        if intervalo and com_corpo:
+            inicio, parcial = int(intervalo.group(1)), True
+        self._cabecalhos(caminho, inicio, fim, total, parcial)
+        if com_corpo:
+            with open(caminho, 'rb') as f:
+                f.seek(inicio)
+                shutil.copyfileobj(f, self.wfile)
+
+    def do_HEAD(self):
+        self._responder(com_corpo=False)
+
+    def do_GET(self):
+        self._responder(com_corpo=True)
+
+
+def preparar_servidor(raiz: str, trimestres: list[str], mb: int) -> None:
+    for trimestre in trimestres:
+        ano, periodo = trimestre.split('/')
+        os.makedirs(os.path.join(raiz, ano), exist_ok=True)
+        with zipfile.ZipFile(os.path.join(raiz, ano, f'{periodo}{ano}.zip'), 'w', zipfile.ZIP_STORED) as zf:
+            zf.writestr(f'{periodo}{ano}.csv', os.urandom(mb * 2**20))
+    with open(os.path.join(raiz, 'Relatorio_cadop.csv'), 'wb') as f:
+        f.write(os.urandom(2**20))
+
+
+def rodada(titulo: str, base_url: str, pasta: str, trimestres: list[str], workers: int) -> None:
+    print(f'\n== {titulo}')
+    inicio = time.perf_counter()
+    resultados = extraction.baixar_arquivos_ans(trimestres, base_url=base_url, pasta=pasta, workers=workers)
+    resultados.append(extraction.baixar_cadastro_operadoras(url=base_url + 'Relatorio_cadop.csv', pasta=pasta))
+    total = sum(r['bytes'] for r in resultados)
+    duracao = time.perf_counter() - inicio
+    print(f'-- {total / 2**20:.1f} MB em {duracao:.2f} s; status: {[r["status"] for r in resultados]}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mb', type=int, default=20, help='Tamanho de cada ZIP trimestral.')
+    parser.add_argument('--trimestres', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=extraction.MAX_DOWNLOADS_SIMULTANEOS)
+    args = parser.parse_args()
+
+    trimestres = [f'2025/{i + 1}T' for i in range(args.trimestres)]
+    with tempfile.TemporaryDirectory() as raiz, tempfile.TemporaryDirectory() as pasta:
+        preparar_servidor(raiz, trimestres, args.mb)
+        handler = lambda *a, **k: HandlerComRange(*a, directory=raiz, **k)  # noqa: E731
+        servidor = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{servidor.server_address[1]}/'
+
+        try:
+            rodada('Download inicial', base_url, pasta, trimestres, args.workers)
+            rodada('Execução repetida (manifesto)', base_url, pasta, trimestres, args.workers)
+
+            # Simula uma queda no meio do primeiro arquivo
+            _, alvo = extraction._url_e_caminho_trimestre(trimestres[0], base_url, pasta)
+            with open(alvo, 'rb') as f:
+                metade = f.read(os.path.getsize(alvo) // 2)
+            with open(alvo + '.part', 'wb') as f:
+                f.write(metade)
+            os.remove(alvo)
+            manifesto = extraction.Manifesto(pasta)
+            nome = os.path.basename(alvo)
+            manifesto.registrar(nome, {'parcial_etag': manifesto.obter(nome)['etag']})
+            rodada('Retomada com Range', base_url, pasta, trimestres, args.workers)
+        finally:
+            servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Conferência e tempo dos acumuladores de estatisticas.py (despesas_agregadas).
+
+Gera despesas sintéticas por operadora e compara, contra o
+groupby(...).agg(sum, mean, std) do pandas:
+  - acumuladores num bloco só (o que agregar() faz);
+  - acumuladores em blocos (o que agregar_arquivo() faz lendo em streaming);
+  - a fórmula da soma dos quadrados usada antes no modo incremental.
+Com --mal-condicionado as médias ficam em torno de 1e9 e o desvio abaixo de
+1: a soma dos quadrados perde todos os algarismos do desvio, os acumuladores
+não.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_estatisticas.py --linhas 5000000 --chunk 200000
+    python benchmarks/bench_estatisticas.py --mal-condicionado
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'etl', 'analysis'))
+import estatisticas  # noqa: E402
+
+CHAVES = ['RazaoSocial', 'UF', 'RegistroANS', 'Modalidade']
+
+
+def gerar(linhas: int, operadoras: int, mal_condicionado: bool, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    ids = rng.integers(0, operadoras, linhas)
+    if mal_condicionado:
+        valores = 1e9 + rng.random(linhas)
+    else:
+        valores = rng.integers(1, 50_000_000, linhas) / 100
+    registros = (300000 + ids).astype(str)
+    return pd.DataFrame({
+        'RazaoSocial': 'OPERADORA ' + pd.Series(registros),
+        'UF': np.array(['SP', 'RJ', 'MG', 'RS'])[ids % 4],
+        'RegistroANS': registros,
+        'Modalidade': np.array(['Cooperativa Médica', 'Medicina de Grupo'])[ids % 2],
+        'ValorDespesas': valores,
+    })
+
+
+def pandas_groupby(df: pd.DataFrame) -> pd.DataFrame:
+    df_agg = df.groupby(CHAVES)['ValorDespesas'].agg(
+        Total_Despesas='sum', Media_Trimestral='mean', Desvio_Padrao='std').reset_index()
+    df_agg['Desvio_Padrao'] = df_agg['Desvio_Padrao'].fillna(0)
+    return df_agg
+
+
+def soma_dos_quadrados(df: pd.DataFrame) -> pd.DataFrame:
+    # Fórmula anterior: Var = (soma_q - soma^2/n) / (n-1)
+    valores = df['ValorDespesas']
+    acc = pd.DataFrame({'n': 1, 'soma': valores, 'soma_quadrados': valores ** 2}).join(df[CHAVES]) \
+        .groupby(CHAVES)[['n', 'soma', 'soma_quadrados']].sum()
+    media = acc['soma'] / acc['n']
+    variancia = (acc['soma_quadrados'] - acc['soma'] * media) / (acc['n'] - 1)
+    return pd.DataFrame({
+        'Total_Despesas': acc['soma'],
+        'Media_Trimestral': media,
+        'Desvio_Padrao': np.sqrt(variancia.clip(lower=0).where(acc['n'] > 1, 0)),
+    }).reset_index()
+
+
+def cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=2_000_000)
+    parser.add_argument('--operadoras', type=int, default=1_000)
+    parser.add_argument('--chunk', type=int, default=200_000)
+    parser.add_argument('--mal-condicionado', action='store_true')
+    args = parser.parse_args()
+
+    df = gerar(args.linhas, args.operadoras, args.mal_condicionado)
+    print(f'{args.linhas:,} linhas, {args.operadoras:,} operadoras, blocos de {args.chunk:,}'
+          f'{" (mal condicionado)" if args.mal_condicionado else ""}')
+
+    referencia, t_ref = cronometrar(lambda: pandas_groupby(df))
+    blocos = lambda: (df.iloc[i:i + args.chunk] for i in range(0, len(df), args.chunk))  # noqa: E731
+    metodos = {
+        'acumuladores, 1 bloco': lambda: estatisticas.finalizar(estatisticas.acumular(df, CHAVES), CHAVES),
+        'acumuladores em blocos': lambda: estatisticas.finalizar(
+            estatisticas.agregar_em_blocos(blocos(), CHAVES), CHAVES),
+        'soma dos quadrados': lambda: soma_dos_quadrados(df),
+    }
+    print(f'{"pandas groupby":<24}{t_ref:8.3f} s')
+    for nome, funcao in metodos.items():
+        resultado, duracao = cronometrar(funcao)
+        erros = estatisticas.comparar_com_pandas(resultado, referencia, CHAVES)
+        dentro = all(e <= estatisticas.TOLERANCIA_RELATIVA for e in erros.values())
+        print(f'{nome:<24}{duracao:8.3f} s  erro relativo máx: '
+              + '  '.join(f'{c} {e:.1e}' for c, e in erros.items())
+              + ('' if dentro else '  FORA DA TOLERÂNCIA'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+Exportação em streaming da API (/api/exportacao/{conjunto}) com milhões de
+linhas: confere que a memória do servidor não cresce com o tamanho da
+exportação e que cada arquivo chega completo.
+
+Popula um SQLite (dublê local do MySQL) com despesas_detalhadas sintéticas
+espalhadas por --anos anos, sobe a API num processo separado e exporta
+fatias crescentes (último ano, metade do período, tudo) em CSV, gzip e
+Parquet. Durante cada download o RSS do servidor é amostrado; o pico acima
+do RSS de repouso deve ficar igual (dentro de --tolerancia MiB) entre a
+menor e a maior fatia. Sai com código 1 se crescer ou se faltar linha.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_exportacao.py --linhas 3000000
+    python benchmarks/bench_exportacao.py --linhas 500000 --formatos csv
+"""
+import argparse
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+import requests
+
+PASTA_API = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'api')
+UFS = ['SP', 'RJ', 'MG', 'RS', 'PR', 'BA', 'CE', 'PE', 'SC', 'GO']
+MODALIDADES = ['Cooperativa Médica', 'Medicina de Grupo', 'Autogestão', 'Odontologia de Grupo']
+TRIMESTRES = ['1T', '2T', '3T', '4T']
+ANO_FINAL = 2025
+
+
+def popular(caminho: str, linhas: int, anos: int, operadoras: int = 2_000, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    banco = sqlite3.connect(caminho)
+    banco.execute("""CREATE TABLE despesas_detalhadas (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        registro_ans VARCHAR(20) NOT NULL, cnpj VARCHAR(20), razao_social VARCHAR(255), trimestre CHAR(2),
+        ano INT, valor_despesa DECIMAL(15,2), cnpj_valido VARCHAR(10), modalidade VARCHAR(100), uf CHAR(2))""")
+    banco.execute('CREATE INDEX idx_ano_trimestre ON despesas_detalhadas (ano, trimestre)')
+    banco.execute("""CREATE TABLE despesas_agregadas (razao_social VARCHAR(255), uf CHAR(2),
+        registro_ans VARCHAR(20) PRIMARY KEY, modalidade VARCHAR(100), total_despesas DECIMAL(15,2),
+        media_trimestral DECIMAL(15,2), desvio_padrao DECIMAL(15,2))""")
+    periodos = [(ANO_FINAL - a, t) for a in range(anos) for t in TRIMESTRES]
+
+    def gerar():
+        for i in range(linhas):
+            o = rng.randrange(operadoras)
+            ano, trimestre = periodos[i % len(periodos)]
+            yield (f'{300000 + o}', f'{10**13 + o:014d}', f'OPERADORA SAÚDE {o} LTDA', trimestre, ano,
+                   round(rng.uniform(10, 1e7), 2), 'True', MODALIDADES[o % 4], UFS[o % 10])
+
+    banco.executemany('INSERT INTO despesas_detalhadas (registro_ans, cnpj, razao_social, trimestre, ano, '
+                      'valor_despesa, cnpj_valido, modalidade, uf) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', gerar())
+    banco.executemany('INSERT INTO despesas_agregadas VALUES (?, ?, ?, ?, ?, ?, ?)', [
+        (f'OPERADORA SAÚDE {o} LTDA', UFS[o % 10], f'{300000 + o}', MODALIDADES[o % 4], 1e6 * o, 2.5e5 * o, 1e3)
+        for o in range(operadoras)
+    ])
+    banco.commit()
+    banco.close()
+
+
+def rss_mb(pid: int, campo: str = 'VmRSS') -> float:
+    with open(f'/proc/{pid}/status', encoding='ascii') as f:
+        for linha in f:
+            if linha.startswith(campo + ':'):
+                return int(linha.split()[1]) / 1024
+    return 0.0
+
+
+def subir_api(caminho_banco: str, tamanho_bloco: int) -> tuple[subprocess.Popen, str]:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        porta = s.getsockname()[1]
+    ambiente = {**os.environ, 'DATABASE_URL': f'sqlite:///{caminho_banco}', 'BUSCA_EM_MEMORIA': '0',
+                'EXPORTACAO_LINHAS_POR_BLOCO': str(tamanho_bloco)}
+    processo = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(porta),
+                                 '--log-level', 'warning'], cwd=PASTA_API, env=ambiente)
+    base = f'http://127.0.0.1:{porta}'
+    for _ in range(200):
+        try:
+            requests.get(f'{base}/docs', timeout=1)
+            return processo, base
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    processo.kill()
+    raise RuntimeError('API não subiu')
+
+
+def baixar(url: str, params: dict, formato: str, pid: int, pasta: str) -> dict:
+    # Consome a resposta em pedaços (como um cliente real) amostrando o RSS do servidor
+    picos, ativo = [0.0], [True]
+
+    def amostrar():
+        while ativo[0]:
+            picos[0] = max(picos[0], rss_mb(pid))
+            time.sleep(0.02)
+
+    amostrador = threading.Thread(target=amostrar, daemon=True)
+    amostrador.start()
+    inicio = time.perf_counter()
+    linhas, tamanho = 0, 0
+    descompressor = zlib.decompressobj(31)
+    destino = os.path.join(pasta, 'exportacao.parquet')
+    with requests.get(url, params=params, stream=True, timeout=600) as resposta, open(destino, 'wb') as arquivo:
+        resposta.raise_for_status()
+        for pedaco in resposta.iter_content(chunk_size=256 * 1024):
+            tamanho += len(pedaco)
+            if formato == 'csv':
+                linhas += pedaco.count(b'\n')
+            elif formato == 'gzip':
+                linhas += descompressor.decompress(pedaco).count(b'\n')
+            else:
+                arquivo.write(pedaco)
+    duracao = time.perf_counter() - inicio
+    ativo[0] = False
+    amostrador.join()
+
+    if formato == 'parquet':
+        import pyarrow.parquet as pq
+        linhas = pq.ParquetFile(destino).metadata.num_rows
+    else:
+        linhas -= 1  # cabeçalho
+    return {'linhas': linhas, 'mib': tamanho / 2**20, 'segundos': duracao, 'pico_mb': picos[0]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=3_000_000)
+    parser.add_argument('--anos', type=int, default=10)
+    parser.add_argument('--formatos', nargs='+', choices=['csv', 'gzip', 'parquet'], default=['csv', 'gzip', 'parquet'])
+    parser.add_argument('--bloco', type=int, default=10_000, help='EXPORTACAO_LINHAS_POR_BLOCO do servidor.')
+    parser.add_argument('--tolerancia', type=float, default=25.0,
+                        help='Diferença máxima (MiB) entre os picos da menor e da maior exportação.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_banco = os.path.join(pasta, 'exportacao.db')
+        inicio = time.perf_counter()
+        popular(caminho_banco, args.linhas, args.anos)
+        print(f'{args.linhas:,} linhas sintéticas em {time.perf_counter() - inicio:.1f} s '
+              f'({os.path.getsize(caminho_banco) / 2**20:.0f} MiB no SQLite)')
+
+        banco = sqlite3.connect(caminho_banco)
+        fatias = {
+            'último ano': {'ano_inicial': ANO_FINAL},
+            'metade': {'ano_inicial': ANO_FINAL - args.anos // 2 + 1},
+            'tudo': {},
+        }
+        esperado = {
+            nome: banco.execute('SELECT COUNT(*) FROM despesas_detalhadas WHERE ano >= ?',
+                                (filtro.get('ano_inicial', 0),)).fetchone()[0]
+            for nome, filtro in fatias.items()
+        }
+        banco.close()
+
+        processo, base = subir_api(caminho_banco, args.bloco)
+        falhas = 0
+        try:
+            url = f'{base}/api/exportacao/despesas'
+            # Aquecimento: imports (pyarrow) e primeira conexão antes de medir o repouso
+            for formato in args.formatos:
+                baixar(url, {'formato': formato, 'registro_ans': '300000'}, formato, processo.pid, pasta)
+            repouso = rss_mb(processo.pid)
+            print(f'RSS do servidor em repouso: {repouso:.1f} MiB (bloco de {args.bloco:,} linhas)')
+
+            for formato in args.formatos:
+                picos = []
+                for nome, filtro in fatias.items():
+                    r = baixar(url, {'formato': formato, **filtro}, formato, processo.pid, pasta)
+                    completo = r['linhas'] == esperado[nome]
+                    falhas += not completo
+                    picos.append(r['pico_mb'] - repouso)
+                    print(f'{formato:<8}{nome:<11}{r["linhas"]:>11,} linhas {r["mib"]:8.1f} MiB {r["segundos"]:7.1f} s '
+                          f'{r["linhas"] / r["segundos"]:10,.0f} linhas/s  pico +{r["pico_mb"] - repouso:6.1f} MiB'
+                          + ('' if completo else f'  FALTAM LINHAS (esperado {esperado[nome]:,})'))
+                crescimento = picos[-1] - picos[0]
+                constante = crescimento <= args.tolerancia
+                falhas += not constante
+                print(f'{formato:<8}memória da maior fatia vs menor: {crescimento:+.1f} MiB '
+                      f'({"constante" if constante else "CRESCEU"})')
+        finally:
+            processo.terminate()
+            processo.wait()
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark da troca de dados entre transformação e enriquecimento.
+
+Compara o consolidado em CSV (como a transformação grava e o enriquecimento
+relê: dtype=str + replace + to_numeric) com Parquet e Arrow IPC tipados.
+Reporta tempo de escrita, tempo de leitura e tamanho do arquivo.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_intermediario.py --operadoras 20000 --trimestres 40
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'etl'))
+import intermediario  # noqa: E402
+
+
+def gerar_consolidado(operadoras: int, trimestres: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    ids = np.arange(operadoras)
+    linhas = operadoras * trimestres
+    return pd.DataFrame({
+        'CNPJ': np.repeat([f'{i:014d}' for i in ids], trimestres),
+        'RazaoSocial': np.repeat([f'OPERADORA SINTETICA {i}' for i in ids], trimestres),
+        'Trimestre': np.tile([f'{t % 4 + 1}T' for t in range(trimestres)], operadoras),
+        'Ano': np.tile([2015 + t // 4 for t in range(trimestres)], operadoras),
+        'ValorDespesas': rng.integers(1, 10**11, size=linhas) / 100,
+        'UF': rng.choice(['SP', 'RJ', 'MG', 'RS', 'PR', 'BA', 'CE'], size=linhas),
+        'Modalidade': rng.choice(['Medicina de Grupo', 'Cooperativa Médica', 'Autogestão'], size=linhas),
+    })
+
+
+def handoff_csv(df: pd.DataFrame, caminho: str) -> str:
+    df.to_csv(caminho, index=False, sep=';', encoding='utf-8', float_format='%.2f')
+    return caminho
+
+
+def ler_csv(caminho: str) -> pd.DataFrame:
+    df = pd.read_csv(caminho, sep=';', encoding='utf-8-sig', dtype=str)
+    df['ValorDespesas'] = pd.to_numeric(df['ValorDespesas'].str.replace(',', '.'), errors='coerce').fillna(0)
+    return df
+
+
+def cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--operadoras', type=int, default=5_000)
+    parser.add_argument('--trimestres', type=int, default=40)
+    args = parser.parse_args()
+
+    df = gerar_consolidado(args.operadoras, args.trimestres)
+    print(f'{len(df):,} linhas no consolidado')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho_csv = os.path.join(tmp, 'consolidado.csv')
+
+        _, escrita = cronometrar(lambda: handoff_csv(df, caminho_csv))
+        _, leitura = cronometrar(lambda: ler_csv(caminho_csv))
+        print(f'{"csv":<8} escrita {escrita:6.2f} s  leitura {leitura:6.2f} s  '
+              f'{os.path.getsize(caminho_csv) / 2**20:8.1f} MiB')
+
+        if not intermediario.colunar_disponivel():
+            print('pyarrow não instalado: formatos colunares não medidos.')
+            return
+
+        for formato in (intermediario.FORMATO_PARQUET, intermediario.FORMATO_ARROW):
+            caminho, escrita = cronometrar(lambda: intermediario.salvar_colunar(df, caminho_csv, formato))
+            _, leitura = cronometrar(lambda: intermediario.ler_colunar(caminho_csv, formato))
+            print(f'{formato:<8} escrita {escrita:6.2f} s  leitura {leitura:6.2f} s  '
+                  f'{os.path.getsize(caminho) / 2**20:8.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
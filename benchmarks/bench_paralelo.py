@@ -0,0 +1,61 @@
+"""
+Benchmark do modo paralelo de transformation.transformar_dados.
+
+Mede o tempo do caminho serial e do pool de processos com 1..N workers,
+reporta o speedup e confere que o CSV gerado é idêntico byte a byte.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_paralelo.py --linhas 500000 --arquivos 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'etl'))
+import transformation  # noqa: E402
+from bench_transformacao import gerar_trimestre  # noqa: E402
+
+
+def cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+
+def como_csv(df) -> bytes:
+    return df.to_csv(index=False, sep=';', float_format='%.2f').encode('utf-8')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=300_000, help='Linhas por arquivo trimestral.')
+    parser.add_argument('--arquivos', type=int, default=8)
+    parser.add_argument('--operadoras', type=int, default=1_000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        arquivos = []
+        for i in range(args.arquivos):
+            caminho = os.path.join(tmp, f'{i % 4 + 1}T{2020 + i // 4}.csv')
+            gerar_trimestre(caminho, args.linhas, args.operadoras, 2020 + i // 4, i % 4 + 1, seed=i)
+            arquivos.append(caminho)
+
+        print(f'{args.arquivos} arquivos x {args.linhas} linhas, {os.cpu_count()} núcleos disponíveis')
+
+        serial, t_serial = cronometrar(lambda: transformation.consolidar_em_memoria(arquivos))
+        referencia = como_csv(serial)
+        print(f'serial      {t_serial:8.2f} s')
+
+        workers = 1
+        while workers <= args.max_workers:
+            df, duracao = cronometrar(lambda: transformation.consolidar_em_paralelo(arquivos, workers=workers))
+            identico = como_csv(df) == referencia
+            print(f'{workers:>2} workers  {duracao:8.2f} s  speedup {t_serial / duracao:5.2f}x  idêntico={identico}')
+            workers *= 2
+
+
+if __name__ == '__main__':
+    main()
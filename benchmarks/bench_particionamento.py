@@ -0,0 +1,119 @@
+"""
+despesas_detalhadas com e sem particionamento por trimestre.
+
+Cria dois bancos com o DDL do projeto (um deles com 04_ddl_particionamento.sql
+e as partições criadas por load.garantir_particoes), carrega os mesmos dados
+sintéticos e mede: soma de um trimestre, soma de um ano, reconstrução do
+rollup de um trimestre (load.SQL_ROLLUPS_TRIMESTRE), varredura completa e a
+remoção de um trimestre (DELETE x DROP PARTITION). O EXPLAIN de cada consulta
+mostra as partições lidas (partition pruning).
+
+Precisa de um MySQL 8 local; usa as credenciais DB_* do .env e descarta os
+bancos ao final.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_particionamento.py --linhas 2000000 --operadoras 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_carga_mysql import criar_tabelas, gerar_enriquecido  # noqa: E402
+import load  # noqa: E402
+
+CONSULTAS = [
+    ('um trimestre', "SELECT SUM(valor_despesa) FROM despesas_detalhadas WHERE ano = {ano} AND trimestre = '2T'"),
+    ('um ano', 'SELECT trimestre, SUM(valor_despesa) FROM despesas_detalhadas WHERE ano = {ano} GROUP BY trimestre'),
+    ('tabela inteira', 'SELECT ano, SUM(valor_despesa) FROM despesas_detalhadas GROUP BY ano'),
+]
+
+
+def medir(cursor, sql: str, repeticoes: int, params=None) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def particoes_lidas(cursor, sql: str) -> str:
+    cursor.execute(f'EXPLAIN {sql}')
+    colunas = [c[0] for c in cursor.description]
+    linha = cursor.fetchall()[0]
+    return linha[colunas.index('partitions')] or '-'
+
+
+def preparar_banco(cursor, banco: str, dados, particionado: bool) -> None:
+    criar_tabelas(cursor, banco)
+    if particionado:
+        with open(os.path.join(load.SQL_DIR, load.SQL_FILE_PARTICIONAMENTO), encoding='utf-8') as f:
+            for comando in load.split_sql_statements(f.read()):
+                if not comando.upper().startswith('USE '):
+                    cursor.execute(comando)
+        load.garantir_particoes(cursor, dados.groupby(['ano', 'trimestre']).size().index)
+    load.carregar_dataframe(cursor, dados, 'despesas_detalhadas')
+    cursor.execute('ANALYZE TABLE despesas_detalhadas')
+    cursor.fetchall()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=1_000_000)
+    parser.add_argument('--operadoras', type=int, default=5_000)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    df = gerar_enriquecido(args.linhas, operadoras=args.operadoras)
+    # Linhas únicas por chave natural, como na carga real
+    df['CNPJ'] = (np.arange(len(df)) + 10**13).astype(str)
+    dados = load.preparar_despesas_detalhadas(df)
+    ano = int(dados['ano'].max())
+
+    conn = load.get_db_connection()
+    cursor = conn.cursor()
+    bancos = {'sem partição': 'bench_sem_particao', 'com partição': 'bench_com_particao'}
+    try:
+        resultados = {}
+        for rotulo, banco in bancos.items():
+            preparar_banco(cursor, banco, dados, particionado=(rotulo == 'com partição'))
+            medidas = {}
+            for nome, modelo in CONSULTAS:
+                sql = modelo.format(ano=ano)
+                medidas[nome] = (medir(cursor, sql, args.repeticoes), particoes_lidas(cursor, sql))
+
+            inicio = time.perf_counter()
+            cursor.execute('START TRANSACTION')
+            for comando in load.SQL_ROLLUPS_TRIMESTRE:
+                cursor.execute(comando, {'ano': ano, 'trimestre': '2T'})
+            cursor.execute('COMMIT')
+            medidas['rollup de um trimestre'] = (time.perf_counter() - inicio, '')
+
+            inicio = time.perf_counter()
+            if rotulo == 'com partição':
+                cursor.execute(f'ALTER TABLE despesas_detalhadas DROP PARTITION {load._nome_particao(ano, "1T")}')
+            else:
+                cursor.execute(f"DELETE FROM despesas_detalhadas WHERE ano = {ano} AND trimestre = '1T'")
+            medidas['remover um trimestre'] = (time.perf_counter() - inicio, '')
+            resultados[rotulo] = medidas
+
+        print(f'{len(dados):,} linhas, {dados.groupby(["ano", "trimestre"]).ngroups} trimestres')
+        print(f'{"operação":<24}{"sem partição":>14}{"com partição":>14}  partições lidas')
+        for nome in resultados['sem partição']:
+            sem, _ = resultados['sem partição'][nome]
+            com, lidas = resultados['com partição'][nome]
+            print(f'{nome:<24}{sem:13.3f}s{com:13.3f}s  {lidas}')
+    finally:
+        for banco in bancos.values():
+            cursor.execute(f'DROP DATABASE IF EXISTS {banco}')
+        cursor.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""
+Benchmark ponta a ponta do ETL sobre dados sintéticos (gerar_dados_ans.py):
+transformation.transformar_dados, enrichment.executar_pipeline_completo e
+load.run_load em vários tamanhos, com tempo, vazão e pico de memória.
+
+Cada etapa roda num processo filho, na ordem do pipeline, sobre a mesma pasta
+de dados; o pico de memória é o VmHWM do filho (inclui os imports e, na
+carga, a releitura dos resultados do enriquecimento). As medições são
+acrescentadas a um histórico JSONL (padrão: data/metricas/bench_ponta_a_ponta.jsonl,
+com o commit de cada execução) e comparadas com a última medição equivalente.
+A transformação escala com as linhas contábeis; enriquecimento e carga, com
+operadoras x trimestres (o consolidado), daí --operadoras e --trimestres.
+
+Banco: --banco simulado (padrão) troca a conexão do load.py por um cursor em
+memória que aceita os comandos e converte cada parâmetro com o
+MySQLConverter do conector, como o executemany faz antes de enviar; mede o
+lado cliente da carga (tokenização dos scripts SQL, conversão dos lotes). Como
+o MySQL em modo estrito, o cursor recusa textos maiores que a coluna
+declarada em 01_ddl_estrutura.sql (os dados sintéticos têm operadoras fora
+do CADOP, com UF 'N/D'). Com --banco mysql a carga vai para o MySQL das
+variáveis DB_* do .env. --incremental usa a carga por upsert (load.py --incremental).
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_ponta_a_ponta.py --tamanhos 100000 500000 2000000
+    python benchmarks/bench_ponta_a_ponta.py --tamanhos 1000000 --pasta /tmp/ans_bench --banco mysql
+"""
+import argparse
+import contextlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+RAIZ_PROJETO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+PASTA_ETL = os.path.join(RAIZ_PROJETO, 'src', 'etl')
+HISTORICO = os.path.join(RAIZ_PROJETO, 'data', 'metricas', 'bench_ponta_a_ponta.jsonl')
+DDL = os.path.join(RAIZ_PROJETO, 'database', '01_ddl_estrutura.sql')
+ETAPAS = ('transformacao', 'enriquecimento', 'carga')
+RESUMO_GERACAO = 'bench_geracao.json'
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import gerar_dados_ans  # noqa: E402
+
+
+def larguras_colunas(caminho: str = DDL) -> dict:
+    # {tabela: {coluna: n}} das colunas CHAR(n)/VARCHAR(n) do DDL
+    with open(caminho, encoding='utf-8') as f:
+        ddl = f.read()
+    larguras = {}
+    for tabela, corpo in re.findall(r'CREATE TABLE IF NOT EXISTS (\w+) \((.*?)\) ENGINE', ddl, re.S):
+        larguras[tabela] = {c: int(n) for c, n in re.findall(r'^\s*(\w+) (?:VAR)?CHAR\((\d+)\)', corpo, re.M)}
+    return larguras
+
+
+class CursorSimulado:
+    # Aceita o que o load.py executa; consultas devolvem vazio (ou 0 em fetchone)
+    def __init__(self):
+        from mysql.connector.conversion import MySQLConverter
+        self.conversor = MySQLConverter()
+        self.larguras = larguras_colunas()
+        self.comandos = 0
+        self.linhas = 0
+        self.rowcount = 0
+        self.description = None
+
+    def execute(self, comando, parametros=None):
+        self.comandos += 1
+
+    def _limites(self, comando):
+        # Largura de cada coluna do INSERT (None se não for texto); staging usa o DDL da tabela final
+        encontrado = re.search(r'INTO\s+(\w+)\s*\(([^)]*)\)', comando)
+        if not encontrado:
+            return None
+        tabela = max((t for t in self.larguras if encontrado.group(1).startswith(t)), key=len, default=None)
+        larguras = self.larguras.get(tabela, {})
+        return [(c.strip(), larguras.get(c.strip())) for c in encontrado.group(2).split(',')]
+
+    def executemany(self, comando, linhas):
+        # Mesma conversão por valor que o conector faz ao montar o INSERT de várias linhas
+        converter = self.conversor
+        limites = self._limites(comando)
+        for linha in linhas:
+            for valor in linha:
+                converter.quote(converter.escape(converter.to_mysql(valor)))
+            if limites:
+                for (coluna, largura), valor in zip(limites, linha):
+                    if largura is not None and isinstance(valor, str) and len(valor) > largura:
+                        raise ValueError(f"1406 Data too long for column '{coluna}': {valor!r}")
+        self.comandos += 1
+        self.linhas += len(linhas)
+
+    def nextset(self):
+        return None
+
+    def fetchall(self):
+        return []
+
+    def fetchone(self):
+        return (0,)
+
+    def close(self):
+        pass
+
+
+class ConexaoSimulada:
+    def __init__(self):
+        self.cursor_simulado = CursorSimulado()
+
+    def cursor(self):
+        return self.cursor_simulado
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        pass
+
+
+def pico_memoria_mb() -> float:
+    # VmHWM é do processo atual; o ru_maxrss do Linux atravessa o exec e
+    # herdaria o pico do processo pai (que gera os dados)
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            for linha in f:
+                if linha.startswith('VmHWM:'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def executar_etapa(etapa: str, banco: str, lote: int, incremental: bool = False) -> dict:
+    # Processo filho: ETL_RAIZ_DADOS já aponta para a pasta sintética
+    sys.path.insert(0, PASTA_ETL)
+    sys.path.insert(0, os.path.join(PASTA_ETL, 'analysis'))
+    import enrichment
+    import load
+    import transformation
+
+    extras = {}
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        if etapa == 'carga':
+            dataframes = enrichment.ler_resultados()
+            linhas = sum(len(df) for df in dataframes)
+            if banco == 'simulado':
+                conexao = ConexaoSimulada()
+                load.get_db_connection = lambda: conexao
+        base_mb = pico_memoria_mb()
+
+        inicio = time.perf_counter()
+        if etapa == 'transformacao':
+            df = transformation.transformar_dados()
+            linhas = None  # entrada: linhas contábeis, conhecidas pelo processo pai
+            extras['linhas_saida'] = len(df)
+        elif etapa == 'enriquecimento':
+            df_enriquecido, df_agg = enrichment.executar_pipeline_completo()
+            linhas = len(df_enriquecido)
+            extras['linhas_saida'] = len(df_agg)
+        else:
+            if not load.run_load(dataframes=dataframes, tamanho_lote=lote, incremental=incremental):
+                raise RuntimeError('carga no banco falhou')
+            if banco == 'simulado':
+                extras['comandos_sql'] = conexao.cursor_simulado.comandos
+        duracao = time.perf_counter() - inicio
+
+    return {
+        'segundos': round(duracao, 4),
+        'linhas': linhas,
+        'base_mb': round(base_mb, 1),
+        'pico_mb': round(pico_memoria_mb(), 1),
+        **extras,
+    }
+
+
+def medir(etapa: str, raiz: str, banco: str, lote: int, incremental: bool = False) -> dict:
+    comando = [sys.executable, os.path.abspath(__file__), '--filho', etapa, '--banco', banco, '--lote', str(lote)]
+    if incremental:
+        comando.append('--incremental')
+    ambiente = {**os.environ, 'ETL_RAIZ_DADOS': raiz, 'ETL_METRICAS': '0'}
+    saida = subprocess.run(comando, capture_output=True, text=True, env=ambiente)
+    if saida.returncode != 0:
+        return {'erro': saida.stderr.strip().splitlines()[-1] if saida.stderr.strip() else f'código {saida.returncode}'}
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def preparar_dados(raiz: str, linhas: int, trimestres: int, operadoras: int, seed: int) -> dict:
+    # Reaproveita a geração anterior se os parâmetros forem os mesmos (o gerador é determinístico)
+    parametros = {'linhas': linhas, 'trimestres': trimestres, 'operadoras': operadoras, 'seed': seed}
+    caminho_resumo = os.path.join(raiz, RESUMO_GERACAO)
+    if os.path.exists(caminho_resumo):
+        with open(caminho_resumo, encoding='utf-8') as f:
+            resumo = json.load(f)
+        if resumo.get('parametros') == parametros and all(os.path.exists(a) for a in resumo['arquivos']):
+            return resumo
+    shutil.rmtree(raiz, ignore_errors=True)
+    resumo = gerar_dados_ans.gerar(raiz, linhas, trimestres, operadoras, seed)
+    resumo['parametros'] = parametros
+    with open(caminho_resumo, 'w', encoding='utf-8') as f:
+        json.dump(resumo, f)
+    return resumo
+
+
+def commit_atual() -> str | None:
+    saida = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=RAIZ_PROJETO)
+    return saida.stdout.strip() or None
+
+
+def ultima_medicao(historico: list, registro: dict) -> dict | None:
+    campos = ('etapa', 'linhas_trimestre', 'trimestres', 'operadoras', 'banco', 'incremental')
+    anteriores = [h for h in historico if all(h.get(c) == registro.get(c) for c in campos) and 'segundos' in h]
+    return anteriores[-1] if anteriores else None
+
+
+def ler_historico(caminho: str) -> list:
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho, encoding='utf-8') as f:
+        return [json.loads(linha) for linha in f if linha.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[100_000, 500_000],
+                        help='Linhas por trimestre em cada rodada.')
+    parser.add_argument('--trimestres', type=int, default=3)
+    parser.add_argument('--operadoras', type=int, default=1_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--etapas', nargs='+', choices=ETAPAS, default=list(ETAPAS))
+    parser.add_argument('--banco', choices=['simulado', 'mysql'], default='simulado')
+    parser.add_argument('--lote', type=int, default=5000, help='Linhas por executemany na carga.')
+    parser.add_argument('--incremental', action='store_true', help='Carga por upsert dos trimestres alterados.')
+    parser.add_argument('--pasta', help='Pasta dos dados gerados (reaproveitados entre execuções).')
+    parser.add_argument('--historico', default=HISTORICO, help="Arquivo JSONL de resultados ('' para não gravar).")
+    parser.add_argument('--filho', choices=ETAPAS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        print(json.dumps(executar_etapa(args.filho, args.banco, args.lote, args.incremental)))
+        return
+
+    historico = ler_historico(args.historico) if args.historico else []
+    commit = commit_atual()
+    with tempfile.TemporaryDirectory() as tmp:
+        pasta = args.pasta or tmp
+        for tamanho in args.tamanhos:
+            raiz = os.path.abspath(os.path.join(pasta, f'{tamanho}x{args.trimestres}_{args.operadoras}'))
+            resumo = preparar_dados(raiz, tamanho, args.trimestres, args.operadoras, args.seed)
+            # Sem caches nem saídas de rodadas anteriores
+            for subpasta in ('processed', 'estado'):
+                shutil.rmtree(os.path.join(raiz, subpasta), ignore_errors=True)
+            print(f'\n{resumo["linhas"]:,} linhas contábeis ({tamanho:,} x {args.trimestres} trimestres), '
+                  f'{args.operadoras:,} operadoras, {resumo["bytes"] / 2**20:.1f} MiB')
+
+            for etapa in args.etapas:
+                r = medir(etapa, raiz, args.banco, args.lote, args.incremental)
+                registro = {
+                    'data': datetime.now().isoformat(timespec='seconds'), 'commit': commit, 'etapa': etapa,
+                    'linhas_trimestre': tamanho, 'trimestres': args.trimestres, 'operadoras': args.operadoras,
+                    'banco': args.banco, **({'incremental': True} if args.incremental else {}), **r,
+                }
+                if 'erro' in r:
+                    print(f'  {etapa:<15} falhou: {r["erro"]}')
+                    continue
+                if registro['linhas'] is None:
+                    registro['linhas'] = resumo['linhas']
+                    registro['mib_s'] = round(resumo['bytes'] / 2**20 / r['segundos'], 1)
+                registro['linhas_s'] = round(registro['linhas'] / r['segundos'], 1)
+
+                anterior = ultima_medicao(historico, registro)
+                comparacao = ''
+                if anterior:
+                    variacao = (r['segundos'] / anterior['segundos'] - 1) * 100
+                    comparacao = f'  {variacao:+6.1f}% vs {anterior.get("commit") or "?"}'
+                print(f'  {etapa:<15}{r["segundos"]:9.2f} s {registro["linhas_s"]:13,.0f} linhas/s  '
+                      f'pico RSS {r["pico_mb"]:7.1f} MiB{comparacao}')
+
+                historico.append(registro)
+                if args.historico:
+                    os.makedirs(os.path.dirname(os.path.abspath(args.historico)), exist_ok=True)
+                    with open(args.historico, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(registro, ensure_ascii=False) + '\n')
+
+
+if __name__ == '__main__':
+    main()
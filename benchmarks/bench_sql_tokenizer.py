@@ -0,0 +1,140 @@
+"""
+Benchmark e corpus de casos do tokenizador SQL de load.py.
+
+1. Confere load.split_sql_statements contra um corpus de casos difíceis
+   (aspas escapadas e dobradas, comentários no meio da linha, -- sem espaço
+   (não é comentário), blocos /* */,
+   comentários executáveis, crases, DELIMITER de procedures).
+2. Compara o tempo com o separador antigo (caractere a caractere, com
+   remoção só de comentários de linha inteira) em scripts de vários MB.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_sql_tokenizer.py --mb 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'etl'))
+import load  # noqa: E402
+
+CORPUS = [
+    ("SELECT 1; SELECT 2", ["SELECT 1", "SELECT 2"]),
+    ("SELECT 'a;b';", ["SELECT 'a;b'"]),
+    ("SELECT 'it''s; ok';", ["SELECT 'it''s; ok'"]),
+    ("SELECT 'barra \\' ; ainda string';", ["SELECT 'barra \\' ; ainda string'"]),
+    ('SELECT "dupla ; \\" ; "" ;";', ['SELECT "dupla ; \\" ; "" ;"']),
+    ("SELECT `col;una` FROM `t``x`;", ["SELECT `col;una` FROM `t``x`"]),
+    ("SELECT 1 -- comentario; com delimitador\n, 2;", ["SELECT 1  \n, 2"]),
+    ("SELECT 1 # hash; comentario\n;", ["SELECT 1"]),
+    ("SELECT /* bloco ; \n multi-linha */ 1;", ["SELECT   1"]),
+    ("SELECT '-- nao e comentario', '/* nem isto */';", ["SELECT '-- nao e comentario', '/* nem isto */'"]),
+    ("SELECT /*!40101 SQL_NO_CACHE */ 1;", ["SELECT /*!40101 SQL_NO_CACHE */ 1"]),
+    # -- só é comentário seguido de espaço/controle ou no fim do texto (regra do MySQL)
+    ("SELECT 7--3;", ["SELECT 7--3"]),
+    ("SELECT 7 --3 -- menos tres;\n;", ["SELECT 7 --3"]),
+    ("SELECT 1 --\tcomentario; com tab\n, 2 --", ["SELECT 1  \n, 2"]),
+    ("--sem espaco nao e comentario\n;", ["--sem espaco nao e comentario"]),
+    ("-- so comentario;\n/* outro; */\n;;", []),
+    (
+        "DELIMITER $$\nCREATE PROCEDURE p()\nBEGIN\n  SELECT 1;\n  SELECT 'x;y';\nEND$$\nDELIMITER ;\nCALL p();",
+        ["CREATE PROCEDURE p()\nBEGIN\n  SELECT 1;\n  SELECT 'x;y';\nEND", "CALL p()"],
+    ),
+    ("delimiter //\nSELECT 1//\ndelimiter ;\nSELECT 2;", ["SELECT 1", "SELECT 2"]),
+    ("SELECT 'sem fim; ", ["SELECT 'sem fim;"]),
+    ("SELECT 1 /* sem fim ;", ["SELECT 1"]),
+    ("SELECT 'multi\nlinha; dentro'\n;", ["SELECT 'multi\nlinha; dentro'"]),
+    ("INSERT INTO t VALUES ('\\\\');SELECT 2;", ["INSERT INTO t VALUES ('\\\\')", "SELECT 2"]),
+]
+
+
+def split_antigo(text):
+    # Implementação anterior: limpeza de linhas de comentário + laço por caractere
+    linhas = [
+        linha for linha in text.split('\n')
+        if linha.strip() and not linha.strip().startswith('--') and not linha.strip().startswith('#')
+    ]
+    text = '\n'.join(linhas)
+    commands, atual, in_quote, escape = [], [], None, False
+    for char in text:
+        if escape:
+            atual.append(char)
+            escape = False
+            continue
+        if char == '\\':
+            escape = True
+            atual.append(char)
+            continue
+        if in_quote:
+            atual.append(char)
+            if char == in_quote:
+                in_quote = None
+        elif char in ("'", '"'):
+            in_quote = char
+            atual.append(char)
+        elif char == ';':
+            cmd = ''.join(atual).strip()
+            if cmd:
+                commands.append(cmd)
+            atual = []
+        else:
+            atual.append(char)
+    cmd = ''.join(atual).strip()
+    if cmd:
+        commands.append(cmd)
+    return commands
+
+
+def gerar_script(tamanho_mb: float) -> str:
+    """Script com comentário em todo comando (pior caso para o tokenizador)."""
+    bloco = (
+        "-- carga sintetica\n"
+        "INSERT INTO despesas_detalhadas (registro_ans, razao_social, valor_despesa) "
+        "VALUES ('300001', 'OPERADORA D''OESTE; LTDA', 1234.56), /* lote */ "
+        "('300002', \"SAUDE \\\"PLENA\\\"\", 99.9); # fim da linha\n"
+    )
+    return bloco * max(1, int(tamanho_mb * 2**20 / len(bloco)))
+
+
+def gerar_dump(tamanho_mb: float, linhas_por_insert: int = 500) -> str:
+    """Script no formato de dump: INSERTs de várias linhas, sem comentários."""
+    linha = "('300001', 'OPERADORA D''OESTE; LTDA', '2025', '1T', 1234.56)"
+    comando = (
+        "INSERT INTO despesas_detalhadas (registro_ans, razao_social, ano, trimestre, valor_despesa) VALUES\n"
+        + ",\n".join([linha] * linhas_por_insert) + ";\n"
+    )
+    return comando * max(1, int(tamanho_mb * 2**20 / len(comando)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mb', type=float, nargs='+', default=[1, 4])
+    args = parser.parse_args()
+
+    falhas = 0
+    for script, esperado in CORPUS:
+        obtido = load.split_sql_statements(script)
+        if obtido != esperado:
+            falhas += 1
+            print(f'FALHA: {script!r}\n  esperado {esperado!r}\n  obtido   {obtido!r}')
+    print(f'Corpus: {len(CORPUS) - falhas}/{len(CORPUS)} casos corretos')
+
+    for mb in args.mb:
+        for tipo, gerar in (('comentado', gerar_script), ('dump', gerar_dump)):
+            script = gerar(mb)
+            inicio = time.perf_counter()
+            novos = load.split_sql_statements(script)
+            t_novo = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            split_antigo(script)
+            t_antigo = time.perf_counter() - inicio
+            print(f'{tipo:>9} {len(script) / 2**20:5.1f} MB, {len(novos):,} comandos: antigo {t_antigo:6.2f} s  '
+                  f'tokenizador {t_novo:6.2f} s  ({len(script) / 2**20 / t_novo:6.1f} MB/s)')
+
+    if falhas:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark de memoria e vazao do transformation.transformar_dados.
+
+Compara o caminho em memoria (read_csv completo + concat) com o modo
+streaming (leitura em blocos + soma parcial) sobre arquivos sinteticos.
+Cada modo roda num processo filho; o pico de memoria e o pico de RSS do
+filho (ru_maxrss), que inclui os buffers do pandas/numpy.
+
+--gb define o tamanho total gerado em vez de --linhas; --pasta guarda (e
+reaproveita) os arquivos gerados; --etl aponta para outro src/etl, por
+exemplo um git worktree da versao anterior, para medir antes/depois sobre os
+mesmos arquivos.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_transformacao.py --linhas 2000000 --arquivos 4
+    git worktree add /tmp/antes HEAD~1
+    python benchmarks/bench_transformacao.py --gb 5 --arquivos 8 --pasta /tmp/ans5gb --etl /tmp/antes/src/etl
+    python benchmarks/bench_transformacao.py --gb 5 --arquivos 8 --pasta /tmp/ans5gb
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+PASTA_ETL = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'etl')
+BLOCO_GERACAO = 1_000_000
+BYTES_POR_LINHA = 52  # media das linhas geradas abaixo, para converter --gb em linhas
+
+
+def gerar_trimestre(caminho: str, linhas: int, operadoras: int, ano: int, trimestre: int, seed: int) -> None:
+    # Gravado em blocos, para gerar arquivos maiores que a memoria
+    rng = np.random.default_rng(seed)
+    contas = np.array(['411111', '412110', '311111', '121111', '461100'])
+    for inicio in range(0, linhas, BLOCO_GERACAO):
+        tamanho = min(BLOCO_GERACAO, linhas - inicio)
+        valores = rng.integers(1, 50_000_000, size=tamanho)
+        pd.DataFrame({
+            'DATA': f'{ano}-{(trimestre - 1) * 3 + 1:02d}-01',
+            'REG_ANS': (300000 + rng.integers(0, operadoras, size=tamanho)).astype(str),
+            'CD_CONTA_CONTABIL': contas[rng.integers(0, len(contas), size=tamanho)],
+            'DESCRICAO': 'CONTA SINTETICA',
+            'VL_SALDO_INICIAL': '0',
+            'VL_SALDO_FINAL': [f'{v:,}'.replace(',', '.') for v in valores],
+        }).to_csv(caminho, sep=';', index=False, encoding='latin1',
+                  mode='w' if inicio == 0 else 'a', header=inicio == 0)
+
+
+def executar_modo(modo: str, arquivos: list, chunk: int) -> dict:
+    # Processo filho: importa a versao pedida do transformation e mede um modo
+    import resource
+    import transformation
+
+    inicio = time.perf_counter()
+    if modo == 'memoria':
+        df = transformation.consolidar_em_memoria(arquivos)
+    else:
+        df = transformation.consolidar_em_streaming(arquivos, tamanho_chunk=chunk)
+    duracao = time.perf_counter() - inicio
+    csv = df.to_csv(index=False, sep=';', float_format='%.2f').encode('utf-8')
+    return {
+        'segundos': duracao,
+        'pico_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'sha256': hashlib.sha256(csv).hexdigest(),
+    }
+
+
+def medir(modo: str, arquivos: list, chunk: int, etl: str) -> dict:
+    comando = [sys.executable, os.path.abspath(__file__), '--filho', modo, '--chunk', str(chunk), '--etl', etl,
+               '--arquivos-filho', *arquivos]
+    saida = subprocess.run(comando, capture_output=True, text=True, env={**os.environ, 'ETL_METRICAS': '0'})
+    if saida.returncode != 0:
+        return {'erro': saida.stderr.strip().splitlines()[-1] if saida.stderr.strip() else f'código {saida.returncode}'}
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=500_000, help='Linhas por arquivo trimestral.')
+    parser.add_argument('--gb', type=float, help='Tamanho total dos arquivos gerados (substitui --linhas).')
+    parser.add_argument('--arquivos', type=int, default=3)
+    parser.add_argument('--operadoras', type=int, default=1_000)
+    parser.add_argument('--chunk', type=int, default=200_000)
+    parser.add_argument('--modos', nargs='+', choices=['memoria', 'streaming'], default=['memoria', 'streaming'])
+    parser.add_argument('--pasta', help='Pasta dos arquivos gerados (reaproveitados se ja existirem).')
+    parser.add_argument('--etl', default=PASTA_ETL, help='src/etl a medir (padrao: o deste repositorio).')
+    parser.add_argument('--filho', choices=['memoria', 'streaming'], help=argparse.SUPPRESS)
+    parser.add_argument('--arquivos-filho', nargs='*', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        sys.path.insert(0, args.etl)
+        print(json.dumps(executar_modo(args.filho, args.arquivos_filho, args.chunk)))
+        return
+
+    linhas = int(args.gb * 2**30 / BYTES_POR_LINHA / args.arquivos) if args.gb else args.linhas
+    with tempfile.TemporaryDirectory() as tmp:
+        pasta = args.pasta or tmp
+        os.makedirs(pasta, exist_ok=True)
+        arquivos = []
+        for i in range(args.arquivos):
+            caminho = os.path.join(pasta, f'{i % 4 + 1}T{2020 + i // 4}.csv')
+            if not os.path.exists(caminho):
+                gerar_trimestre(caminho, linhas, args.operadoras, 2020 + i // 4, i % 4 + 1, seed=i)
+            arquivos.append(caminho)
+
+        tamanho = sum(os.path.getsize(a) for a in arquivos)
+        total_linhas = linhas * args.arquivos
+        print(f'{args.arquivos} arquivos, {total_linhas:,} linhas, {tamanho / 2**30:.2f} GiB, '
+              f'{args.operadoras} operadoras ({os.path.abspath(args.etl)})')
+
+        resultados = {}
+        for modo in args.modos:
+            r = medir(modo, arquivos, args.chunk, args.etl)
+            resultados[modo] = r
+            if 'erro' in r:
+                print(f'{modo:<10} falhou: {r["erro"]}')
+                continue
+            print(f'{modo:<10} {r["segundos"]:8.2f} s  {total_linhas / r["segundos"]:12,.0f} linhas/s  '
+                  f'{tamanho / 2**20 / r["segundos"]:7.1f} MiB/s  pico RSS {r["pico_mb"]:8.1f} MiB')
+
+        hashes = {r['sha256'] for r in resultados.values() if 'sha256' in r}
+        if len(hashes) > 1:
+            print('Resultados DIFERENTES entre os modos!')
+        elif hashes:
+            print(f'Resultado sha256 {hashes.pop()[:16]}')
+
+
+if __name__ == '__main__':
+    main()
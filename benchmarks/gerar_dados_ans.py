@@ -0,0 +1,139 @@
+"""
+Gerador determinístico de dados no formato da ANS, para benchmarks e testes
+manuais sem acesso à rede.
+
+Grava em <raiz>/raw:
+  - um ZIP por trimestre (1T2025.zip contendo 1T2025.csv), como os baixados
+    pela extração: DATA;REG_ANS;CD_CONTA_CONTABIL;DESCRICAO;VL_SALDO_INICIAL;
+    VL_SALDO_FINAL, latin1, valores inteiros com '.' como separador de milhar;
+  - Relatorio_Cadop.csv com as operadoras usadas nos trimestres (uma parte
+    fica de fora, como operadoras canceladas), nomes acentuados e CNPJ sem
+    máscara.
+A mesma semente gera sempre os mesmos bytes (inclusive os ZIPs, gravados com
+data fixa), então as impressões digitais do pipeline não mudam entre gerações.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/gerar_dados_ans.py --raiz /tmp/ans --linhas 1000000 --trimestres 4
+    python src/etl/pipeline.py --raiz /tmp/ans --sem-download --sem-carga
+"""
+import argparse
+import io
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+BLOCO_GERACAO = 500_000
+DATA_ZIP = (2025, 1, 1, 0, 0, 0)
+# Contas do plano da ANS: grupo 4 (despesas) e alguns de ativo/receita, que a transformação descarta
+CONTAS = np.array(['411111', '411112', '412110', '414119', '461100', '311111', '121111', '211111'])
+DESCRICOES = np.array([
+    'EVENTOS CONHECIDOS - CONSULTAS', 'EVENTOS CONHECIDOS - EXAMES', 'EVENTOS CONHECIDOS - TERAPIAS',
+    'EVENTOS - INTERNAÇÕES', 'DESPESAS ADMINISTRATIVAS', 'CONTRAPRESTAÇÕES EFETIVAS',
+    'APLICAÇÕES FINANCEIRAS', 'PROVISÕES TÉCNICAS',
+])
+UFS = np.array(['SP', 'RJ', 'MG', 'RS', 'PR', 'BA', 'CE', 'PE', 'SC', 'GO', 'DF', 'ES'])
+MODALIDADES = np.array(['Cooperativa Médica', 'Medicina de Grupo', 'Autogestão', 'Seguradora Especializada em Saúde',
+                        'Odontologia de Grupo', 'Filantropia'])
+PRIMEIRO_REGISTRO = 300000
+FRACAO_FORA_DO_CADOP = 0.03
+
+
+def trimestres_recentes(quantidade: int, ano_final: int = 2025, trimestre_final: int = 4) -> list:
+    # [(ano, trimestre), ...] do mais antigo ao mais recente
+    indice_final = ano_final * 4 + trimestre_final - 1
+    return [(i // 4, i % 4 + 1) for i in range(indice_final - quantidade + 1, indice_final + 1)]
+
+
+def _bloco_trimestre(rng, tamanho: int, operadoras: int, ano: int, trimestre: int) -> pd.DataFrame:
+    # Operadoras grandes têm mais lançamentos (distribuição de Zipf truncada)
+    registros = PRIMEIRO_REGISTRO + (rng.zipf(1.3, tamanho) - 1) % operadoras
+    contas = rng.integers(0, len(CONTAS), tamanho)
+    valores = rng.lognormal(13, 2.5, tamanho).astype('int64')
+    valores[rng.random(tamanho) < 0.05] = 0  # lançamentos zerados
+    valores[rng.random(tamanho) < 0.02] *= -1  # estornos
+    texto = pd.Series(valores).map('{:,}'.format).str.replace(',', '.', regex=False)
+    return pd.DataFrame({
+        'DATA': f'{ano}-{(trimestre - 1) * 3 + 1:02d}-01',
+        'REG_ANS': registros,
+        'CD_CONTA_CONTABIL': CONTAS[contas],
+        'DESCRICAO': DESCRICOES[contas],
+        'VL_SALDO_INICIAL': '0',
+        'VL_SALDO_FINAL': texto,
+    })
+
+
+def gerar_trimestre(pasta: str, linhas: int, operadoras: int, ano: int, trimestre: int, seed: int) -> str:
+    nome = f'{trimestre}T{ano}'
+    caminho = os.path.join(pasta, f'{nome}.zip')
+    rng = np.random.default_rng([seed, ano, trimestre])
+    info = zipfile.ZipInfo(f'{nome}.csv', date_time=DATA_ZIP)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    # Gravado em blocos direto no ZIP, para gerar trimestres maiores que a memória
+    with zipfile.ZipFile(caminho, 'w') as zf, zf.open(info, 'w', force_zip64=True) as membro, \
+            io.TextIOWrapper(membro, encoding='latin1', newline='') as saida:
+        for inicio in range(0, linhas, BLOCO_GERACAO):
+            bloco = _bloco_trimestre(rng, min(BLOCO_GERACAO, linhas - inicio), operadoras, ano, trimestre)
+            bloco.to_csv(saida, sep=';', index=False, header=inicio == 0)
+    return caminho
+
+
+def gerar_cadop(pasta: str, operadoras: int, seed: int) -> str:
+    caminho = os.path.join(pasta, 'Relatorio_Cadop.csv')
+    rng = np.random.default_rng([seed, 0])
+    registros = np.arange(PRIMEIRO_REGISTRO, PRIMEIRO_REGISTRO + operadoras)
+    # Operadoras canceladas saem do CADOP: a transformação usa "Operadora <REG_ANS>"
+    registros = registros[rng.random(operadoras) >= FRACAO_FORA_DO_CADOP]
+    quantidade = len(registros)
+    pd.DataFrame({
+        'REGISTRO_OPERADORA': registros,
+        'CNPJ': [f'{c:014d}' for c in rng.choice(10**13, quantidade, replace=False) + 10**13],
+        'Razao_Social': [f'OPERADORA DE SAÚDE {r} LTDA' for r in registros],
+        'Nome_Fantasia': [f'SAÚDE {r}' for r in registros],
+        'Modalidade': MODALIDADES[rng.integers(0, len(MODALIDADES), quantidade)],
+        'Logradouro': 'RUA DAS ACÁCIAS',
+        'Numero': rng.integers(1, 5000, quantidade),
+        'Cidade': 'São Paulo',
+        'UF': UFS[rng.integers(0, len(UFS), quantidade)],
+        'Data_Registro_ANS': '2001-01-01',
+    }).to_csv(caminho, sep=';', index=False, encoding='latin1')
+    return caminho
+
+
+def gerar(raiz: str, linhas: int, trimestres: int = 3, operadoras: int = 1_000, seed: int = 0) -> dict:
+    '''
+    Gera os trimestres mais recentes (terminando em 4T2025) e o CADOP em
+    <raiz>/raw. Arquivos já existentes são sobrescritos. Retorna um resumo.
+    '''
+    pasta = os.path.join(raiz, 'raw')
+    os.makedirs(pasta, exist_ok=True)
+    arquivos = [gerar_trimestre(pasta, linhas, operadoras, ano, t, seed)
+                for ano, t in trimestres_recentes(trimestres)]
+    arquivos.append(gerar_cadop(pasta, operadoras, seed))
+    return {
+        'arquivos': arquivos,
+        'linhas': linhas * trimestres,
+        'bytes': sum(os.path.getsize(a) for a in arquivos),
+        'operadoras': operadoras,
+        'seed': seed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Gera trimestres contábeis e CADOP sintéticos no formato da ANS.')
+    parser.add_argument('--raiz', required=True, help='Pasta de dados (os arquivos vão para <raiz>/raw).')
+    parser.add_argument('--linhas', type=int, default=200_000, help='Linhas por trimestre.')
+    parser.add_argument('--trimestres', type=int, default=3)
+    parser.add_argument('--operadoras', type=int, default=1_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    resumo = gerar(args.raiz, args.linhas, args.trimestres, args.operadoras, args.seed)
+    for arquivo in resumo['arquivos']:
+        print(f'{os.path.getsize(arquivo) / 2**20:9.1f} MiB  {arquivo}')
+    print(f'{resumo["linhas"]:,} linhas contábeis, {args.operadoras:,} operadoras (seed {args.seed}).')
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,7 @@
 CREATE DATABASE IF NOT EXISTS intuitive_care_test;
 USE intuitive_care_test;
 
---Tabela de Endereços das Operadoras para evitar redundância
+-- Tabela de Endereços das Operadoras para evitar redundância
 CREATE TABLE IF NOT EXISTS enderecos_operadoras (
     id_endereco BIGINT AUTO_INCREMENT PRIMARY KEY,
     logradouro VARCHAR(255),
@@ -16,7 +16,7 @@ CREATE TABLE IF NOT EXISTS enderecos_operadoras (
     INDEX idx_cidade_uf (cidade, uf)
 ) ENGINE=InnoDB DEFAULT CHARSET=latin1;
 
---Tabela de Operadoras (Dados Cadastrais)
+-- Tabela de Operadoras (Dados Cadastrais)
 CREATE TABLE IF NOT EXISTS operadoras (
     registro_ans VARCHAR(20) NOT NULL,
     cnpj VARCHAR(20),
@@ -41,7 +41,7 @@ CREATE TABLE IF NOT EXISTS operadoras (
     INDEX idx_cnpj (cnpj)
 ) ENGINE=InnoDB DEFAULT CHARSET=latin1;
 
---Tabela de Despesas Detalhadas
+-- Tabela de Despesas Detalhadas
 CREATE TABLE IF NOT EXISTS despesas_detalhadas (
     id BIGINT AUTO_INCREMENT PRIMARY KEY,
     registro_ans VARCHAR(20) NOT NULL,
@@ -54,12 +54,43 @@ CREATE TABLE IF NOT EXISTS despesas_detalhadas (
     modalidade VARCHAR(100),
     uf CHAR(2),
     data_evento DATE,
+    -- Carga que gravou a linha (load.py --incremental remove linhas que sumiram da fonte)
+    id_carga BIGINT,
     
+    -- Chave natural: recarregar um trimestre atualiza as linhas em vez de duplicá-las
+    -- (em bancos criados antes dela, o load.py acrescenta id_carga e a chave)
+    -- (o CNPJ diferencia operadoras sem cruzamento no CADOP, todas com registro 'N/D';
+    -- linhas do consolidado com a mesma chave são somadas pelo load.py antes da carga)
+    UNIQUE KEY uk_operadora_periodo (registro_ans, cnpj, ano, trimestre),
     INDEX idx_registro (registro_ans),
     INDEX idx_ano_trimestre (ano, trimestre)
 ) ENGINE=InnoDB DEFAULT CHARSET=latin1;
 
---Tabela de Despesas Agregadas (Analytics)
+-- Rollup Trimestral: total e quantidade de lançamentos por operadora/trimestre
+-- (mantida pelo load.py logo após a importação; base das queries analíticas)
+CREATE TABLE IF NOT EXISTS despesas_trimestrais (
+    registro_ans VARCHAR(20) NOT NULL,
+    ano INT NOT NULL,
+    trimestre CHAR(2) NOT NULL,
+    total DECIMAL(17,2),
+    n_lancamentos INT,
+    
+    PRIMARY KEY (registro_ans, ano, trimestre),
+    INDEX idx_periodo (ano, trimestre)
+) ENGINE=InnoDB DEFAULT CHARSET=latin1;
+
+-- Média de Mercado por Trimestre (derivada do rollup)
+CREATE TABLE IF NOT EXISTS media_mercado_trimestral (
+    ano INT NOT NULL,
+    trimestre CHAR(2) NOT NULL,
+    media_mercado DECIMAL(17,2),
+    total_mercado DECIMAL(19,2),
+    qtd_operadoras INT,
+    
+    PRIMARY KEY (ano, trimestre)
+) ENGINE=InnoDB DEFAULT CHARSET=latin1;
+
+-- Tabela de Despesas Agregadas (Analytics)
 CREATE TABLE IF NOT EXISTS despesas_agregadas (
     razao_social VARCHAR(255),
     uf CHAR(2),
@@ -71,4 +102,24 @@ CREATE TABLE IF NOT EXISTS despesas_agregadas (
     
     PRIMARY KEY (registro_ans),
     INDEX idx_total (total_despesas DESC)
-) ENGINE=InnoDB DEFAULT CHARSET=latin1;
\ No newline at end of file
+) ENGINE=InnoDB DEFAULT CHARSET=latin1;
+
+-- Controle de Cargas: geração incrementada pelo load.py ao fim de cada carga
+-- (a API usa a geração para invalidar o cache das consultas analíticas)
+CREATE TABLE IF NOT EXISTS controle_carga (
+    id TINYINT PRIMARY KEY,
+    geracao BIGINT NOT NULL DEFAULT 0,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=latin1;
+
+-- Controle de Trimestres: impressão digital do conteúdo carregado de cada trimestre
+-- (load.py --incremental só regrava os trimestres cuja impressão mudou)
+CREATE TABLE IF NOT EXISTS controle_trimestres (
+    ano INT NOT NULL,
+    trimestre CHAR(2) NOT NULL,
+    impressao VARCHAR(32) NOT NULL,
+    linhas INT,
+    carregado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (ano, trimestre)
+) ENGINE=InnoDB DEFAULT CHARSET=latin1;
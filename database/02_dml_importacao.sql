@@ -41,14 +41,14 @@ LINES TERMINATED BY '\n'
 IGNORE 1 ROWS;
 
 
---NORMALIZAÇÃO: Endereços
+-- NORMALIZAÇÃO: Endereços
 
 INSERT IGNORE INTO enderecos_operadoras (logradouro, numero, complemento, bairro, cidade, uf, cep)
 SELECT DISTINCT logradouro, numero, complemento, bairro, cidade, uf, cep
 FROM temp_cadop;
 
 
---NORMALIZAÇÃO: Operadoras
+-- NORMALIZAÇÃO: Operadoras
 
 INSERT IGNORE INTO operadoras (
     registro_ans, cnpj, razao_social, nome_fantasia, modalidade, 
@@ -77,18 +77,25 @@ DROP TEMPORARY TABLE temp_cadop;
 
 
 -- IMPORTAÇÃO: Despesas (Consolidado)
+-- REPLACE: recarregar o arquivo atualiza as linhas pela chave natural
+-- (uk_operadora_periodo) em vez de manter os valores antigos. Linhas que
+-- sumiram do consolidado continuam na tabela; para removê-las use
+-- load.py --direto (regrava a tabela) ou --incremental.
 
 LOAD DATA LOCAL INFILE 'C:/Users/paulo/Documents/Teste_IntuitiveCare/data/processed/consolidado.csv'
-INTO TABLE despesas_detalhadas
+REPLACE INTO TABLE despesas_detalhadas
 CHARACTER SET utf8mb4             
 FIELDS TERMINATED BY ';'
 LINES TERMINATED BY '\r\n'         
 IGNORE 1 ROWS
-(cnpj, razao_social, trimestre, @v_ano, @v_valor, cnpj_valido, registro_ans, modalidade, uf)
+(cnpj, razao_social, @v_trimestre, @v_ano, @v_valor, cnpj_valido, registro_ans, modalidade, @v_uf)
 SET 
+    -- 'N/D' não cabe em CHAR(2): mesmo marcador 'ND' da carga direta
+    trimestre = IF(@v_trimestre = 'N/D', 'ND', @v_trimestre),
+    uf = IF(@v_uf = 'N/D', 'ND', @v_uf),
     ano = CAST(@v_ano AS UNSIGNED),
     valor_despesa = CAST(REPLACE(@v_valor, ',', '.') AS DECIMAL(15,2)),
-    data_evento = STR_TO_DATE(CONCAT(@v_ano, '-', CASE trimestre WHEN '1T' THEN '01' WHEN '2T' THEN '04' WHEN '3T' THEN '07' ELSE '10' END, '-01'), '%Y-%m-%d');
+    data_evento = STR_TO_DATE(CONCAT(@v_ano, '-', CASE @v_trimestre WHEN '1T' THEN '01' WHEN '2T' THEN '04' WHEN '3T' THEN '07' ELSE '10' END, '-01'), '%Y-%m-%d');
 
 
 -- IMPORTAÇÃO: Agregadas
@@ -98,8 +105,9 @@ CHARACTER SET utf8mb4
 FIELDS TERMINATED BY ';'
 LINES TERMINATED BY '\r\n'
 IGNORE 1 ROWS
-(razao_social, uf, registro_ans, modalidade, @v_total, @v_media, @v_desvio)
+(razao_social, @v_uf, registro_ans, modalidade, @v_total, @v_media, @v_desvio)
 SET
+    uf = IF(@v_uf = 'N/D', 'ND', @v_uf),
     total_despesas = CAST(REPLACE(@v_total, ',', '.') AS DECIMAL(15,2)),
     media_trimestral = CAST(REPLACE(@v_media, ',', '.') AS DECIMAL(15,2)),
     desvio_padrao = CAST(REPLACE(@v_desvio, ',', '.') AS DECIMAL(15,2));
\ No newline at end of file
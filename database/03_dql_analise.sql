@@ -9,27 +9,26 @@ USE intuitive_care_test;
 --          cálculo de crescimento (divisão por zero), e operadoras sem dados no
 --          3T não representam crescimento, mas sim saída do mercado.
 
-WITH primeiro_trimestre AS (
-    SELECT registro_ans, SUM(valor_despesa) as valor_inicial
-    FROM despesas_detalhadas
-    WHERE ano = 2025 AND trimestre = '1T'
-    GROUP BY registro_ans
-),
-ultimo_trimestre AS (
-    SELECT registro_ans, SUM(valor_despesa) as valor_final
-    FROM despesas_detalhadas
-    WHERE ano = 2025 AND trimestre = '3T'
-    GROUP BY registro_ans
-)
+-- PERÍODO: primeiro e último trimestres efetivamente carregados (sem ano fixo),
+--          lidos do rollup media_mercado_trimestral mantido pelo load.py.
+--          'ND' (data inválida) ordenaria depois do 4T e não é trimestre.
+
+SET @ano_inicial = (SELECT ano FROM media_mercado_trimestral WHERE trimestre <> 'ND' ORDER BY ano, trimestre LIMIT 1);
+SET @trimestre_inicial = (SELECT trimestre FROM media_mercado_trimestral WHERE trimestre <> 'ND' ORDER BY ano, trimestre LIMIT 1);
+SET @ano_final = (SELECT ano FROM media_mercado_trimestral WHERE trimestre <> 'ND' ORDER BY ano DESC, trimestre DESC LIMIT 1);
+SET @trimestre_final = (SELECT trimestre FROM media_mercado_trimestral WHERE trimestre <> 'ND' ORDER BY ano DESC, trimestre DESC LIMIT 1);
+
 SELECT 
     o.razao_social,
-    pt.valor_inicial,
-    ut.valor_final,
-    ROUND(((ut.valor_final - pt.valor_inicial) / pt.valor_inicial) * 100, 2) AS crescimento_percentual
+    pt.total AS valor_inicial,
+    ut.total AS valor_final,
+    ROUND(((ut.total - pt.total) / pt.total) * 100, 2) AS crescimento_percentual
 FROM operadoras o
-JOIN primeiro_trimestre pt ON o.registro_ans = pt.registro_ans
-JOIN ultimo_trimestre ut ON o.registro_ans = ut.registro_ans
-WHERE pt.valor_inicial > 0
+JOIN despesas_trimestrais pt
+    ON o.registro_ans = pt.registro_ans AND pt.ano = @ano_inicial AND pt.trimestre = @trimestre_inicial
+JOIN despesas_trimestrais ut
+    ON o.registro_ans = ut.registro_ans AND ut.ano = @ano_final AND ut.trimestre = @trimestre_final
+WHERE pt.total > 0
 ORDER BY crescimento_percentual DESC
 LIMIT 5;
 
@@ -63,26 +62,18 @@ LIMIT 5;
 -- 3. Performance: MySQL 8.0 otimiza bem CTEs não-recursivas, sendo superior a
 --    subqueries correlacionadas em grandes volumes de dados.
 
-WITH despesas_consolidadas_trimestre AS (
-    -- Agrega despesas por operadora e trimestre
-    SELECT registro_ans, trimestre, SUM(valor_despesa) as despesa_total_trimestre
-    FROM despesas_detalhadas
-    GROUP BY registro_ans, trimestre
-),
-media_mercado_por_trimestre AS (
-    -- Calcula a média de despesas por trimestre
-    SELECT trimestre, AVG(despesa_total_trimestre) as media_mercado
-    FROM despesas_consolidadas_trimestre
-    GROUP BY trimestre
-),
-performance_operadora AS (
-    -- Compara despesas da operadora com a média do mercado
+-- ROLLUP: a soma por operadora/trimestre (despesas_trimestrais) e a média de
+--         mercado por trimestre (media_mercado_trimestral) são pré-calculadas
+--         pelo load.py, então a query não reagrega despesas_detalhadas.
+
+WITH performance_operadora AS (
+    -- Compara despesas da operadora com a média do mercado no mesmo ano/trimestre
     SELECT 
         d.registro_ans,
-        d.trimestre,
-        CASE WHEN d.despesa_total_trimestre > m.media_mercado THEN 1 ELSE 0 END as acima_da_media
-    FROM despesas_consolidadas_trimestre d
-    JOIN media_mercado_por_trimestre m ON d.trimestre = m.trimestre
+        CASE WHEN d.total > m.media_mercado THEN 1 ELSE 0 END as acima_da_media
+    FROM despesas_trimestrais d
+    JOIN media_mercado_trimestral m ON d.ano = m.ano AND d.trimestre = m.trimestre
+    WHERE d.trimestre <> 'ND'
 )
 SELECT 
     o.registro_ans,
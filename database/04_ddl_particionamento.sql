@@ -0,0 +1,24 @@
+USE intuitive_care_test;
+
+-- PARTICIONAMENTO OPCIONAL DE despesas_detalhadas (load.py --particionar)
+-- DECISÃO: RANGE COLUMNS (ano, trimestre), uma partição por trimestre.
+-- JUSTIFICATIVA:
+-- 1. Consultas e DELETEs filtrados por ano/trimestre (rollups por trimestre,
+--    carga incremental) leem só a partição do período (partition pruning).
+-- 2. Trimestres antigos saem com DROP PARTITION ou são arquivados com
+--    EXCHANGE PARTITION, sem DELETE linha a linha.
+-- RESTRIÇÃO DO MYSQL: toda chave única precisa conter as colunas de
+-- particionamento, por isso a PK passa a ser (id, ano, trimestre).
+-- As partições por trimestre são criadas pelo load.py ao carregar trimestres
+-- novos (REORGANIZE de p_futuro); este script só cria a partição coringa.
+
+ALTER TABLE despesas_detalhadas
+    MODIFY ano INT NOT NULL,
+    MODIFY trimestre CHAR(2) NOT NULL,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, ano, trimestre);
+
+ALTER TABLE despesas_detalhadas
+PARTITION BY RANGE COLUMNS (ano, trimestre) (
+    PARTITION p_futuro VALUES LESS THAN (MAXVALUE, MAXVALUE)
+);
@@ -0,0 +1,251 @@
+import heapq
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Callable
+
+from sqlalchemy.exc import SQLAlchemyError
+
+COLUNAS_INDICE = ("registro_ans", "cnpj", "razao_social", "nome_fantasia", "modalidade")
+# Maior que qualquer caractere dos textos normalizados: fecha o intervalo de um prefixo
+_FIM_PREFIXO = "\uffff"
+
+
+def normalizar(texto: str | None) -> str:
+    # Minúsculas sem acento; pontuação vira espaço ("SAÚDE-CARE" -> "saude care")
+    if not texto:
+        return ""
+    sem_acento = "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+    return " ".join("".join(c if c.isalnum() else " " for c in sem_acento.casefold()).split())
+
+
+def apenas_digitos(texto: str | None) -> str:
+    return "".join(c for c in texto or "" if c.isdigit())
+
+
+def _digitos_do_termo(termo: str) -> str:
+    # Termo sem letras busca por prefixo de CNPJ/registro; com letras, pelas palavras do nome
+    digitos = apenas_digitos(termo)
+    return digitos if digitos and not any(c.isalpha() for c in termo) else ""
+
+
+def casa_linha(termo: str) -> Callable[[dict], bool]:
+    """
+    Regra do Indice aplicada a uma linha de `operadoras` por vez, para a
+    busca no banco (índice ainda não montado ou BUSCA_EM_MEMORIA=0) devolver
+    as mesmas operadoras que o índice.
+    """
+    digitos = _digitos_do_termo(termo)
+    if digitos:
+        return lambda linha: any(apenas_digitos(linha.get(c)).startswith(digitos) for c in ("cnpj", "registro_ans"))
+
+    tokens = set(normalizar(termo).split())
+
+    def casa(linha: dict) -> bool:
+        if not tokens:
+            return False
+        palavras = normalizar(linha.get("razao_social")).split() + normalizar(linha.get("nome_fantasia")).split()
+        return all(any(palavra.startswith(token) for palavra in palavras) for token in tokens)
+
+    return casa
+
+
+def _intervalo(chaves: list[str], prefixo: str) -> tuple[int, int]:
+    return bisect_left(chaves, prefixo), bisect_left(chaves, prefixo + _FIM_PREFIXO)
+
+
+def _ordenar_pares(pares) -> tuple[list[str], array]:
+    # [(chave, id)] -> chaves ordenadas e ids alinhados
+    pares = sorted(pares)
+    return [c for c, _ in pares], array("I", (i for _, i in pares))
+
+
+class Indice:
+    """
+    Índice imutável das operadoras, montado a partir das linhas da tabela
+    `operadoras` ordenadas por registro_ans (o id de cada operadora é a sua
+    posição, então ordem de id = ordem de registro_ans).
+
+    - tokens: palavras normalizadas distintas de razão social e nome
+      fantasia, ordenadas; os ids de cada token ficam contíguos em `ids`
+      (`inicio[k]:inicio[k + 1]`). Como os tokens de um mesmo prefixo são
+      vizinhos, todos os ids de um prefixo são uma única fatia.
+    - nomes: razão social e nome fantasia normalizados inteiros, para
+      priorizar operadoras cujo nome começa pelo texto digitado.
+    - digitos: CNPJ e registro ANS só com dígitos, para busca por prefixo.
+    """
+
+    def __init__(self, linhas: list[dict]):
+        linhas = sorted(linhas, key=lambda linha: linha["registro_ans"])
+        self.linhas = [tuple(linha.get(c) for c in COLUNAS_INDICE) for linha in linhas]
+        self.registros = [linha[0] for linha in self.linhas]
+
+        pares_tokens, pares_nomes, pares_digitos = set(), set(), set()
+        for i, (registro, cnpj, razao_social, nome_fantasia, _) in enumerate(self.linhas):
+            for nome in (razao_social, nome_fantasia):
+                normalizado = normalizar(nome)
+                if normalizado:
+                    pares_nomes.add((normalizado, i))
+                    pares_tokens.update((token, i) for token in normalizado.split())
+            for valor in (cnpj, registro):
+                # Valor já só com dígitos (o caso comum) é reaproveitado em vez de copiado
+                chave = valor if valor and valor.isdigit() else apenas_digitos(valor)
+                if chave:
+                    pares_digitos.add((chave, i))
+
+        self.tokens, self.inicio, self.ids = [], array("I"), array("I")
+        for token, i in sorted(pares_tokens):
+            if not self.tokens or self.tokens[-1] != token:
+                self.tokens.append(token)
+                self.inicio.append(len(self.ids))
+            self.ids.append(i)
+        self.inicio.append(len(self.ids))
+        self.nomes, self.ids_nomes = _ordenar_pares(pares_nomes)
+        self.digitos, self.ids_digitos = _ordenar_pares(pares_digitos)
+
+    def __len__(self) -> int:
+        return len(self.linhas)
+
+    def _ids_do_token(self, prefixo: str) -> array:
+        inicio, fim = _intervalo(self.tokens, prefixo)
+        return self.ids[self.inicio[inicio]:self.inicio[fim]]
+
+    def _correspondentes(self, termo: str) -> tuple[set[int], list[int]]:
+        # (ids que casam, ids cujo nome começa pelo termo, na ordem alfabética do nome)
+        digitos = _digitos_do_termo(termo)
+        if digitos:
+            inicio, fim = _intervalo(self.digitos, digitos)
+            # Registro ou CNPJ exatos primeiro
+            exatos = [self.ids_digitos[k] for k in range(inicio, fim) if self.digitos[k] == digitos]
+            return set(self.ids_digitos[inicio:fim]), exatos
+
+        tokens = normalizar(termo).split()
+        if not tokens:
+            return set(), []
+        # Cada palavra digitada é prefixo de alguma palavra do nome (E entre elas)
+        fatias = sorted((self._ids_do_token(token) for token in set(tokens)), key=len)
+        encontrados = set(fatias[0])
+        for fatia in fatias[1:]:
+            if not encontrados:
+                break
+            encontrados.intersection_update(fatia)
+
+        inicio, fim = _intervalo(self.nomes, " ".join(tokens))
+        return encontrados, self.ids_nomes[inicio:fim]
+
+    def buscar(self, termo: str, limite: int) -> list[dict]:
+        """
+        Sugestões para autocompletar: nomes que começam pelo termo (ordem
+        alfabética), depois as demais operadoras que casam (ordem de registro).
+        """
+        encontrados, prioritarios = self._correspondentes(termo)
+        resultado, vistos = [], set()
+        for i in prioritarios:
+            if i not in vistos:
+                vistos.add(i)
+                resultado.append(i)
+                if len(resultado) == limite:
+                    break
+        if len(resultado) < limite:
+            resultado.extend(heapq.nsmallest(limite - len(resultado), encontrados - vistos))
+        return [self.linha(i) for i in resultado]
+
+    def filtrar(self, termo: str, apos_registro: str | None, limite: int) -> list[dict]:
+        # Página da listagem: operadoras que casam, em ordem de registro_ans, depois do cursor
+        encontrados, _ = self._correspondentes(termo)
+        if apos_registro is not None:
+            primeiro = bisect_right(self.registros, apos_registro)
+            encontrados = {i for i in encontrados if i >= primeiro}
+        return [self.linha(i) for i in heapq.nsmallest(limite, encontrados)]
+
+    def linha(self, i: int) -> dict:
+        return dict(zip(COLUNAS_INDICE, self.linhas[i]))
+
+    def bytes_estimados(self) -> int:
+        # Estruturas do índice (sem o dicionário de resposta montado por consulta)
+        textos = sum(sys.getsizeof(t) for t in self.tokens) + sum(sys.getsizeof(n) for n in self.nomes) \
+            + sum(sys.getsizeof(d) for d in self.digitos)
+        linhas = sum(sys.getsizeof(linha) + sum(sys.getsizeof(v) for v in linha if v is not None)
+                     for linha in self.linhas)
+        listas = sum(sys.getsizeof(lista) for lista in (self.tokens, self.nomes, self.digitos, self.linhas, self.registros))
+        arrays = sum(a.itemsize * len(a) for a in (self.inicio, self.ids, self.ids_nomes, self.ids_digitos))
+        return textos + linhas + listas + arrays
+
+
+class IndiceBusca:
+    """
+    Mantém o Indice das operadoras em memória e o reconstrói depois de cada
+    carga. A geração de carga (contador gravado pelo load.run_load) é lida no
+    máximo a cada `intervalo_geracao` segundos; quando muda, um novo índice é
+    montado numa thread e trocado de uma vez. Enquanto isso as consultas usam
+    o índice anterior; antes do primeiro, `atual()` devolve None e a API cai
+    no SQL.
+    """
+
+    def __init__(self, carregar: Callable[[], list[dict]],
+                 ler_geracao: Callable[[], int | None] | None = None,
+                 intervalo_geracao: float = 5.0):
+        self._carregar = carregar
+        self._ler_geracao = ler_geracao
+        self._intervalo_geracao = intervalo_geracao
+        self._indice: Indice | None = None
+        self._geracao_indice = None
+        self._geracao_lida_em = float("-inf")
+        self._lock_geracao = threading.Lock()
+        self._lock_reconstrucao = threading.Lock()
+        self.reconstrucoes = 0
+        self.ultima_reconstrucao_ms = None
+        self.erro = None
+
+    def reconstruir(self) -> Indice:
+        with self._lock_reconstrucao:
+            # Geração lida antes das linhas: uma carga concluída no meio força nova reconstrução
+            geracao = self._ler_geracao() if self._ler_geracao else None
+            inicio = time.perf_counter()
+            indice = Indice(self._carregar())
+            self._indice, self._geracao_indice = indice, geracao
+            self.reconstrucoes += 1
+            self.ultima_reconstrucao_ms = round((time.perf_counter() - inicio) * 1000, 1)
+            self.erro = None
+            return indice
+
+    def _reconstruir_sem_erro(self) -> None:
+        try:
+            self.reconstruir()
+        except SQLAlchemyError as erro:
+            self.erro = str(erro)
+
+    def iniciar(self) -> None:
+        # Primeira montagem em segundo plano: a API sobe sem esperar o banco
+        threading.Thread(target=self._reconstruir_sem_erro, daemon=True).start()
+
+    def _verificar_geracao(self) -> None:
+        if self._ler_geracao is None or self._lock_reconstrucao.locked():
+            return
+        with self._lock_geracao:
+            agora = time.monotonic()
+            if agora - self._geracao_lida_em < self._intervalo_geracao:
+                return
+            self._geracao_lida_em = agora
+            if self._ler_geracao() != self._geracao_indice or self._indice is None:
+                self.iniciar()
+
+    def atual(self) -> Indice | None:
+        self._verificar_geracao()
+        return self._indice
+
+    def estatisticas(self) -> dict:
+        indice = self._indice
+        return {
+            "pronto": indice is not None,
+            "operadoras": len(indice) if indice else 0,
+            "tokens": len(indice.tokens) if indice else 0,
+            "memoria_mb": round(indice.bytes_estimados() / 2**20, 2) if indice else 0.0,
+            "geracao_carga": self._geracao_indice,
+            "reconstrucoes": self.reconstrucoes,
+            "ultima_reconstrucao_ms": self.ultima_reconstrucao_ms,
+            "erro": self.erro,
+        }
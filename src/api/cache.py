@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class CacheTTL:
+    """
+    Cache LRU com expiração (TTL) para respostas das consultas analíticas.
+
+    Cada entrada guarda também a geração de carga em que foi calculada. A
+    geração vem de `ler_geracao` (contador gravado pelo load.run_load), lido no
+    máximo a cada `intervalo_geracao` segundos; se mudar, o cache inteiro é
+    invalidado, pois os dados do banco mudaram.
+    """
+
+    def __init__(self, max_itens: int = 128, ttl: float = 300.0,
+                 ler_geracao: Callable[[], int | None] | None = None,
+                 intervalo_geracao: float = 5.0):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._ler_geracao = ler_geracao
+        self._intervalo_geracao = intervalo_geracao
+        self._itens: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._lock_geracao = threading.Lock()
+        self._geracao = None
+        self._geracao_lida_em = float('-inf')
+        self.hits = 0
+        self.misses = 0
+        self.invalidacoes = 0
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+            self.invalidacoes += 1
+
+    def _verificar_geracao(self) -> None:
+        if self._ler_geracao is None:
+            return
+        with self._lock_geracao:
+            agora = time.monotonic()
+            if agora - self._geracao_lida_em < self._intervalo_geracao:
+                return
+            self._geracao_lida_em = agora
+            geracao = self._ler_geracao()
+            if geracao != self._geracao:
+                if self._geracao is not None:
+                    self.invalidar()
+                self._geracao = geracao
+
+    def obter_ou_calcular(self, chave: Hashable, calcular: Callable[[], Any]) -> Any:
+        self._verificar_geracao()
+        agora = time.monotonic()
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None and item[0] > agora:
+                self._itens.move_to_end(chave)
+                self.hits += 1
+                return item[1]
+            self.misses += 1
+
+        # Calcula fora do lock para não serializar consultas diferentes
+        valor = calcular()
+        with self._lock:
+            self._itens[chave] = (time.monotonic() + self.ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+        return valor
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'taxa_acerto': round(self.hits / total, 4) if total else 0.0,
+                'itens': len(self._itens),
+                'max_itens': self.max_itens,
+                'ttl_segundos': self.ttl,
+                'invalidacoes': self.invalidacoes,
+                'geracao_carga': self._geracao,
+            }
@@ -0,0 +1,115 @@
+import os
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.engine import Engine, URL
+
+# CONFIGURAÇÕES DO BANCO DE DADOS
+load_dotenv()
+DB_HOST = os.getenv("DB_HOST")
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_NAME = os.getenv("DB_NAME") or "intuitive_care_test"
+
+# DATABASE_URL sobrescreve as variáveis acima (ex.: sqlite:///teste.db em testes)
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Pool de conexões do MySQL
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+_engine = None
+
+
+def montar_url():
+    if DATABASE_URL:
+        return DATABASE_URL
+    return URL.create(
+        "mysql+mysqlconnector",
+        username=DB_USER,
+        password=DB_PASSWORD,
+        host=DB_HOST,
+        database=DB_NAME,
+        query={"charset": "utf8mb4"},
+    )
+
+
+def criar_engine(url=None) -> Engine:
+    url = url or montar_url()
+    if str(url).startswith("sqlite"):
+        # SQLite (dublê local) não usa pool por tamanho; libera uso entre threads
+        return create_engine(url, connect_args={"check_same_thread": False})
+    return create_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+
+
+def get_engine() -> Engine:
+    # Engine único por processo: todas as requisições dividem o mesmo pool
+    global _engine
+    if _engine is None:
+        _engine = criar_engine()
+    return _engine
+
+
+def set_engine(engine: Engine) -> None:
+    global _engine
+    if _engine is not None and _engine is not engine:
+        _engine.dispose()
+    _engine = engine
+
+
+def consultar(sql: str, params: dict | None = None) -> list[dict]:
+    # Executa uma consulta somente leitura e devolve as linhas como dicionários
+    with get_engine().connect() as conn:
+        resultado = conn.execute(text(sql), params or {})
+        return [dict(linha) for linha in resultado.mappings()]
+
+
+def consultar_em_blocos(sql: str, params: dict | None = None, tamanho_bloco: int = 10_000):
+    # Gera as linhas bloco a bloco (listas de tuplas), com o cursor do lado do servidor:
+    # o resultado inteiro nunca fica na memória da API. O dialeto
+    # mysqlconnector do SQLAlchemy só abre cursores com buffer, por isso a
+    # consulta vai direto no cursor do driver (buffered=False no MySQL).
+    engine = get_engine()
+    compilado = text(sql).compile(dialect=engine.dialect)
+    params = params or {}
+    if compilado.positional:
+        parametros = tuple(params[nome] for nome in compilado.positiontup)
+    else:
+        parametros = params
+
+    conexao = engine.raw_connection()
+    concluido = False
+    try:
+        driver = conexao.driver_connection
+        cursor = driver.cursor(buffered=False) if engine.dialect.name == "mysql" else driver.cursor()
+        cursor.execute(compilado.string, parametros)
+        while True:
+            linhas = cursor.fetchmany(tamanho_bloco)
+            if not linhas:
+                break
+            yield linhas
+        cursor.close()
+        concluido = True
+    finally:
+        if concluido:
+            conexao.close()
+        else:
+            # Exportação interrompida (cliente desconectou): resto do resultado
+            # ainda pendente no socket, a conexão não volta para o pool
+            conexao.invalidate()
+
+
+def ler_geracao_carga() -> int | None:
+    # Contador incrementado pelo load.run_load ao fim de cada carga
+    try:
+        linhas = consultar("SELECT geracao FROM controle_carga WHERE id = 1")
+    except SQLAlchemyError:
+        return None
+    return int(linhas[0]["geracao"]) if linhas else 0
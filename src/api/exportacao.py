@@ -0,0 +1,191 @@
+import csv
+import importlib.util
+import io
+import zlib
+from typing import Iterable, Iterator
+
+from database_utils import consultar_em_blocos
+
+# Exportação em streaming de fatias de despesas_detalhadas e despesas_agregadas.
+# As linhas saem do banco em blocos (cursor do lado do servidor) e cada bloco
+# é convertido e entregue antes do próximo ser lido: a memória por requisição
+# depende do tamanho do bloco, não do tamanho da exportação. As linhas saem
+# na ordem da chave primária de cada tabela (a ordem em que o InnoDB já as
+# guarda), então a mesma fatia exportada duas vezes sai igual.
+
+FORMATO_CSV = "csv"
+FORMATO_GZIP = "gzip"
+FORMATO_PARQUET = "parquet"
+FORMATOS = (FORMATO_CSV, FORMATO_GZIP, FORMATO_PARQUET)
+
+TIPOS_CONTEUDO = {
+    FORMATO_CSV: "text/csv; charset=utf-8",
+    FORMATO_GZIP: "application/gzip",
+    FORMATO_PARQUET: "application/vnd.apache.parquet",
+}
+EXTENSOES = {FORMATO_CSV: ".csv", FORMATO_GZIP: ".csv.gz", FORMATO_PARQUET: ".parquet"}
+
+# Colunas exportadas, chave de ordenação e tipos no Parquet (demais colunas são texto)
+CONJUNTOS = {
+    "despesas": {
+        "tabela": "despesas_detalhadas",
+        "ordem": "id",
+        "colunas": ("registro_ans", "cnpj", "razao_social", "ano", "trimestre", "valor_despesa",
+                    "cnpj_valido", "modalidade", "uf"),
+        "periodo": True,
+    },
+    "agregadas": {
+        "tabela": "despesas_agregadas",
+        "ordem": "registro_ans",
+        "colunas": ("registro_ans", "razao_social", "uf", "modalidade", "total_despesas",
+                    "media_trimestral", "desvio_padrao"),
+        "periodo": False,
+    },
+}
+TIPOS_PARQUET = {
+    "ano": "int32",
+    "valor_despesa": "float64",
+    "total_despesas": "float64",
+    "media_trimestral": "float64",
+    "desvio_padrao": "float64",
+}
+
+
+def parquet_disponivel() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def montar_consulta(conjunto: str, ufs: list[str] | None = None, modalidade: str | None = None,
+                    registro_ans: str | None = None, inicio: tuple[int, str] | None = None,
+                    fim: tuple[int, str] | None = None) -> tuple[str, dict]:
+    # inicio/fim: (ano, trimestre) inclusivos; só para conjuntos com período
+    definicao = CONJUNTOS[conjunto]
+    filtros, params = [], {}
+    if ufs:
+        marcadores = []
+        for i, uf in enumerate(ufs):
+            marcadores.append(f":uf_{i}")
+            params[f"uf_{i}"] = uf
+        filtros.append(f"uf IN ({', '.join(marcadores)})")
+    if modalidade:
+        filtros.append("modalidade = :modalidade")
+        params["modalidade"] = modalidade
+    if registro_ans:
+        filtros.append("registro_ans = :registro_ans")
+        params["registro_ans"] = registro_ans
+    # (ano, trimestre) em duas condições, que usam o idx_ano_trimestre
+    if inicio:
+        filtros.append("(ano > :ano_inicial OR (ano = :ano_inicial AND trimestre >= :trimestre_inicial))")
+        params.update(ano_inicial=inicio[0], trimestre_inicial=inicio[1])
+    if fim:
+        filtros.append("(ano < :ano_final OR (ano = :ano_final AND trimestre <= :trimestre_final))")
+        params.update(ano_final=fim[0], trimestre_final=fim[1])
+
+    where = f" WHERE {' AND '.join(filtros)}" if filtros else ""
+    return (f"SELECT {', '.join(definicao['colunas'])} FROM {definicao['tabela']}{where} "
+            f"ORDER BY {definicao['ordem']}", params)
+
+
+def _csv(blocos: Iterable[list], colunas: tuple) -> Iterator[bytes]:
+    # Mesmo separador dos CSVs do ETL; cabeçalho mesmo sem linhas
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=";", lineterminator="\n")
+    escritor.writerow(colunas)
+    for linhas in blocos:
+        escritor.writerows(linhas)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _gzip(pedacos: Iterable[bytes]) -> Iterator[bytes]:
+    # wbits=31: cabeçalho gzip, compactado à medida que os blocos chegam
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for pedaco in pedacos:
+        saida = compressor.compress(pedaco)
+        if saida:
+            yield saida
+    yield compressor.flush()
+
+
+class _SaidaParquet:
+    # Destino do ParquetWriter: acumula o que foi escrito até ser esvaziado
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+        self.closed = False
+
+    def write(self, dados) -> int:
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self) -> int:
+        return self._posicao
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def esvaziar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def _parquet(blocos: Iterable[list], colunas: tuple) -> Iterator[bytes]:
+    # Um row group por bloco; o rodapé (metadados) vai no fim do fluxo
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquema = pa.schema([(c, pa.type_for_alias(TIPOS_PARQUET.get(c, "string"))) for c in colunas])
+    numericas = {c for c in colunas if TIPOS_PARQUET.get(c) == "float64"}
+    saida = _SaidaParquet()
+    escritor = pq.ParquetWriter(saida, esquema, compression="snappy")
+    try:
+        for linhas in blocos:
+            valores = list(zip(*linhas))
+            dados = {}
+            for i, coluna in enumerate(colunas):
+                # DECIMAL chega como Decimal (MySQL) ou float (SQLite); números como texto no resto
+                if coluna in numericas:
+                    dados[coluna] = [None if v is None else float(v) for v in valores[i]]
+                elif TIPOS_PARQUET.get(coluna) is None:
+                    dados[coluna] = [None if v is None else str(v) for v in valores[i]]
+                else:
+                    dados[coluna] = valores[i]
+            escritor.write_table(pa.Table.from_pydict(dados, schema=esquema))
+            yield saida.esvaziar()
+    finally:
+        escritor.close()
+    yield saida.esvaziar()
+
+
+def exportar(conjunto: str, formato: str, tamanho_bloco: int, **filtros) -> Iterator[bytes]:
+    """
+    Gerador dos bytes da exportação. A consulta só é executada quando o
+    primeiro pedaço é pedido (pela StreamingResponse), e cada bloco seguinte
+    só é lido depois que o anterior foi enviado ao cliente.
+    """
+    sql, params = montar_consulta(conjunto, **filtros)
+    colunas = CONJUNTOS[conjunto]["colunas"]
+    blocos = consultar_em_blocos(sql, params, tamanho_bloco)
+    if formato == FORMATO_PARQUET:
+        return _parquet(blocos, colunas)
+    pedacos = _csv(blocos, colunas)
+    return _gzip(pedacos) if formato == FORMATO_GZIP else pedacos
+
+
+def nome_arquivo(conjunto: str, formato: str, inicio: tuple[int, str] | None = None,
+                 fim: tuple[int, str] | None = None) -> str:
+    # despesas_desde_1T2024_ate_4T2025.csv, no padrão de nomes dos arquivos da ANS
+    partes = [conjunto]
+    if inicio:
+        partes.append(f"desde_{inicio[1]}{inicio[0]}")
+    if fim:
+        partes.append(f"ate_{fim[1]}{fim[0]}")
+    return "_".join(partes) + EXTENSOES[formato]
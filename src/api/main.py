@@ -0,0 +1,412 @@
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Path, Query
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+import exportacao
+from busca import IndiceBusca, casa_linha
+from cache import CacheTTL
+from database_utils import consultar, ler_geracao_carga
+
+# Origens liberadas para o front-end (Vite usa a porta 5173 por padrão)
+CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:5173").split(",")
+
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 100
+
+# Cache das consultas analíticas (03_dql_analise.sql): só mudam após nova carga
+CACHE_TTL_SEGUNDOS = float(os.getenv("CACHE_TTL_SEGUNDOS", "300"))
+CACHE_MAX_ITENS = int(os.getenv("CACHE_MAX_ITENS", "128"))
+CACHE_INTERVALO_GERACAO = float(os.getenv("CACHE_INTERVALO_GERACAO", "5"))
+
+cache_analitico = CacheTTL(
+    max_itens=CACHE_MAX_ITENS,
+    ttl=CACHE_TTL_SEGUNDOS,
+    ler_geracao=ler_geracao_carga,
+    intervalo_geracao=CACHE_INTERVALO_GERACAO,
+)
+
+# Índice de busca das operadoras em memória (busca.py); BUSCA_EM_MEMORIA=0 usa só o SQL
+BUSCA_EM_MEMORIA = os.getenv("BUSCA_EM_MEMORIA", "1") != "0"
+LIMITE_SUGESTOES = 10
+# Linhas lidas por consulta na busca pelo banco (sem o índice em memória)
+BLOCO_BUSCA_SQL = 1000
+
+COLUNAS_OPERADORA = "registro_ans, cnpj, razao_social, nome_fantasia, modalidade"
+
+
+def _carregar_operadoras() -> list[dict]:
+    return consultar(f"SELECT {COLUNAS_OPERADORA} FROM operadoras ORDER BY registro_ans")
+
+
+indice_busca = IndiceBusca(
+    carregar=_carregar_operadoras,
+    ler_geracao=ler_geracao_carga,
+    intervalo_geracao=CACHE_INTERVALO_GERACAO,
+)
+
+
+@asynccontextmanager
+async def ciclo_de_vida(_app):
+    if BUSCA_EM_MEMORIA:
+        indice_busca.iniciar()
+    yield
+
+
+# Linhas lidas do banco por bloco nas exportações (define a memória por requisição)
+EXPORTACAO_LINHAS_POR_BLOCO = int(os.getenv("EXPORTACAO_LINHAS_POR_BLOCO", "10000"))
+
+app = FastAPI(title="Intuitive Care - API de Operadoras", version="1.0.0", lifespan=ciclo_de_vida)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=CORS_ORIGINS,
+    allow_methods=["GET"],
+    allow_headers=["*"],
+)
+
+
+class Operadora(BaseModel):
+    registro_ans: str
+    cnpj: str | None = None
+    razao_social: str | None = None
+    nome_fantasia: str | None = None
+    modalidade: str | None = None
+
+
+class PaginaOperadoras(BaseModel):
+    dados: list[Operadora]
+    # registro_ans da última linha; enviar de volta em ?cursor= para a próxima página
+    proximo_cursor: str | None = None
+
+
+class DespesaTrimestre(BaseModel):
+    ano: int
+    trimestre: str
+    total_despesas: float
+    qtd_lancamentos: int
+
+
+class HistoricoDespesas(BaseModel):
+    operadora: Operadora
+    despesas: list[DespesaTrimestre]
+
+
+class EstatisticaUF(BaseModel):
+    uf: str | None
+    total_despesas: float
+    media_por_operadora: float
+    qtd_operadoras: int
+
+
+class CrescimentoOperadora(BaseModel):
+    razao_social: str | None
+    valor_inicial: float
+    valor_final: float
+    crescimento_percentual: float
+
+
+class DistribuicaoUF(BaseModel):
+    uf: str | None
+    total_despesas_estado: float
+    media_por_operadora: float
+    qtd_operadoras: int
+
+
+class OperadoraAcimaMedia(BaseModel):
+    registro_ans: str
+    razao_social: str | None
+    qtd_trimestres_acima: int
+
+
+def _indice_pronto():
+    return indice_busca.atual() if BUSCA_EM_MEMORIA else None
+
+
+def _listar_operadoras(limite: int, cursor: str | None, busca: str | None) -> PaginaOperadoras:
+    # Paginação por chave (keyset): parte do último registro_ans visto em vez de
+    # OFFSET, então o custo de cada página não cresce com a profundidade.
+    indice = _indice_pronto() if busca else None
+    if indice is not None:
+        # Busca por prefixo das palavras, sem acento, no índice em memória
+        linhas = indice.filtrar(busca, cursor, limite + 1)
+    else:
+        linhas = _listar_operadoras_sql(limite + 1, cursor, busca)
+
+    proximo = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        proximo = linhas[-1]["registro_ans"]
+    return PaginaOperadoras(dados=[Operadora(**linha) for linha in linhas], proximo_cursor=proximo)
+
+
+def _pagina_operadoras_sql(limite: int, cursor: str | None) -> list[dict]:
+    where = "WHERE registro_ans > :cursor" if cursor else ""
+    return consultar(
+        f"SELECT {COLUNAS_OPERADORA} FROM operadoras {where} ORDER BY registro_ans LIMIT :limite",
+        {"limite": limite, "cursor": cursor},
+    )
+
+
+def _listar_operadoras_sql(limite: int, cursor: str | None, busca: str | None) -> list[dict]:
+    if not busca:
+        return _pagina_operadoras_sql(limite, cursor)
+    # Prefixo das palavras sem acento não se traduz num LIKE (que varia com a
+    # collation): percorre a tabela em ordem de registro_ans, em blocos, e
+    # aplica a mesma regra do índice. Assim um cursor vale nos dois caminhos.
+    casa = casa_linha(busca)
+    encontradas = []
+    while len(encontradas) < limite:
+        bloco = _pagina_operadoras_sql(BLOCO_BUSCA_SQL, cursor)
+        encontradas.extend(linha for linha in bloco if casa(linha))
+        if len(bloco) < BLOCO_BUSCA_SQL:
+            break
+        cursor = bloco[-1]["registro_ans"]
+    return encontradas[:limite]
+
+
+def _sugerir_operadoras(termo: str, limite: int) -> list[dict]:
+    indice = _indice_pronto()
+    if indice is not None:
+        return indice.buscar(termo, limite)
+    # Índice ainda não montado (ou desligado): mesma busca da listagem, no banco
+    return _listar_operadoras_sql(limite, None, termo)
+
+
+def _buscar_operadora(registro_ans: str) -> dict | None:
+    linhas = consultar(
+        f"SELECT {COLUNAS_OPERADORA} FROM operadoras WHERE registro_ans = :registro_ans",
+        {"registro_ans": registro_ans},
+    )
+    return linhas[0] if linhas else None
+
+
+def _historico_despesas(registro_ans: str) -> list[dict]:
+    return consultar(
+        """
+        SELECT ano, trimestre, SUM(valor_despesa) AS total_despesas, COUNT(*) AS qtd_lancamentos
+        FROM despesas_detalhadas
+        WHERE registro_ans = :registro_ans
+        GROUP BY ano, trimestre
+        ORDER BY ano, trimestre
+        """,
+        {"registro_ans": registro_ans},
+    )
+
+
+def _estatisticas_uf() -> list[dict]:
+    return consultar(
+        """
+        SELECT uf,
+               SUM(total_despesas) AS total_despesas,
+               AVG(total_despesas) AS media_por_operadora,
+               COUNT(DISTINCT registro_ans) AS qtd_operadoras
+        FROM despesas_agregadas
+        GROUP BY uf
+        ORDER BY total_despesas DESC
+        """
+    )
+
+
+# Consultas analíticas de database/03_dql_analise.sql, sobre os rollups
+# despesas_trimestrais e media_mercado_trimestral mantidos pelo load.py
+SQL_PERIODO_CARREGADO = """
+SELECT ano, trimestre FROM media_mercado_trimestral WHERE trimestre <> 'ND' ORDER BY ano, trimestre
+"""
+
+SQL_CRESCIMENTO = """
+SELECT
+    o.razao_social,
+    pt.total AS valor_inicial,
+    ut.total AS valor_final,
+    ROUND(((ut.total - pt.total) / pt.total) * 100, 2) AS crescimento_percentual
+FROM operadoras o
+JOIN despesas_trimestrais pt
+    ON o.registro_ans = pt.registro_ans AND pt.ano = :ano_inicial AND pt.trimestre = :trimestre_inicial
+JOIN despesas_trimestrais ut
+    ON o.registro_ans = ut.registro_ans AND ut.ano = :ano_final AND ut.trimestre = :trimestre_final
+WHERE pt.total > 0
+ORDER BY crescimento_percentual DESC
+LIMIT :limite
+"""
+
+SQL_DISTRIBUICAO_UF = """
+SELECT
+    uf,
+    SUM(total_despesas) AS total_despesas_estado,
+    AVG(total_despesas) AS media_por_operadora,
+    COUNT(DISTINCT registro_ans) AS qtd_operadoras
+FROM despesas_agregadas
+WHERE uf <> 'ND'
+GROUP BY uf
+ORDER BY total_despesas_estado DESC
+LIMIT :limite
+"""
+
+SQL_ACIMA_DA_MEDIA = """
+WITH performance_operadora AS (
+    SELECT
+        d.registro_ans,
+        CASE WHEN d.total > m.media_mercado THEN 1 ELSE 0 END as acima_da_media
+    FROM despesas_trimestrais d
+    JOIN media_mercado_trimestral m ON d.ano = m.ano AND d.trimestre = m.trimestre
+    WHERE d.trimestre <> 'ND'
+)
+SELECT
+    o.registro_ans,
+    o.razao_social,
+    SUM(p.acima_da_media) as qtd_trimestres_acima
+FROM performance_operadora p
+JOIN operadoras o ON p.registro_ans = o.registro_ans
+GROUP BY o.registro_ans, o.razao_social
+HAVING SUM(p.acima_da_media) >= :minimo_trimestres
+ORDER BY qtd_trimestres_acima DESC, o.razao_social
+LIMIT :limite
+"""
+
+
+def _consulta_analitica(nome: str, sql: str, params: dict) -> list[dict]:
+    chave = (nome, tuple(sorted(params.items())))
+    return cache_analitico.obter_ou_calcular(chave, lambda: consultar(sql, params))
+
+
+def _crescimento(limite: int, ano_inicial: int | None, trimestre_inicial: str | None,
+                 ano_final: int | None, trimestre_final: str | None) -> list[dict]:
+    # Sem período explícito, compara o primeiro e o último trimestres carregados
+    if None in (ano_inicial, trimestre_inicial, ano_final, trimestre_final):
+        periodo = _consulta_analitica("periodo", SQL_PERIODO_CARREGADO, {})
+        if not periodo:
+            return []
+        ano_inicial = ano_inicial or periodo[0]["ano"]
+        trimestre_inicial = trimestre_inicial or periodo[0]["trimestre"]
+        ano_final = ano_final or periodo[-1]["ano"]
+        trimestre_final = trimestre_final or periodo[-1]["trimestre"]
+
+    params = {
+        "limite": limite,
+        "ano_inicial": ano_inicial,
+        "trimestre_inicial": trimestre_inicial,
+        "ano_final": ano_final,
+        "trimestre_final": trimestre_final,
+    }
+    return _consulta_analitica("crescimento", SQL_CRESCIMENTO, params)
+
+
+@app.get("/api/operadoras", response_model=PaginaOperadoras)
+async def listar_operadoras(
+    limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    cursor: str | None = Query(None, description="proximo_cursor da página anterior"),
+    busca: str | None = Query(None, min_length=1, description="Razão social, nome fantasia, CNPJ ou registro ANS"),
+):
+    # As consultas são bloqueantes (driver síncrono); rodam no pool de threads
+    # para não travar o event loop enquanto aguardam o banco.
+    return await run_in_threadpool(_listar_operadoras, limite, cursor, busca)
+
+
+@app.get("/api/operadoras/sugestoes", response_model=list[Operadora])
+async def sugerir_operadoras(
+    q: str = Query(..., min_length=1, description="Início da razão social, nome fantasia, CNPJ ou registro ANS"),
+    limite: int = Query(LIMITE_SUGESTOES, ge=1, le=LIMITE_MAXIMO),
+):
+    # Autocompletar do front-end: responde do índice em memória, sem ir ao banco
+    # (a checagem periódica da geração de carga consulta o banco, por isso o pool)
+    return await run_in_threadpool(_sugerir_operadoras, q, limite)
+
+
+@app.get("/api/operadoras/{registro_ans}", response_model=Operadora)
+async def detalhar_operadora(registro_ans: str):
+    operadora = await run_in_threadpool(_buscar_operadora, registro_ans)
+    if operadora is None:
+        raise HTTPException(status_code=404, detail="Operadora não encontrada")
+    return operadora
+
+
+@app.get("/api/operadoras/{registro_ans}/despesas", response_model=HistoricoDespesas)
+async def historico_despesas(registro_ans: str):
+    operadora = await run_in_threadpool(_buscar_operadora, registro_ans)
+    if operadora is None:
+        raise HTTPException(status_code=404, detail="Operadora não encontrada")
+    despesas = await run_in_threadpool(_historico_despesas, registro_ans)
+    return HistoricoDespesas(operadora=Operadora(**operadora), despesas=despesas)
+
+
+@app.get("/api/estatisticas/uf", response_model=list[EstatisticaUF])
+async def estatisticas_uf():
+    return await run_in_threadpool(_estatisticas_uf)
+
+
+@app.get("/api/analises/crescimento", response_model=list[CrescimentoOperadora])
+async def analise_crescimento(
+    limite: int = Query(5, ge=1, le=LIMITE_MAXIMO),
+    ano_inicial: int | None = None,
+    trimestre_inicial: str | None = Query(None, pattern="^[1-4]T$"),
+    ano_final: int | None = None,
+    trimestre_final: str | None = Query(None, pattern="^[1-4]T$"),
+):
+    return await run_in_threadpool(
+        _crescimento, limite, ano_inicial, trimestre_inicial, ano_final, trimestre_final
+    )
+
+
+@app.get("/api/analises/uf", response_model=list[DistribuicaoUF])
+async def analise_distribuicao_uf(limite: int = Query(5, ge=1, le=LIMITE_MAXIMO)):
+    return await run_in_threadpool(_consulta_analitica, "uf", SQL_DISTRIBUICAO_UF, {"limite": limite})
+
+
+@app.get("/api/analises/acima-da-media", response_model=list[OperadoraAcimaMedia])
+async def analise_acima_da_media(
+    minimo_trimestres: int = Query(2, ge=1),
+    limite: int = Query(10, ge=1, le=LIMITE_MAXIMO),
+):
+    params = {"minimo_trimestres": minimo_trimestres, "limite": limite}
+    return await run_in_threadpool(_consulta_analitica, "acima_da_media", SQL_ACIMA_DA_MEDIA, params)
+
+
+@app.get("/api/exportacao/{conjunto}")
+async def exportar(
+    conjunto: str = Path(..., pattern="^(despesas|agregadas)$"),
+    formato: str = Query(exportacao.FORMATO_CSV, pattern="^(csv|gzip|parquet)$"),
+    uf: list[str] | None = Query(None, description="Uma ou mais UFs (?uf=SP&uf=RJ)"),
+    modalidade: str | None = None,
+    registro_ans: str | None = None,
+    ano_inicial: int | None = None,
+    trimestre_inicial: str | None = Query(None, pattern="^[1-4]T$"),
+    ano_final: int | None = None,
+    trimestre_final: str | None = Query(None, pattern="^[1-4]T$"),
+):
+    # Sem período completo, o ano inteiro: ano_inicial a partir do 1T, ano_final até o 4T
+    if (trimestre_inicial and ano_inicial is None) or (trimestre_final and ano_final is None):
+        raise HTTPException(status_code=400, detail="Trimestre informado sem o ano correspondente")
+    inicio = (ano_inicial, trimestre_inicial or "1T") if ano_inicial is not None else None
+    fim = (ano_final, trimestre_final or "4T") if ano_final is not None else None
+    if (inicio or fim) and not exportacao.CONJUNTOS[conjunto]["periodo"]:
+        raise HTTPException(status_code=400, detail="despesas_agregadas não tem período; use conjunto=despesas")
+    if formato == exportacao.FORMATO_PARQUET and not exportacao.parquet_disponivel():
+        raise HTTPException(status_code=501, detail="Exportação em Parquet requer o pyarrow instalado")
+
+    # Gerador síncrono: a StreamingResponse lê cada pedaço no pool de threads e
+    # só pede o próximo depois de enviar o anterior ao cliente
+    pedacos = exportacao.exportar(conjunto, formato, EXPORTACAO_LINHAS_POR_BLOCO, ufs=uf,
+                                  modalidade=modalidade, registro_ans=registro_ans, inicio=inicio, fim=fim)
+    nome = exportacao.nome_arquivo(conjunto, formato, inicio, fim)
+    return StreamingResponse(pedacos, media_type=exportacao.TIPOS_CONTEUDO[formato],
+                             headers={"Content-Disposition": f'attachment; filename="{nome}"'})
+
+
+@app.get("/api/cache/estatisticas")
+async def estatisticas_cache():
+    return cache_analitico.estatisticas()
+
+
+@app.get("/api/busca/estatisticas")
+async def estatisticas_busca():
+    return indice_busca.estatisticas()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=os.getenv("API_HOST", "127.0.0.1"), port=int(os.getenv("API_PORT", "8000")))
@@ -2,14 +2,32 @@ import pandas as pd
 import numpy as np
 import os
 import re
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import cadop
+import caminhos
+import estado_incremental
+import intermediario
+from instrumentacao import etapa
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import estatisticas
 
 # Caminhos dos arquivos
-PASTA_PROCESSED = os.path.join('data', 'processed')
-PASTA_RAW = os.path.join('data', 'raw')
+PASTA_PROCESSED = caminhos.PASTA_PROCESSED
+PASTA_RAW = caminhos.PASTA_RAW
 ARQUIVO_CONSOLIDADO = os.path.join(PASTA_PROCESSED, 'consolidado.csv')
-ARQUIVO_CADOP = os.path.join(PASTA_RAW, 'Relatorio_Cadop.csv')
 ARQUIVO_AGREGADO = os.path.join(PASTA_PROCESSED, 'despesas_agregadas.csv')
 
+# Colunas geradas pela transformação e chave de cada linha do consolidado
+COLUNAS_BASE = ['CNPJ', 'RazaoSocial', 'Trimestre', 'Ano', 'ValorDespesas']
+CHAVES_LINHA = ['CNPJ', 'RazaoSocial', 'Trimestre', 'Ano']
+COLS_GROUP = ['RazaoSocial', 'UF', 'RegistroANS', 'Modalidade']
+# Linhas por bloco ao reagregar o consolidado enriquecido sem carrega-lo inteiro
+TAMANHO_CHUNK = 200_000
+
 def limpar_cnpj(valor):
     '''
     Padroniza CNPJ: remove pontuacao e garante 14 digitos.
@@ -41,26 +59,75 @@ def validar_cnpj_matematicamente(cnpj):
 
     return int(cnpj[13]) == digito2
 
-def executar_pipeline_completo():
-    print('[INFO] Iniciando Pipeline de Enriquecimento e Agregacao...')
+PESOS_DV1 = np.array([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+PESOS_DV2 = np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
 
-    # CARREGA DADOS FINANCEIROS
-    if not os.path.exists(ARQUIVO_CONSOLIDADO):
-        print('[ERRO] Arquivo consolidado.csv nao encontrado.')
-        return
+def _por_valor_distinto(serie, funcao, padrao):
+    '''
+    Aplica funcao (vetorizada) so nos valores distintos da serie e espalha o
+    resultado de volta; nulos recebem padrao. Cada operadora aparece uma vez
+    por trimestre, entao o trabalho cai de linhas para CNPJs distintos.
+    '''
+    codigos, unicos = pd.factorize(serie)
+    resultado_unicos = np.asarray(funcao(pd.Series(np.asarray(unicos, dtype=object), dtype=object)))
+    resultado = np.full(len(codigos), padrao, dtype=resultado_unicos.dtype if len(unicos) else object)
+    resultado[codigos >= 0] = resultado_unicos[codigos[codigos >= 0]]
+    return pd.Series(resultado, index=serie.index)
 
-    print('[INFO] Lendo consolidado.csv...')
-    
-    df = pd.read_csv(ARQUIVO_CONSOLIDADO, sep=';', encoding='utf-8-sig', dtype=str)
-    
-    # Pre-processamento
-    df['ValorDespesas'] = pd.to_numeric(df['ValorDespesas'].str.replace(',', '.'), errors='coerce').fillna(0)
-    df['KEY_CNPJ'] = df['CNPJ'].apply(limpar_cnpj)
+def _limpar_unicos(unicos):
+    return unicos.astype(str).str.replace(r'[^0-9]', '', regex=True).str.zfill(14)
+
+def limpar_cnpj_vetorizado(serie):
+    '''
+    Mesma regra de limpar_cnpj, aplicada na coluna inteira de uma vez.
+    '''
+    return _por_valor_distinto(serie, _limpar_unicos, '').astype(object)
+
+def _digito_verificador(soma):
+    resto = soma % 11
+    return np.where(resto < 2, 0, 11 - resto)
+
+def _validar_unicos(unicos):
+    limpos = _limpar_unicos(unicos).to_numpy(dtype=object)
+    valido = np.zeros(len(limpos), dtype=bool)
+
+    candidatos = np.array([len(c) == 14 for c in limpos], dtype=bool)
+    if candidatos.any():
+        texto = ''.join(limpos[candidatos]).encode('ascii')
+        digitos = (np.frombuffer(texto, dtype=np.uint8) - ord('0')).astype(np.int64).reshape(-1, 14)
+
+        repetido = (digitos == digitos[:, :1]).all(axis=1)
+        dv1 = _digito_verificador(digitos[:, :12] @ PESOS_DV1)
+        dv2 = _digito_verificador(digitos[:, :13] @ PESOS_DV2)
+        valido[candidatos] = ~repetido & (digitos[:, 12] == dv1) & (digitos[:, 13] == dv2)
+    return valido
+
+def validar_cnpj_vetorizado(serie):
+    '''
+    Mesma regra de validar_cnpj_matematicamente, em lote: os CNPJs viram uma
+    matriz de digitos (n x 14) e os dois DVs saem de produtos com os pesos.
+    Cada CNPJ distinto e validado uma unica vez.
+    '''
+    return _por_valor_distinto(serie, _validar_unicos, False).astype(bool)
+
+def carregar_cadop():
+    '''
+    Cadop indexado pelo CNPJ limpo e ja deduplicado (RegistroANS, Modalidade,
+    UF), lido do cache compartilhado com a transformacao.
+    '''
+    dados = cadop.carregar()
+    return dados.por_cnpj if dados is not None else None
+
+def enriquecer(df, df_cadop):
+    '''
+    Valida o CNPJ e cruza o consolidado com o Cadop (RegistroANS, Modalidade, UF).
+    '''
+    df = df.copy()
+    df['KEY_CNPJ'] = limpar_cnpj_vetorizado(df['CNPJ'])
 
     # 2. VALIDACAO 
-    print('[INFO] Aplicando validacoes...')
     # Cria a coluna de validacao no proprio consolidado
-    df['CNPJ_Valido'] = df['KEY_CNPJ'].apply(validar_cnpj_matematicamente)
+    df['CNPJ_Valido'] = validar_cnpj_vetorizado(df['KEY_CNPJ'])
     
     # Filtro de consistencia basica (Razao Social existente e valor > 0)
     df = df[df['RazaoSocial'].notna() & (df['RazaoSocial'] != '')]
@@ -68,80 +135,235 @@ def executar_pipeline_completo():
     # mas mantemos apenas quem tem despesa para a analise
     
     # 3. ENRIQUECIMENTO
-    print('[INFO] Cruzando com Cadop para adicionar RegistroANS, Modalidade e UF...')
-    
-    if os.path.exists(ARQUIVO_CADOP):
-        df_cadop = pd.read_csv(
-            ARQUIVO_CADOP, sep=';', encoding='latin1', dtype=str,
-            usecols=['CNPJ', 'REGISTRO_OPERADORA', 'Modalidade', 'UF']
-        )
-        
-        # Limpeza e Deduplicacao do Cadop
-        df_cadop['KEY_CNPJ'] = df_cadop['CNPJ'].apply(limpar_cnpj)
-        df_cadop = df_cadop.drop_duplicates(subset=['KEY_CNPJ'], keep='last')
-        
-        # JOIN (Left Join para enriquecer o consolidado)
-        df_enriquecido = pd.merge(
-            df, 
-            df_cadop[['KEY_CNPJ', 'REGISTRO_OPERADORA', 'Modalidade', 'UF']], 
-            on='KEY_CNPJ', 
-            how='left'
-        )
-        
-        # Renomeia coluna REGISTRO_OPERADORA para RegistroANS conforme pedido
-        df_enriquecido = df_enriquecido.rename(columns={'REGISTRO_OPERADORA': 'RegistroANS'})
-        
-        # Preenche falhas de cruzamento
+    if df_cadop is not None:
+        # JOIN (Left Join pelo indice KEY_CNPJ do Cadop, unico)
+        df_enriquecido = df.join(df_cadop[['RegistroANS', 'Modalidade', 'UF']], on='KEY_CNPJ', how='left')
+        df_enriquecido = df_enriquecido.reset_index(drop=True)
+
+        # Preenche falhas de cruzamento (Modalidade e UF chegam como categorias)
         df_enriquecido['RegistroANS'] = df_enriquecido['RegistroANS'].fillna('N/D')
-        df_enriquecido['Modalidade'] = df_enriquecido['Modalidade'].fillna('Desconhecida')
-        df_enriquecido['UF'] = df_enriquecido['UF'].fillna('N/D')
-        
-        # Remove a chave auxiliar usada apenas para o join
-        df_enriquecido.drop(columns=['KEY_CNPJ'], inplace=True)
+        df_enriquecido['Modalidade'] = df_enriquecido['Modalidade'].astype(object).fillna('Desconhecida')
+        df_enriquecido['UF'] = df_enriquecido['UF'].astype(object).fillna('N/D')
         
     else:
-        print('[AVISO] Cadop nao encontrado. Preenchendo com N/D.')
         df_enriquecido = df
         df_enriquecido['RegistroANS'] = 'N/D'
         df_enriquecido['Modalidade'] = 'N/D'
         df_enriquecido['UF'] = 'N/D'
-        if 'KEY_CNPJ' in df_enriquecido.columns:
-             df_enriquecido.drop(columns=['KEY_CNPJ'], inplace=True)
 
-    # 4. SALVAR O CONSOLIDADO ENRIQUECIDO 
-    print(f'[INFO] Sobrescrevendo {ARQUIVO_CONSOLIDADO} com colunas adicionadas...')
-    # Salvamos em latin1 conforme solicitado
-    df_enriquecido.to_csv(ARQUIVO_CONSOLIDADO, index=False, sep=';', encoding='latin1', float_format='%.2f', errors='replace')
+    # Remove a chave auxiliar usada apenas para o join
+    df_enriquecido.drop(columns=['KEY_CNPJ'], inplace=True)
+    return df_enriquecido
 
-    # 5. AGREGACAO E ESTATISTICA
-    # Gera o arquivo despesas_agregadas.csv a partir do consolidado ja enriquecido
-    print('[INFO] Gerando despesas_agregadas.csv...')
-    
+def agregar(df_enriquecido):
+    '''
+    Total, media e desvio padrao por operadora (acumuladores de estatisticas.py).
+    '''
     # Filtra apenas despesas positivas para a estatistica
-    df_stats = df_enriquecido[df_enriquecido['ValorDespesas'] > 0].copy()
-    
-    # Agrupamento solicitado
-    cols_group = ['RazaoSocial', 'UF', 'RegistroANS', 'Modalidade']
-    
-    df_agg = df_stats.groupby(cols_group)['ValorDespesas'].agg(
-        Total_Despesas='sum',
-        Media_Trimestral='mean',
-        Desvio_Padrao='std'
-    ).reset_index()
-    
-    # Tratamento final
-    df_agg['Desvio_Padrao'] = df_agg['Desvio_Padrao'].fillna(0)
-    df_agg = df_agg.sort_values(by='Total_Despesas', ascending=False)
+    df_stats = df_enriquecido[df_enriquecido['ValorDespesas'] > 0]
+    return estatisticas.finalizar(estatisticas.acumular(df_stats, COLS_GROUP), COLS_GROUP)
 
-    # SALVA ARQUIVO AGREGADO
-    print(f'[INFO] Salvando {ARQUIVO_AGREGADO}...')
-    df_agg.to_csv(ARQUIVO_AGREGADO, index=False, sep=';', encoding='latin1', float_format='%.2f', errors='replace')
+def agregar_arquivo(caminho=ARQUIVO_CONSOLIDADO, tamanho_chunk=TAMANHO_CHUNK):
+    '''
+    Mesma agregacao lendo o consolidado enriquecido em blocos: so os
+    acumuladores por operadora ficam em memoria.
+    '''
+    blocos = pd.read_csv(caminho, sep=';', encoding='latin1', usecols=COLS_GROUP + ['ValorDespesas'],
+                         dtype={c: str for c in COLS_GROUP}, chunksize=tamanho_chunk)
+    acumuladores = estatisticas.agregar_em_blocos(blocos, COLS_GROUP, filtro=lambda b: b['ValorDespesas'] > 0)
+    return estatisticas.finalizar(acumuladores, COLS_GROUP)
+
+def acumular(df_enriquecido):
+    '''
+    Acumuladores (n, soma, media, m2) por operadora e trimestre. Trimestres
+    inalterados reaproveitam os seus; os demais sao recalculados e mesclados.
+    '''
+    df_stats = df_enriquecido[df_enriquecido['ValorDespesas'] > 0]
+    return estatisticas.acumular(df_stats, COLS_GROUP + ['Ano', 'Trimestre'])
+
+def agregar_de_acumuladores(acumuladores):
+    '''
+    Converte os acumuladores por trimestre nas colunas de despesas_agregadas.
+    '''
+    return estatisticas.finalizar(estatisticas.mesclar([acumuladores], COLS_GROUP), COLS_GROUP)
+
+def _chave_trimestre(df):
+    return df['Ano'].astype(str) + '|' + df['Trimestre'].astype(str)
+
+def impressoes_por_trimestre(df_base):
+    hashes = pd.util.hash_pandas_object(df_base[COLUNAS_BASE], index=False)
+    return {k: str(v) for k, v in hashes.groupby(_chave_trimestre(df_base)).sum().items()}
+
+def enriquecer_incremental(df_base, df_cadop):
+    '''
+    Reenriquece apenas os trimestres cujo conteudo mudou e atualiza os
+    acumuladores de despesas_agregadas desses trimestres.
+    '''
+    estado = estado_incremental.carregar_estado('enriquecimento')
+    hash_cadop = estado_incremental.hash_fonte(cadop.caminho_cadop())
+    impressoes = impressoes_por_trimestre(df_base)
+
+    anterior = estado_incremental.carregar_tabela('enriquecimento_linhas')
+    acumuladores = estado_incremental.carregar_tabela('enriquecimento_acumuladores')
+    # Estado de versoes antigas (soma dos quadrados, sem Ano/Trimestre) e descartado
+    if anterior is None or acumuladores is None or estado.get('cadop') != hash_cadop \
+            or 'm2' not in acumuladores.columns:
+        anterior = None
+        afetados = set(impressoes)
+    else:
+        impressoes_antigas = estado.get('trimestres', {})
+        afetados = {
+            k for k in set(impressoes) | set(impressoes_antigas)
+            if impressoes.get(k) != impressoes_antigas.get(k)
+        }
+    print(f'[INFO] Incremental: {len(afetados)} de {len(impressoes)} trimestres reprocessados.')
+
+    novos = enriquecer(df_base[_chave_trimestre(df_base).isin(afetados)], df_cadop)
+    if anterior is None:
+        df_enriquecido = novos
+        acumuladores = acumular(novos)
+    else:
+        mascara_antigos = _chave_trimestre(anterior).isin(afetados)
+        df_enriquecido = pd.concat([anterior[~mascara_antigos], novos], ignore_index=True)
+        mantidos = acumuladores[~_chave_trimestre(acumuladores).isin(afetados)]
+        acumuladores = pd.concat([mantidos, acumular(novos)], ignore_index=True)
+
+    # Mantem a mesma ordem de linhas da execucao completa
+    df_enriquecido = df_base[CHAVES_LINHA].merge(df_enriquecido, on=CHAVES_LINHA, how='inner')
+
+    estado_incremental.salvar_tabela('enriquecimento_linhas', df_enriquecido)
+    estado_incremental.salvar_tabela('enriquecimento_acumuladores', acumuladores)
+    estado_incremental.salvar_estado('enriquecimento', {'cadop': hash_cadop, 'trimestres': impressoes})
+
+    return df_enriquecido, agregar_de_acumuladores(acumuladores)
+
+def ler_consolidado(formato):
+    if formato != intermediario.FORMATO_CSV:
+        print(f'[INFO] Lendo consolidado ({formato})...')
+        df = intermediario.ler_colunar(ARQUIVO_CONSOLIDADO, formato)
+        if df is None:
+            return None
+    else:
+        if not os.path.exists(ARQUIVO_CONSOLIDADO):
+            return None
+        print('[INFO] Lendo consolidado.csv...')
+        try:
+            df = pd.read_csv(ARQUIVO_CONSOLIDADO, sep=';', encoding='utf-8-sig', dtype=str)
+        except UnicodeDecodeError:
+            # Consolidado ja enriquecido (gravado em latin1): a transformacao foi pulada
+            df = pd.read_csv(ARQUIVO_CONSOLIDADO, sep=';', encoding='latin1', dtype=str)
+        # Pre-processamento
+        df['ValorDespesas'] = pd.to_numeric(df['ValorDespesas'].str.replace(',', '.'), errors='coerce').fillna(0)
+
+    # Tipos canonicos, iguais para qualquer formato de origem
+    df = df[COLUNAS_BASE].copy()
+    df['Trimestre'] = df['Trimestre'].astype(str)
+    df['Ano'] = df['Ano'].astype('int64')
+    df['ValorDespesas'] = df['ValorDespesas'].astype(float)
+    return df
+
+def ler_resultados(formato=intermediario.FORMATO_CSV):
+    '''
+    Le de volta o consolidado enriquecido e despesas_agregadas gravados pela
+    ultima execucao (usado pela carga quando o enriquecimento e pulado).
+    '''
+    if formato != intermediario.FORMATO_CSV:
+        df_enriquecido = intermediario.ler_colunar(ARQUIVO_CONSOLIDADO, formato)
+        df_agg = intermediario.ler_colunar(ARQUIVO_AGREGADO, formato)
+        if df_enriquecido is not None and df_agg is not None:
+            return df_enriquecido, df_agg
+    if not (os.path.exists(ARQUIVO_CONSOLIDADO) and os.path.exists(ARQUIVO_AGREGADO)):
+        return None
+    textos = {'CNPJ': str, 'RegistroANS': str}
+    df_enriquecido = pd.read_csv(ARQUIVO_CONSOLIDADO, sep=';', encoding='latin1', dtype=textos)
+    df_agg = pd.read_csv(ARQUIVO_AGREGADO, sep=';', encoding='latin1', dtype=textos)
+    return df_enriquecido, df_agg
+
+def executar_pipeline_completo(incremental=False, formato=intermediario.FORMATO_CSV):
+    print('[INFO] Iniciando Pipeline de Enriquecimento e Agregacao...')
+    formato = intermediario.resolver_formato(formato)
+
+    with etapa('enriquecimento', incremental=incremental, formato=formato) as medicao:
+        # CARREGA DADOS FINANCEIROS
+        with etapa(f'read_{formato}') as leitura:
+            df = ler_consolidado(formato)
+            if df is not None:
+                origem = ARQUIVO_CONSOLIDADO if formato == intermediario.FORMATO_CSV else \
+                    intermediario.caminho_colunar(ARQUIVO_CONSOLIDADO, formato)
+                leitura.leu(linhas=len(df), caminho=origem)
+        if df is None:
+            print('[ERRO] Arquivo consolidado nao encontrado.')
+            return
+        medicao.leu(linhas=len(df))
+
+        print('[INFO] Aplicando validacoes e cruzando com Cadop para adicionar RegistroANS, Modalidade e UF...')
+        with etapa('carregar_cadop') as leitura:
+            df_cadop = carregar_cadop()
+            if df_cadop is not None:
+                leitura.leu(linhas=len(df_cadop))
+        if df_cadop is None:
+            print('[AVISO] Cadop nao encontrado. Preenchendo com N/D.')
+
+        with etapa('merge') as juncao:
+            if incremental:
+                df_enriquecido, df_agg = enriquecer_incremental(df, df_cadop)
+            else:
+                df_enriquecido = enriquecer(df, df_cadop)
+                df_agg = None
+            juncao.leu(linhas=len(df))
+            juncao.escreveu(linhas=len(df_enriquecido))
+
+        # 4. SALVAR O CONSOLIDADO ENRIQUECIDO 
+        print(f'[INFO] Sobrescrevendo {ARQUIVO_CONSOLIDADO} com colunas adicionadas...')
+        # Salvamos em latin1 conforme solicitado
+        with etapa('to_csv', arquivo='consolidado') as escrita:
+            df_enriquecido.to_csv(ARQUIVO_CONSOLIDADO, index=False, sep=';', encoding='latin1', float_format='%.2f', errors='replace')
+            escrita.escreveu(linhas=len(df_enriquecido), caminho=ARQUIVO_CONSOLIDADO)
+
+        # 5. AGREGACAO E ESTATISTICA
+        # Gera o arquivo despesas_agregadas.csv a partir do consolidado ja enriquecido
+        print('[INFO] Gerando despesas_agregadas.csv...')
+        if df_agg is None:
+            with etapa('groupby') as grupo:
+                df_agg = agregar(df_enriquecido)
+                grupo.leu(linhas=len(df_enriquecido))
+                grupo.escreveu(linhas=len(df_agg))
+
+        # SALVA ARQUIVO AGREGADO
+        print(f'[INFO] Salvando {ARQUIVO_AGREGADO}...')
+        with etapa('to_csv', arquivo='despesas_agregadas') as escrita:
+            df_agg.to_csv(ARQUIVO_AGREGADO, index=False, sep=';', encoding='latin1', float_format='%.2f', errors='replace')
+            escrita.escreveu(linhas=len(df_agg), caminho=ARQUIVO_AGREGADO)
+
+        # Copias tipadas para as etapas seguintes (o CSV continua sendo gerado para a carga SQL)
+        if formato != intermediario.FORMATO_CSV:
+            with etapa(f'to_{formato}') as escrita:
+                escrita.escreveu(caminho=intermediario.salvar_colunar(df_enriquecido, ARQUIVO_CONSOLIDADO, formato))
+                escrita.escreveu(caminho=intermediario.salvar_colunar(df_agg, ARQUIVO_AGREGADO, formato))
+        medicao.escreveu(linhas=len(df_enriquecido) + len(df_agg))
     
     print('------------------------------')
     print('[SUCESSO] Processo concluido.')
     print('1. consolidado.csv atualizado com RegistroANS, Modalidade e UF.')
     print('2. despesas_agregadas.csv gerado com as estatisticas.')
     print(df_agg.head())
+    return df_enriquecido, df_agg
 
 if __name__ == '__main__':
-    executar_pipeline_completo()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Enriquece o consolidado e gera despesas_agregadas.csv.')
+    parser.add_argument('--incremental', action='store_true', help='Reprocessa apenas trimestres alterados.')
+    parser.add_argument('--formato', choices=intermediario.FORMATOS, default=intermediario.FORMATO_CSV,
+                        help='Formato do consolidado recebido da transformacao.')
+    parser.add_argument('--somente-agregar', action='store_true',
+                        help='Regera despesas_agregadas.csv lendo o consolidado enriquecido em blocos.')
+    parser.add_argument('--chunk', type=int, default=TAMANHO_CHUNK, help='Linhas por bloco em --somente-agregar.')
+    args = parser.parse_args()
+
+    if args.somente_agregar:
+        with etapa('agregar_em_blocos', chunk=args.chunk) as medicao:
+            df_agg = agregar_arquivo(tamanho_chunk=args.chunk)
+            df_agg.to_csv(ARQUIVO_AGREGADO, index=False, sep=';', encoding='latin1', float_format='%.2f', errors='replace')
+            medicao.escreveu(linhas=len(df_agg), caminho=ARQUIVO_AGREGADO)
+        print(f'[SUCESSO] {ARQUIVO_AGREGADO} gerado em blocos de {args.chunk} linhas.')
+    else:
+        executar_pipeline_completo(incremental=args.incremental, formato=args.formato)
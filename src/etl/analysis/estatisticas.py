@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+# Acumuladores mergeaveis de soma, media e desvio padrao amostral por grupo.
+# Cada parte (bloco lido em streaming, parcial de um worker, trimestre da
+# execucao incremental) vira uma linha por grupo com:
+#   n     quantidade de valores
+#   soma  soma dos valores
+#   media media dos valores
+#   m2    soma dos quadrados dos desvios em relacao a media da parte
+# Dentro de uma parte, media e m2 saem do groupby do pandas (var com Welford).
+# Partes sao combinadas pela formula de Chan et al.:
+#   m2 = sum(m2_i) + sum(n_i * (media_i - media)^2)
+# que nao subtrai quadrados grandes (soma_q - soma^2/n) e por isso nao perde
+# precisao quando a media e grande e a variancia pequena.
+#
+# TOLERANCIA frente ao groupby(...).agg(sum, mean, std) do pandas: diferenca
+# de ate 1e-9 relativa ao maior entre o valor e a media do grupo, em
+# Total_Despesas, Media_Trimestral e Desvio_Padrao (na pratica ~1e-15; so a
+# ordem das somas em ponto flutuante muda com a divisao em partes).
+# Invisivel no arredondamento de 2 casas dos CSVs, salvo valores exatamente
+# na fronteira de arredondamento.
+
+COLUNAS_ACUMULADOR = ['n', 'soma', 'media', 'm2']
+TOLERANCIA_RELATIVA = 1e-9
+
+
+def acumular(df, chaves, coluna='ValorDespesas'):
+    '''
+    Acumuladores de uma parte: uma linha por grupo (chaves) com n, soma, media e m2.
+    '''
+    grupos = df.groupby(chaves, observed=True)[coluna]
+    acumuladores = pd.DataFrame({
+        'n': grupos.count(),
+        'soma': grupos.sum(),
+        'media': grupos.mean(),
+        'm2': grupos.var(ddof=0) * grupos.count(),
+    })
+    return acumuladores[acumuladores['n'] > 0].reset_index()
+
+
+def mesclar(partes, chaves):
+    '''
+    Combina acumuladores de varias partes (Chan), agrupando pelas chaves pedidas.
+    As partes podem ter chaves extras (ex.: Ano/Trimestre), que sao somadas.
+    '''
+    partes = [p for p in partes if p is not None and len(p)]
+    if not partes:
+        return pd.DataFrame(columns=list(chaves) + COLUNAS_ACUMULADOR)
+    todas = pd.concat([p[list(chaves) + COLUNAS_ACUMULADOR] for p in partes], ignore_index=True)
+
+    # Media combinada = soma total / n total; m2 soma o espalhamento entre as medias das partes
+    grupos = todas.groupby(chaves, observed=True)
+    media = grupos['soma'].transform('sum') / grupos['n'].transform('sum')
+    todas['espalhamento'] = todas['n'] * (todas['media'] - media) ** 2
+
+    resultado = todas.groupby(chaves, observed=True).agg(
+        n=('n', 'sum'), soma=('soma', 'sum'), m2=('m2', 'sum'), espalhamento=('espalhamento', 'sum')
+    )
+    resultado['media'] = resultado['soma'] / resultado['n']
+    resultado['m2'] = resultado['m2'] + resultado.pop('espalhamento')
+    return resultado.reset_index()[list(chaves) + COLUNAS_ACUMULADOR]
+
+
+def agregar_em_blocos(blocos, chaves, coluna='ValorDespesas', filtro=None):
+    '''
+    Uma passada sobre um iteravel de DataFrames (ex.: read_csv com chunksize),
+    mantendo em memoria so os acumuladores por grupo.
+    '''
+    acumulado = None
+    for bloco in blocos:
+        if filtro is not None:
+            bloco = bloco[filtro(bloco)]
+        acumulado = mesclar([acumulado, acumular(bloco, chaves, coluna)], chaves)
+    return acumulado if acumulado is not None else mesclar([], chaves)
+
+
+def finalizar(acumuladores, chaves):
+    '''
+    Colunas de despesas_agregadas: total, media e desvio padrao amostral
+    (ddof=1, como o std do pandas; grupo com um valor so recebe 0).
+    '''
+    n = acumuladores['n']
+    desvio = np.sqrt((acumuladores['m2'] / (n - 1)).where(n > 1, 0).clip(lower=0))
+    df_agg = pd.DataFrame({
+        **{c: acumuladores[c] for c in chaves},
+        'Total_Despesas': acumuladores['soma'],
+        'Media_Trimestral': acumuladores['media'],
+        'Desvio_Padrao': desvio,
+    })
+    return df_agg.sort_values(by='Total_Despesas', ascending=False)
+
+
+def comparar_com_pandas(df_agg, referencia, chaves):
+    '''
+    Maior diferenca relativa por coluna entre o resultado dos acumuladores e o
+    groupby do pandas (mesmas chaves). Usado pelos benchmarks e conferencias.
+    '''
+    juntos = df_agg.merge(referencia, on=list(chaves), suffixes=('', '_pandas'), validate='one_to_one')
+    if len(juntos) != len(df_agg) or len(juntos) != len(referencia):
+        raise ValueError('Grupos diferentes entre os resultados.')
+    # Escala: o proprio valor ou a media do grupo, o que for maior (um desvio
+    # quase nulo nao tem algarismos significativos proprios)
+    media = np.abs(juntos['Media_Trimestral_pandas'].to_numpy())
+    erros = {}
+    for col in ('Total_Despesas', 'Media_Trimestral', 'Desvio_Padrao'):
+        a, b = juntos[col].to_numpy(), juntos[f'{col}_pandas'].to_numpy()
+        escala = np.maximum(np.maximum(np.abs(b), media), np.finfo(float).tiny)
+        erros[col] = float(np.max(np.abs(a - b) / escala)) if len(juntos) else 0.0
+    return erros
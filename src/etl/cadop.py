@@ -0,0 +1,103 @@
+import os
+import glob
+import threading
+import numpy as np
+import pandas as pd
+
+import caminhos
+import estado_incremental
+from instrumentacao import etapa
+
+# Cadastro de operadoras (CADOP) lido uma única vez por versão do arquivo.
+# O CSV é parseado, o CNPJ é normalizado e o resultado vai para
+# data/estado/cadop_<hash>.pkl em duas tabelas compactas:
+#   por_registro: índice REGISTRO_OPERADORA -> RazaoSocial, CNPJ (transformação)
+#   por_cnpj:     índice KEY_CNPJ -> RegistroANS, Modalidade, UF (enriquecimento)
+# Execuções seguintes (e a outra etapa no mesmo processo) só leem o pickle.
+
+# A extração grava "Relatorio_cadop.csv"; cópias manuais costumam vir com C maiúsculo
+NOMES_CADOP = ('Relatorio_Cadop.csv', 'Relatorio_cadop.csv')
+COLUNAS_CADOP = ['REGISTRO_OPERADORA', 'CNPJ', 'Razao_Social', 'Modalidade', 'UF']
+PREFIXO_CACHE = 'cadop_'
+
+_LOCK = threading.Lock()
+_em_memoria = {}
+
+
+class Cadop:
+    def __init__(self, por_registro: pd.DataFrame, por_cnpj: pd.DataFrame, hash_arquivo: str):
+        self.por_registro = por_registro
+        self.por_cnpj = por_cnpj
+        self.hash_arquivo = hash_arquivo
+
+
+def caminho_cadop() -> str:
+    for nome in NOMES_CADOP:
+        caminho = os.path.join(caminhos.PASTA_RAW, nome)
+        if os.path.exists(caminho):
+            return caminho
+    return os.path.join(caminhos.PASTA_RAW, NOMES_CADOP[0])
+
+
+def normalizar_cnpj(serie: pd.Series) -> pd.Series:
+    # Só dígitos, 14 posições; nulos viram ''. Calculado uma vez por valor distinto.
+    codigos, unicos = pd.factorize(serie)
+    limpos = pd.Index(unicos.astype(str)).str.replace(r'[^0-9]', '', regex=True).str.zfill(14)
+    resultado = np.full(len(codigos), '', dtype=object)
+    resultado[codigos >= 0] = np.asarray(limpos, dtype=object)[codigos[codigos >= 0]]
+    return pd.Series(resultado, index=serie.index, dtype=object)
+
+
+def ler_csv(caminho: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+    df = pd.read_csv(caminho, sep=';', encoding='latin1', dtype=str, usecols=COLUNAS_CADOP)
+    df['KEY_CNPJ'] = normalizar_cnpj(df['CNPJ'])
+
+    # Registro repetido: vale a última linha (mesma regra do dict usado antes)
+    por_registro = (
+        df.drop_duplicates(subset=['REGISTRO_OPERADORA'], keep='last')
+        .set_index('REGISTRO_OPERADORA')[['Razao_Social', 'CNPJ']]
+        .rename(columns={'Razao_Social': 'RazaoSocial'})
+    )
+    # Deduplicação do Cadop pelo CNPJ limpo, evitando produto cartesiano no cruzamento
+    por_cnpj = (
+        df.drop_duplicates(subset=['KEY_CNPJ'], keep='last')
+        .set_index('KEY_CNPJ')[['REGISTRO_OPERADORA', 'Modalidade', 'UF']]
+        .rename(columns={'REGISTRO_OPERADORA': 'RegistroANS'})
+        .astype({'Modalidade': 'category', 'UF': 'category'})
+    )
+    return por_registro, por_cnpj
+
+
+def _caminho_cache(hash_arquivo: str) -> str:
+    return os.path.join(estado_incremental.PASTA_ESTADO, f'{PREFIXO_CACHE}{hash_arquivo[:16]}.pkl')
+
+
+def carregar() -> Cadop | None:
+    # None quando o arquivo não existe
+    caminho = caminho_cadop()
+    if not os.path.exists(caminho):
+        return None
+
+    with _LOCK, etapa('carregar_cadop') as medicao:
+        hash_arquivo = estado_incremental.hash_fonte(caminho)
+        if hash_arquivo in _em_memoria:
+            return _em_memoria[hash_arquivo]
+
+        cache = _caminho_cache(hash_arquivo)
+        if os.path.exists(cache):
+            por_registro, por_cnpj = pd.read_pickle(cache)
+            medicao.leu(caminho=cache)
+        else:
+            por_registro, por_cnpj = ler_csv(caminho)
+            medicao.leu(caminho=caminho)
+            os.makedirs(estado_incremental.PASTA_ESTADO, exist_ok=True)
+            for antigo in glob.glob(os.path.join(estado_incremental.PASTA_ESTADO, f'{PREFIXO_CACHE}*.pkl')):
+                os.remove(antigo)
+            pd.to_pickle((por_registro, por_cnpj), cache)
+            medicao.escreveu(caminho=cache)
+        medicao.leu(linhas=len(por_registro))
+
+        resultado = Cadop(por_registro, por_cnpj, hash_arquivo)
+        _em_memoria.clear()
+        _em_memoria[hash_arquivo] = resultado
+        return resultado
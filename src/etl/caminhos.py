@@ -0,0 +1,11 @@
+import os
+
+# Raiz dos dados do pipeline. Por padrão, a pasta data/ do projeto, qualquer
+# que seja o diretório atual; ETL_RAIZ_DADOS (ou pipeline.py --raiz) troca a raiz.
+RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+RAIZ_DADOS = os.path.abspath(os.getenv('ETL_RAIZ_DADOS', os.path.join(RAIZ_PROJETO, 'data')))
+
+PASTA_RAW = os.path.join(RAIZ_DADOS, 'raw')
+PASTA_PROCESSED = os.path.join(RAIZ_DADOS, 'processed')
+PASTA_ESTADO = os.path.join(RAIZ_DADOS, 'estado')
+PASTA_METRICAS = os.path.join(RAIZ_DADOS, 'metricas')
@@ -0,0 +1,94 @@
+import os
+import json
+import hashlib
+import zipfile
+import pandas as pd
+
+import caminhos
+
+# Estado local das execuções incrementais (impressões digitais e parciais)
+PASTA_ESTADO = caminhos.PASTA_ESTADO
+PASTA_PARCIAIS = os.path.join(PASTA_ESTADO, 'parciais')
+
+# Mudar quando a lógica de transformação mudar, para invalidar as parciais
+VERSAO_TRANSFORMACAO = '3'
+
+TAMANHO_BLOCO_HASH = 1024 * 1024
+
+
+def _hash_stream(f) -> str:
+    sha = hashlib.sha256()
+    for bloco in iter(lambda: f.read(TAMANHO_BLOCO_HASH), b''):
+        sha.update(bloco)
+    return sha.hexdigest()
+
+
+def hash_fonte(fonte) -> str:
+    # SHA-256 do conteúdo: arquivo em disco ou membro (caminho_zip, membro)
+    if isinstance(fonte, tuple):
+        caminho_zip, membro = fonte
+        with zipfile.ZipFile(caminho_zip) as zf, zf.open(membro) as f:
+            return _hash_stream(f)
+    if not os.path.exists(fonte):
+        return ''
+    with open(fonte, 'rb') as f:
+        return _hash_stream(f)
+
+
+def chave_parcial(*partes: str) -> str:
+    return hashlib.sha256('|'.join(partes).encode('utf-8')).hexdigest()
+
+
+def carregar_estado(nome: str) -> dict:
+    caminho = os.path.join(PASTA_ESTADO, f'{nome}.json')
+    if not os.path.exists(caminho):
+        return {}
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print(f'Aviso: estado {caminho} ilegível, execução completa.')
+        return {}
+
+
+def salvar_estado(nome: str, estado: dict) -> None:
+    os.makedirs(PASTA_ESTADO, exist_ok=True)
+    caminho = os.path.join(PASTA_ESTADO, f'{nome}.json')
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, indent=2, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def carregar_parcial(chave: str) -> pd.DataFrame | None:
+    caminho = os.path.join(PASTA_PARCIAIS, f'{chave}.pkl')
+    if not os.path.exists(caminho):
+        return None
+    return pd.read_pickle(caminho)
+
+
+def salvar_parcial(chave: str, df: pd.DataFrame) -> None:
+    os.makedirs(PASTA_PARCIAIS, exist_ok=True)
+    df.to_pickle(os.path.join(PASTA_PARCIAIS, f'{chave}.pkl'))
+
+
+def limpar_parciais(chaves_em_uso: set[str]) -> None:
+    # Remove parciais de fontes que mudaram ou deixaram de existir
+    if not os.path.exists(PASTA_PARCIAIS):
+        return
+    for nome in os.listdir(PASTA_PARCIAIS):
+        chave, extensao = os.path.splitext(nome)
+        if extensao == '.pkl' and chave not in chaves_em_uso:
+            os.remove(os.path.join(PASTA_PARCIAIS, nome))
+
+
+def carregar_tabela(nome: str) -> pd.DataFrame | None:
+    caminho = os.path.join(PASTA_ESTADO, f'{nome}.pkl')
+    if not os.path.exists(caminho):
+        return None
+    return pd.read_pickle(caminho)
+
+
+def salvar_tabela(nome: str, df: pd.DataFrame) -> None:
+    os.makedirs(PASTA_ESTADO, exist_ok=True)
+    df.to_pickle(os.path.join(PASTA_ESTADO, f'{nome}.pkl'))
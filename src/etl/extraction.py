@@ -1,13 +1,209 @@
 import os
+import json
+import time
+import threading
+import argparse
 import requests
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import caminhos
+from instrumentacao import etapa
 
  # Definições de constantes
 BASE_URL = 'https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/'
-PASTA_RAW = os.path.join('data', 'raw')
+PASTA_RAW = caminhos.PASTA_RAW
 URL_CADOP = 'https://dadosabertos.ans.gov.br/FTP/PDA/operadoras_de_plano_de_saude_ativas/Relatorio_cadop.csv'
 
+# Manifesto local com ETag/Last-Modified/tamanho de cada arquivo baixado
+NOME_MANIFESTO = '.manifesto_downloads.json'
+TAMANHO_BLOCO = 1024 * 1024
+MAX_DOWNLOADS_SIMULTANEOS = 4
+
+
+# Sessão HTTP com pool de conexões e retentativas
+def criar_sessao(pool: int = MAX_DOWNLOADS_SIMULTANEOS) -> requests.Session:
+    sessao = requests.Session()
+    retry = Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=pool, pool_maxsize=pool, max_retries=retry)
+    sessao.mount('http://', adapter)
+    sessao.mount('https://', adapter)
+    return sessao
+
+
+# Lock único: downloads simultâneos (trimestres e CADOP) dividem o mesmo manifesto
+_LOCK_MANIFESTO = threading.Lock()
+
+
+class Manifesto:
+    # Guarda os metadados HTTP dos downloads concluídos. Cada atualização relê
+    # o arquivo do disco sob o lock, para não perder entradas gravadas por
+    # outra instância apontando para a mesma pasta.
+    def __init__(self, pasta: str):
+        self.caminho = os.path.join(pasta, NOME_MANIFESTO)
+
+    def _ler(self) -> dict:
+        if not os.path.exists(self.caminho):
+            return {}
+        try:
+            with open(self.caminho, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            print(f'Aviso: manifesto {self.caminho} ilegível, será recriado.')
+            return {}
+
+    def obter(self, nome: str) -> dict:
+        with _LOCK_MANIFESTO:
+            return self._ler().get(nome, {})
+
+    def registrar(self, nome: str, entrada: dict) -> None:
+        with _LOCK_MANIFESTO:
+            entradas = self._ler()
+            entradas[nome] = entrada
+            temporario = self.caminho + '.tmp'
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(entradas, f, indent=2, ensure_ascii=False)
+            os.replace(temporario, self.caminho)
+
+
+def _metadados(headers) -> dict:
+    tamanho = headers.get('Content-Length')
+    return {
+        'etag': headers.get('ETag'),
+        'last_modified': headers.get('Last-Modified'),
+        'tamanho': int(tamanho) if tamanho is not None else None,
+    }
+
+
+def _inalterado(remoto: dict, local: dict, caminho: str) -> bool:
+    # Arquivo só é pulado se existir inteiro e o servidor confirmar a mesma versão
+    if not local or not os.path.exists(caminho):
+        return False
+    if remoto['tamanho'] is not None and os.path.getsize(caminho) != remoto['tamanho']:
+        return False
+    if remoto['etag'] and local.get('etag'):
+        return remoto['etag'] == local['etag']
+    if remoto['last_modified'] and local.get('last_modified'):
+        return remoto['last_modified'] == local['last_modified']
+    return remoto['tamanho'] is not None and remoto['tamanho'] == local.get('tamanho')
+
+
+def baixar_arquivo(sessao: requests.Session, url: str, caminho: str, manifesto: Manifesto,
+                   timeout: int = 60) -> dict:
+    with etapa('download', arquivo=os.path.basename(caminho)) as medicao:
+        resultado = _baixar_arquivo(sessao, url, caminho, manifesto, timeout)
+        medicao.contexto['status'] = resultado['status']
+        medicao.escreveu(bytes_=resultado['bytes'])
+    return resultado
+
+
+def _tamanho_total(headers, remoto: dict) -> int | None:
+    # "Content-Range: bytes */12345" da resposta 416; senão, o tamanho do HEAD
+    intervalo = headers.get('Content-Range', '')
+    if intervalo.startswith('bytes */') and intervalo[8:].isdigit():
+        return int(intervalo[8:])
+    return remoto['tamanho']
+
+
+def _receber(sessao: requests.Session, url: str, parcial: str, headers: dict,
+             timeout: int) -> tuple[int, int, dict]:
+    # Grava a resposta em parcial (anexa se for 206). Devolve o status HTTP, os
+    # bytes recebidos e os cabeçalhos; 404 e 416 voltam sem gravar nada.
+    with sessao.get(url, stream=True, timeout=timeout, headers=headers) as response:
+        if response.status_code in (404, 416):
+            return response.status_code, 0, response.headers
+        response.raise_for_status()
+
+        recebidos = 0
+        with open(parcial, 'ab' if response.status_code == 206 else 'wb') as f:
+            for bloco in response.iter_content(chunk_size=TAMANHO_BLOCO):
+                f.write(bloco)
+                recebidos += len(bloco)
+        return response.status_code, recebidos, response.headers
+
+
+def _baixar_arquivo(sessao: requests.Session, url: str, caminho: str, manifesto: Manifesto,
+                    timeout: int) -> dict:
+    # Baixa url para caminho em streaming. Pula arquivos inalterados segundo o
+    # manifesto e retoma downloads interrompidos (.part) com HTTP Range.
+    nome = os.path.basename(caminho)
+    parcial = caminho + '.part'
+    resultado = {'arquivo': nome, 'url': url, 'status': 'erro', 'bytes': 0, 'segundos': 0.0, 'mb_s': 0.0}
+
+    inicio = time.perf_counter()
+    try:
+        cabecalho = sessao.head(url, timeout=timeout, allow_redirects=True)
+        if cabecalho.status_code == 404:
+            resultado['status'] = 'nao_encontrado'
+            return resultado
+        remoto = _metadados(cabecalho.headers) if cabecalho.ok else _metadados({})
+        local = manifesto.obter(nome)
+
+        if _inalterado(remoto, local, caminho):
+            resultado['status'] = 'inalterado'
+            return resultado
+
+        headers = {}
+        ja_baixado = os.path.getsize(parcial) if os.path.exists(parcial) else 0
+        # Só retoma se o .part for da mesma versão do arquivo remoto
+        mesma_versao = local.get('parcial_etag') == remoto['etag'] if remoto['etag'] else False
+        if ja_baixado and mesma_versao and cabecalho.headers.get('Accept-Ranges') == 'bytes':
+            headers['Range'] = f'bytes={ja_baixado}-'
+            headers['If-Range'] = remoto['etag']
+        else:
+            ja_baixado = 0
+
+        # Marca a versão do .part antes de começar, para permitir retomar depois
+        manifesto.registrar(nome, {**local, 'parcial_etag': remoto['etag']})
+
+        status, recebidos, cabecalhos = _receber(sessao, url, parcial, headers, timeout)
+        if status == 416:
+            # Range além do fim: o .part já pode estar inteiro (só faltou o rename)
+            if _tamanho_total(cabecalhos, remoto) != ja_baixado:
+                os.remove(parcial)
+                ja_baixado = 0
+                status, recebidos, _ = _receber(sessao, url, parcial, {}, timeout)
+        if status == 404:
+            resultado['status'] = 'nao_encontrado'
+            return resultado
+        if status == 200:
+            ja_baixado = 0
+
+        os.replace(parcial, caminho)
+        manifesto.registrar(nome, {
+            'url': url,
+            'etag': remoto['etag'],
+            'last_modified': remoto['last_modified'],
+            'tamanho': os.path.getsize(caminho),
+        })
+        resultado['status'] = 'retomado' if ja_baixado else 'baixado'
+        resultado['bytes'] = recebidos
+    except Exception as e:
+        # Falha de rede ou de disco fica restrita a este arquivo
+        print(f'Erro crítico em {url}: {e}')
+    finally:
+        resultado['segundos'] = round(time.perf_counter() - inicio, 3)
+        if resultado['bytes'] and resultado['segundos']:
+            resultado['mb_s'] = round(resultado['bytes'] / 2**20 / resultado['segundos'], 2)
+
+    return resultado
+
+
+def _imprimir_resultado(resultado: dict) -> None:
+    status = resultado['status']
+    if status in ('baixado', 'retomado'):
+        print(f"{resultado['arquivo']}: {status} {resultado['bytes'] / 2**20:.1f} MB "
+              f"em {resultado['segundos']:.1f} s ({resultado['mb_s']:.2f} MB/s)")
+    elif status == 'inalterado':
+        print(f"{resultado['arquivo']}: inalterado, download pulado.")
+    elif status == 'nao_encontrado':
+        print(f"Não encontrado: {resultado['url']}")
+        print('Dica: a ANS pode não ter disponibilizado o arquivo ainda.')
+
+
 # Funções para extração de dados
 def obter_trimestres_recentes() -> list[str]:
     trimestres = []
@@ -25,74 +221,93 @@ def obter_trimestres_recentes() -> list[str]:
         data_ref -= timedelta(days=90)
 
     return sorted(trimestres)
-# Função para baixar e extrair arquivos ZIP da ANS
-def baixar_arquivos_ans(trimestres: list[str]) -> None:
-    #Baixa e extrai os arquivos ZIP dos trimestres fornecidos
-    if not os.path.exists(PASTA_RAW):
-        os.makedirs(PASTA_RAW)
-        print(f'Pasta criada: {PASTA_RAW}')
 
-    print(f'Buscando os seguintes períodos: {trimestres}')
 
-    for trimestre in trimestres:
+def _url_e_caminho_trimestre(trimestre: str, base_url: str, pasta: str) -> tuple[str, str]:
+    ano = trimestre.split('/')[0]
+    periodo = trimestre.split('/')[1]
+
+    nome_arquivo = f'{periodo}{ano}.zip'
+    url = f'{base_url}{ano}/{nome_arquivo}'
 
-        ano = trimestre.split('/')[0]
-        periodo = trimestre.split('/')[1]
+    nome_arquivo_local = f'{ano}_{periodo}_demonstracoes_contabeis.zip'
+    return url, os.path.join(pasta, nome_arquivo_local)
 
 
-        nome_arquivo = f'{periodo}{ano}.zip'
-        url = f'{BASE_URL}{ano}/{nome_arquivo}'
+def _extrair_zip(caminho_zip: str, pasta: str, forcar: bool) -> None:
+    try:
+        with etapa('unzip', arquivo=os.path.basename(caminho_zip)) as medicao, \
+                zipfile.ZipFile(caminho_zip, 'r') as zip_ref:
+            faltando = [m for m in zip_ref.namelist() if not os.path.exists(os.path.join(pasta, m))]
+            if forcar or faltando:
+                zip_ref.extractall(pasta)
+                medicao.leu(caminho=caminho_zip)
+                medicao.escreveu(bytes_=sum(info.file_size for info in zip_ref.infolist()))
+                print(f'Arquivo extraído: {caminho_zip}')
+    except zipfile.BadZipFile:
+        print(f'Erro: Arquivo corrompido de {caminho_zip}')
 
-        nome_arquivo_local = f'{ano}_{periodo}_demonstracoes_contabeis.zip'
-        caminho_zip = os.path.join(PASTA_RAW, nome_arquivo_local)
 
-        print(f'Baixando {trimestre}...')
+# Função para baixar e extrair arquivos ZIP da ANS
+def baixar_arquivos_ans(trimestres: list[str], base_url: str = BASE_URL, pasta: str = PASTA_RAW,
+                        workers: int = MAX_DOWNLOADS_SIMULTANEOS,
+                        sessao: requests.Session | None = None,
+                        extrair: bool = False) -> list[dict]:
+    #Baixa os arquivos ZIP dos trimestres fornecidos, em paralelo.
+    #A transformação lê os CSVs direto de dentro dos ZIPs; extrair=True
+    #mantém o comportamento antigo de descompactar em data/raw.
+    if not os.path.exists(pasta):
+        os.makedirs(pasta)
+        print(f'Pasta criada: {pasta}')
 
-        try:
-            response = requests.get(url, stream=True, timeout=60)
+    print(f'Buscando os seguintes períodos: {trimestres}')
+
+    sessao = sessao or criar_sessao(workers)
+    manifesto = Manifesto(pasta)
+    alvos = [_url_e_caminho_trimestre(t, base_url, pasta) for t in trimestres]
 
-            if response.status_code == 200:
-                with open(caminho_zip, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        resultados = list(executor.map(lambda alvo: baixar_arquivo(sessao, alvo[0], alvo[1], manifesto), alvos))
 
-                print(f'Arquivo baixado: {caminho_zip}')
-                try:
-                    with zipfile.ZipFile(caminho_zip, 'r') as zip_ref:
-                        zip_ref.extractall(PASTA_RAW)
-                    print(f'Arquivo extraído: {caminho_zip}')
-                except zipfile.BadZipFile:
-                    print(f'Erro: Arquivo corrompido de {caminho_zip}')
+    for (_, caminho_zip), resultado in zip(alvos, resultados):
+        _imprimir_resultado(resultado)
+        if extrair and resultado['status'] in ('baixado', 'retomado', 'inalterado'):
+            _extrair_zip(caminho_zip, pasta, forcar=resultado['status'] != 'inalterado')
 
-            else:
-                print(f'Não encontrado(Erro {response.status_code}): {url}')
-                print('Dica: a ANS pode não ter disponibilizado o arquivo ainda.')
-        except Exception as e:
-            print(f'Erro crítico em {url}: {e}')
+    return resultados
 
 
 # Função para baixar o cadastro de operadoras (CADOP)
-def baixar_cadastro_operadoras() -> None:
+def baixar_cadastro_operadoras(url: str = URL_CADOP, pasta: str = PASTA_RAW,
+                               sessao: requests.Session | None = None) -> dict:
     print('Baixando arquivo CADOP...')
     nome_arquivo = 'Relatorio_cadop.csv'
-    caminho_arquivo = os.path.join(PASTA_RAW, nome_arquivo)
+    caminho_arquivo = os.path.join(pasta, nome_arquivo)
+    os.makedirs(pasta, exist_ok=True)
 
-    try:
-        response = requests.get(URL_CADOP, stream=True, timeout=60)
+    # Grava direto em disco, bloco a bloco, em vez de bufferizar response.content
+    resultado = baixar_arquivo(sessao or criar_sessao(1), url, caminho_arquivo, Manifesto(pasta))
+    _imprimir_resultado(resultado)
+    if resultado['status'] in ('baixado', 'retomado'):
+        print(f'Sucesso: Cadastro de Operadoras baixado {caminho_arquivo}')
+    elif resultado['status'] == 'erro':
+        print('Erro ao baixar o arquivo CADOP.')
+    return resultado
 
-        if response.status_code == 200:
-            with open(caminho_arquivo, 'wb') as f:
-                f.write(response.content)
-            print(f'Sucesso: Cadastro de Operadoras baixado {caminho_arquivo}')
-        else:
-            print(f'Erro {response.status_code} ao baixar o arquivo CADOP.')
-    except Exception as e:
-        print(f'Erro crítico ao baixar o arquivo CADOP: {e}')
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Baixa as demonstrações contábeis e o CADOP da ANS.')
+    parser.add_argument('--workers', type=int, default=MAX_DOWNLOADS_SIMULTANEOS, help='Downloads simultâneos.')
+    parser.add_argument('--extrair', action='store_true', help='Também descompacta os ZIPs em data/raw.')
+    args = parser.parse_args()
 
     lista_trimestres = obter_trimestres_recentes()
-    baixar_arquivos_ans(lista_trimestres)
-    baixar_cadastro_operadoras()
+    sessao_http = criar_sessao(args.workers + 1)
+
+    # O CADOP é baixado junto com os trimestres, na mesma sessão
+    with etapa('extracao', workers=args.workers), ThreadPoolExecutor(max_workers=1) as executor_cadop:
+        futuro_cadop = executor_cadop.submit(baixar_cadastro_operadoras, sessao=sessao_http)
+        baixar_arquivos_ans(lista_trimestres, workers=args.workers, sessao=sessao_http, extrair=args.extrair)
+        futuro_cadop.result()
 
-print('\nProcesso finalizado.')
\ No newline at end of file
+    print('\nProcesso finalizado.')
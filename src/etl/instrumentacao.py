@@ -0,0 +1,258 @@
+import os
+import sys
+import json
+import time
+import uuid
+import atexit
+import argparse
+import threading
+import functools
+from contextlib import contextmanager
+from datetime import datetime
+
+import caminhos
+
+# Métricas por etapa do ETL, gravadas como JSON lines (uma linha por etapa).
+# ETL_METRICAS=0 desliga a gravação; ETL_METRICAS=<caminho> muda o arquivo.
+# ETL_RELATORIO=<caminho> grava, ao fim do processo, o relatório da execução.
+PASTA_METRICAS = caminhos.PASTA_METRICAS
+ARQUIVO_METRICAS = os.path.join(PASTA_METRICAS, 'etl_metricas.jsonl')
+
+# Identifica a execução: processos do pool herdam a variável do processo pai
+VARIAVEL_EXECUCAO = 'ETL_EXECUCAO'
+ID_EXECUCAO = os.environ.setdefault(VARIAVEL_EXECUCAO, datetime.now().strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6])
+
+# Variação de tempo acima da qual o relatório marca regressão
+LIMIAR_REGRESSAO = 0.2
+
+_LOCK_ARQUIVO = threading.Lock()
+_pilha = threading.local()
+
+
+def _caminho_metricas() -> str | None:
+    destino = os.getenv('ETL_METRICAS', ARQUIVO_METRICAS)
+    return None if destino in ('', '0') else destino
+
+
+def _pico_rss_mb() -> float | None:
+    # Pico de memória residente do processo até agora (high-water mark)
+    try:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux informa em KB, macOS em bytes
+        return round(pico / (2**20 if sys.platform == 'darwin' else 2**10), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, 'peak_wset', info.rss) / 2**20, 1)
+    except ImportError:
+        return None
+
+
+class Medicao:
+    # Contadores preenchidos pela etapa em andamento
+    def __init__(self, nome: str, contexto: dict):
+        self.nome = nome
+        self.contexto = contexto
+        self.linhas_entrada = None
+        self.linhas_saida = None
+        self.bytes_lidos = None
+        self.bytes_escritos = None
+
+    def leu(self, linhas: int | None = None, caminho: str | None = None, bytes_: int | None = None) -> None:
+        if linhas is not None:
+            self.linhas_entrada = (self.linhas_entrada or 0) + int(linhas)
+        if caminho is not None and os.path.exists(caminho):
+            bytes_ = (bytes_ or 0) + os.path.getsize(caminho)
+        if bytes_ is not None:
+            self.bytes_lidos = (self.bytes_lidos or 0) + int(bytes_)
+
+    def escreveu(self, linhas: int | None = None, caminho: str | None = None, bytes_: int | None = None) -> None:
+        if linhas is not None:
+            self.linhas_saida = (self.linhas_saida or 0) + int(linhas)
+        if caminho is not None and os.path.exists(caminho):
+            bytes_ = (bytes_ or 0) + os.path.getsize(caminho)
+        if bytes_ is not None:
+            self.bytes_escritos = (self.bytes_escritos or 0) + int(bytes_)
+
+
+def registrar(registro: dict) -> None:
+    caminho = _caminho_metricas()
+    if caminho is None:
+        return
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    linha = json.dumps(registro, ensure_ascii=False, default=str) + '\n'
+    # Linhas curtas em modo append não se misturam entre processos do pool
+    with _LOCK_ARQUIVO, open(caminho, 'a', encoding='utf-8') as f:
+        f.write(linha)
+
+
+def _caminho_na_pilha(nome: str) -> str:
+    return '/'.join(getattr(_pilha, 'nomes', []) + [nome])
+
+
+def registrar_duracao(nome: str, segundos: float, **contexto) -> None:
+    # Para trechos já cronometrados por fora (ex.: cada resultado de um lote
+    # multi-statement no MySQL), sem CPU nem memória
+    registrar({
+        'execucao': ID_EXECUCAO,
+        'etapa': _caminho_na_pilha(nome),
+        'inicio': datetime.now().isoformat(timespec='seconds'),
+        'parede_s': round(segundos, 4),
+        'cpu_s': None,
+        'status': 'ok',
+        'pid': os.getpid(),
+        **({'contexto': contexto} if contexto else {}),
+    })
+
+
+@contextmanager
+def etapa(nome: str, **contexto):
+    # Mede tempo de parede, CPU do processo e pico de RSS de um trecho.
+    # Etapas aninhadas na mesma thread gravam o caminho completo
+    # (ex.: transformacao/agregar_arquivo/read_csv).
+    pilha = getattr(_pilha, 'nomes', None)
+    if pilha is None:
+        pilha = _pilha.nomes = []
+    pilha.append(nome)
+    caminho_etapa = '/'.join(pilha)
+
+    medicao = Medicao(nome, contexto)
+    rss_inicial = _pico_rss_mb()
+    inicio = time.perf_counter()
+    cpu_inicial = time.process_time()
+    status, erro = 'ok', None
+    try:
+        yield medicao
+    except BaseException as e:
+        status, erro = 'erro', f'{type(e).__name__}: {e}'
+        raise
+    finally:
+        parede = time.perf_counter() - inicio
+        cpu = time.process_time() - cpu_inicial
+        pilha.pop()
+        rss_final = _pico_rss_mb()
+        registrar({
+            'execucao': ID_EXECUCAO,
+            'etapa': caminho_etapa,
+            'inicio': datetime.now().isoformat(timespec='seconds'),
+            'parede_s': round(parede, 4),
+            'cpu_s': round(cpu, 4),
+            'pico_rss_mb': rss_final,
+            'aumento_pico_rss_mb': round(rss_final - rss_inicial, 1) if rss_final is not None else None,
+            'linhas_entrada': medicao.linhas_entrada,
+            'linhas_saida': medicao.linhas_saida,
+            'bytes_lidos': medicao.bytes_lidos,
+            'bytes_escritos': medicao.bytes_escritos,
+            'status': status,
+            'erro': erro,
+            'pid': os.getpid(),
+            **({'contexto': contexto} if contexto else {}),
+        })
+
+
+def medir(nome: str | None = None):
+    # Decorador: a função inteira vira uma etapa
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with etapa(nome or funcao.__name__):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
+
+
+def ler_metricas(caminho: str | None = None) -> list[dict]:
+    caminho = caminho or _caminho_metricas() or ARQUIVO_METRICAS
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return [json.loads(linha) for linha in f if linha.strip()]
+
+
+def resumir_execucao(registros: list[dict]) -> dict:
+    # Soma as ocorrências de cada etapa (ex.: um read_csv por arquivo)
+    resumo = {}
+    for r in registros:
+        item = resumo.setdefault(r['etapa'], {
+            'ocorrencias': 0, 'parede_s': 0.0, 'cpu_s': 0.0, 'pico_rss_mb': None,
+            'linhas_entrada': 0, 'linhas_saida': 0, 'bytes_lidos': 0, 'bytes_escritos': 0, 'erros': 0,
+        })
+        item['ocorrencias'] += 1
+        item['parede_s'] += r['parede_s']
+        item['cpu_s'] += r.get('cpu_s') or 0
+        if r.get('pico_rss_mb') is not None:
+            item['pico_rss_mb'] = max(item['pico_rss_mb'] or 0, r['pico_rss_mb'])
+        for campo in ('linhas_entrada', 'linhas_saida', 'bytes_lidos', 'bytes_escritos'):
+            item[campo] += r.get(campo) or 0
+        item['erros'] += r['status'] != 'ok'
+    return resumo
+
+
+def gerar_relatorio(execucao: str | None = None, anterior: str | None = None,
+                    caminho_metricas: str | None = None) -> str:
+    # Tabela por etapa da execução pedida (padrão: a última registrada),
+    # com a variação do tempo de parede em relação à execução anterior.
+    registros = ler_metricas(caminho_metricas)
+    execucoes = list(dict.fromkeys(r['execucao'] for r in registros))
+    if not execucoes:
+        return 'Nenhuma métrica registrada.'
+    execucao = execucao or execucoes[-1]
+    etapas_por_execucao = {}
+    for r in registros:
+        etapas_por_execucao.setdefault(r['execucao'], set()).add(r['etapa'])
+    if anterior is None and execucao in execucoes:
+        # Execução anterior do mesmo script: a mais recente com etapas em comum
+        anteriores = execucoes[:execucoes.index(execucao)]
+        anterior = next((e for e in reversed(anteriores)
+                         if etapas_por_execucao[e] & etapas_por_execucao[execucao]), None)
+
+    atual = resumir_execucao([r for r in registros if r['execucao'] == execucao])
+    base = resumir_execucao([r for r in registros if r['execucao'] == anterior]) if anterior else {}
+
+    linhas = [
+        f'Execução {execucao}' + (f' (comparada com {anterior})' if anterior else ''),
+        f'{"etapa":<60}{"n":>5}{"parede s":>11}{"cpu s":>10}{"pico MB":>10}'
+        f'{"linhas in":>12}{"linhas out":>12}{"MB lidos":>10}{"MB escritos":>12}{"variação":>10}',
+    ]
+    for nome, item in atual.items():
+        variacao = ''
+        if nome in base and base[nome]['parede_s'] > 0:
+            delta = item['parede_s'] / base[nome]['parede_s'] - 1
+            variacao = f'{delta:+.0%}' + (' !' if delta > LIMIAR_REGRESSAO else '')
+        pico = f'{item["pico_rss_mb"]:.0f}' if item['pico_rss_mb'] is not None else '-'
+        linhas.append(
+            f'{nome[-60:]:<60}{item["ocorrencias"]:>5}{item["parede_s"]:>11.3f}{item["cpu_s"]:>10.3f}{pico:>10}'
+            f'{item["linhas_entrada"]:>12,}{item["linhas_saida"]:>12,}'
+            f'{item["bytes_lidos"] / 2**20:>10.1f}{item["bytes_escritos"] / 2**20:>12.1f}{variacao:>10}'
+        )
+    return '\n'.join(linhas)
+
+
+def _gravar_relatorio_ao_sair() -> None:
+    destino = os.getenv('ETL_RELATORIO')
+    # Só o processo que iniciou a execução grava (os workers do pool também importam o módulo)
+    if destino and os.getenv('ETL_EXECUCAO_PID', str(os.getpid())) == str(os.getpid()):
+        with open(destino, 'w', encoding='utf-8') as f:
+            f.write(gerar_relatorio(ID_EXECUCAO) + '\n')
+
+
+os.environ.setdefault('ETL_EXECUCAO_PID', str(os.getpid()))
+atexit.register(_gravar_relatorio_ao_sair)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Relatório das métricas por etapa do ETL.')
+    parser.add_argument('--execucao', help='Execução a relatar (padrão: a última).')
+    parser.add_argument('--anterior', help='Execução de comparação (padrão: a imediatamente anterior).')
+    parser.add_argument('--metricas', help=f'Arquivo JSON lines (padrão: {ARQUIVO_METRICAS}).')
+    parser.add_argument('--saida', help='Também grava o relatório neste arquivo.')
+    args = parser.parse_args()
+
+    relatorio = gerar_relatorio(args.execucao, args.anterior, args.metricas)
+    print(relatorio)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(relatorio + '\n')
@@ -0,0 +1,66 @@
+import os
+import importlib.util
+import pandas as pd
+
+# Formatos aceitos para a troca de dados entre as etapas do pipeline.
+# 'csv' é o padrão; 'parquet' e 'arrow' (Arrow IPC/Feather) exigem pyarrow.
+FORMATO_CSV = 'csv'
+FORMATO_PARQUET = 'parquet'
+FORMATO_ARROW = 'arrow'
+FORMATOS = (FORMATO_CSV, FORMATO_PARQUET, FORMATO_ARROW)
+
+EXTENSOES = {FORMATO_PARQUET: '.parquet', FORMATO_ARROW: '.arrow'}
+
+COLUNAS_CATEGORICAS = ['UF', 'Modalidade', 'Trimestre']
+
+
+def colunar_disponivel() -> bool:
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def resolver_formato(formato: str) -> str:
+    # Cai para CSV se o formato colunar foi pedido mas o pyarrow não está instalado
+    if formato not in FORMATOS:
+        raise ValueError(f'Formato desconhecido: {formato}. Use um de {FORMATOS}.')
+    if formato != FORMATO_CSV and not colunar_disponivel():
+        print(f'Aviso: pyarrow não instalado, usando CSV no lugar de {formato}.')
+        return FORMATO_CSV
+    return formato
+
+
+def caminho_colunar(caminho_csv: str, formato: str) -> str:
+    return os.path.splitext(caminho_csv)[0] + EXTENSOES[formato]
+
+
+def tipar(df: pd.DataFrame) -> pd.DataFrame:
+    # Tipos do formato colunar: categorias para colunas repetitivas,
+    # Ano inteiro e valores em float
+    df = df.copy()
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    if 'Ano' in df.columns:
+        df['Ano'] = df['Ano'].astype('int64')
+    for col in ('ValorDespesas', 'Total_Despesas', 'Media_Trimestral', 'Desvio_Padrao'):
+        if col in df.columns:
+            df[col] = df[col].astype('float64')
+    return df
+
+
+def salvar_colunar(df: pd.DataFrame, caminho_csv: str, formato: str) -> str:
+    caminho = caminho_colunar(caminho_csv, formato)
+    df = tipar(df).reset_index(drop=True)
+    if formato == FORMATO_PARQUET:
+        df.to_parquet(caminho, index=False)
+    else:
+        df.to_feather(caminho)
+    return caminho
+
+
+def ler_colunar(caminho_csv: str, formato: str) -> pd.DataFrame | None:
+    caminho = caminho_colunar(caminho_csv, formato)
+    if not os.path.exists(caminho):
+        return None
+    if formato == FORMATO_PARQUET:
+        return pd.read_parquet(caminho)
+    return pd.read_feather(caminho)
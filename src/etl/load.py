@@ -1,7 +1,15 @@
+import argparse
 import mysql.connector
 import os
+import pandas as pd
+import re
+import sys
+import time
+from functools import lru_cache
 from dotenv import load_dotenv
 
+from instrumentacao import etapa, registrar_duracao
+
 # CONFIGURAÇÕES DO BANCO DE DADOS 
 load_dotenv()
 DB_HOST = os.getenv("DB_HOST")
@@ -15,12 +23,98 @@ PROJECT_ROOT = os.path.dirname(os.path.dirname(BASE_DIR))
 SQL_DIR = os.path.join(PROJECT_ROOT, "database")
 
 # Arquivos na ordem exata de execução
+SQL_FILE_IMPORTACAO = "02_dml_importacao.sql"
+# DDL opcional (load.py --particionar), fora da sequência padrão
+SQL_FILE_PARTICIONAMENTO = "04_ddl_particionamento.sql"
 SQL_FILES = [
     "01_ddl_estrutura.sql",
-    "02_dml_importacao.sql",
+    SQL_FILE_IMPORTACAO,
     "03_dql_analise.sql"
 ]
 
+# Rollups recalculados logo após a importação. As queries analíticas leem
+# estas tabelas em vez de agregar despesas_detalhadas a cada execução.
+# Linhas sem data válida (trimestre 'ND') não formam trimestre: ficam de fora.
+SQL_ROLLUPS = [
+    "DELETE FROM despesas_trimestrais",
+    """
+    INSERT INTO despesas_trimestrais (registro_ans, ano, trimestre, total, n_lancamentos)
+    SELECT registro_ans, ano, trimestre, SUM(valor_despesa), COUNT(*)
+    FROM despesas_detalhadas
+    WHERE ano IS NOT NULL AND trimestre IS NOT NULL AND trimestre <> 'ND'
+    GROUP BY registro_ans, ano, trimestre
+    """,
+    "DELETE FROM media_mercado_trimestral",
+    """
+    INSERT INTO media_mercado_trimestral (ano, trimestre, media_mercado, total_mercado, qtd_operadoras)
+    SELECT ano, trimestre, AVG(total), SUM(total), COUNT(*)
+    FROM despesas_trimestrais
+    GROUP BY ano, trimestre
+    """,
+]
+
+# Mesmos rollups restritos a um trimestre (carga incremental)
+SQL_ROLLUPS_TRIMESTRE = [
+    "DELETE FROM despesas_trimestrais WHERE ano = %(ano)s AND trimestre = %(trimestre)s",
+    """
+    INSERT INTO despesas_trimestrais (registro_ans, ano, trimestre, total, n_lancamentos)
+    SELECT registro_ans, ano, trimestre, SUM(valor_despesa), COUNT(*)
+    FROM despesas_detalhadas
+    WHERE ano = %(ano)s AND trimestre = %(trimestre)s AND trimestre <> 'ND'
+    GROUP BY registro_ans, ano, trimestre
+    """,
+    "DELETE FROM media_mercado_trimestral WHERE ano = %(ano)s AND trimestre = %(trimestre)s",
+    """
+    INSERT INTO media_mercado_trimestral (ano, trimestre, media_mercado, total_mercado, qtd_operadoras)
+    SELECT ano, trimestre, AVG(total), SUM(total), COUNT(*)
+    FROM despesas_trimestrais
+    WHERE ano = %(ano)s AND trimestre = %(trimestre)s
+    GROUP BY ano, trimestre
+    """,
+]
+
+# Carga direta (DataFrame -> MySQL): tabelas preenchidas sem passar por CSV
+TAMANHO_LOTE_CARGA = int(os.getenv("TAMANHO_LOTE_CARGA", "5000"))
+SUFIXO_STAGING = "_staging"
+SUFIXO_ANTIGA = "_antiga"
+
+# Colunas dos DataFrames do enrichment -> colunas das tabelas
+MAPA_DESPESAS_DETALHADAS = {
+    "CNPJ": "cnpj",
+    "RazaoSocial": "razao_social",
+    "Trimestre": "trimestre",
+    "Ano": "ano",
+    "ValorDespesas": "valor_despesa",
+    "CNPJ_Valido": "cnpj_valido",
+    "RegistroANS": "registro_ans",
+    "Modalidade": "modalidade",
+    "UF": "uf",
+}
+MAPA_DESPESAS_AGREGADAS = {
+    "RazaoSocial": "razao_social",
+    "UF": "uf",
+    "RegistroANS": "registro_ans",
+    "Modalidade": "modalidade",
+    "Total_Despesas": "total_despesas",
+    "Media_Trimestral": "media_trimestral",
+    "Desvio_Padrao": "desvio_padrao",
+}
+MES_INICIAL_TRIMESTRE = {"1T": "01", "2T": "04", "3T": "07", "4T": "10"}
+# uf e trimestre são CHAR(2): o 'N/D' do enrichment (operadora sem cruzamento
+# no CADOP, data inválida) estoura a coluna em modo estrito e vira 'ND'. As
+# consultas filtram uf <> 'ND' (03_dql_analise.sql, API); trimestre 'ND' fica
+# fora dos rollups (SQL_ROLLUPS) e, com eles, das consultas por período
+NAO_DISPONIVEL = {"N/D": "ND"}
+TABELAS_CARGA_DIRETA = ("despesas_detalhadas", "despesas_agregadas")
+
+# Particionamento por trimestre (04_ddl_particionamento.sql)
+PARTICAO_FUTURO = "p_futuro"
+PARTICAO_ANTERIOR = "p_anterior"
+PREFIXO_ARQUIVO = "despesas_arquivo_"
+
+# Carga incremental: chave natural de despesas_detalhadas (uk_operadora_periodo)
+CHAVE_NATURAL = ("registro_ans", "cnpj", "ano", "trimestre")
+
 def get_db_connection():
    #Cria a conexão com o MySQL permitindo carga de arquivos locais.
     return mysql.connector.connect(
@@ -31,61 +125,181 @@ def get_db_connection():
         autocommit=True
     )
 
+# Tokenizador: um único match do regex consome um comando inteiro (texto
+# comum, strings e comentários) até o delimitador, então o laço em Python roda
+# uma vez por comando e não por caractere. Strings e comentários são
+# consumidos inteiros, de modo que um delimitador dentro deles não encerra o
+# comando; os quantificadores possessivos (*+, ++) mantêm a varredura linear.
+# Como no MySQL, -- só abre comentário seguido de espaço, controle ou fim do
+# texto: em "SELECT 7--3" são dois sinais de menos.
+_STRINGS = r"""
+    '(?:[^'\\]++|\\.|'')*+(?:'|\Z)
+  | "(?:[^"\\]++|\\.|"")*+(?:"|\Z)
+  | `(?:[^`]++|``)*+(?:`|\Z)
+"""
+
+_PADRAO_COMANDO = r"""
+    (?P<corpo>(?:
+        [^'"`/\#\-\n{inicio}]++
+      | {strings}
+      | /\*.*?(?:\*/|\Z)
+      | --(?=[\s\x00-\x1f]|\Z)[^\n]*+
+      | \#[^\n]*+
+      | (?!\n[ \t]*+(?i:DELIMITER)[ \t])\n
+      | (?!{delimitador})[/\-{inicio}]
+    )*+)
+    (?:
+        (?P<delimitador>{delimitador})
+      | \n[ \t]*+(?i:DELIMITER)[ \t]++(?P<novo>\S++)[ \t]*+(?=\n|\Z)
+      | \Z
+    )
+"""
+
+# Comentários são trocados por espaço; strings e /*! */ (comentário
+# executável do MySQL) são mantidos como estão
+_COMENTARIOS = re.compile(
+    r"(" + _STRINGS + r"|/\*!.*?(?:\*/|\Z))|--(?=[\s\x00-\x1f]|\Z)[^\n]*+|\#[^\n]*+|/\*.*?(?:\*/|\Z)",
+    re.VERBOSE | re.DOTALL,
+)
+
+@lru_cache(maxsize=8)
+def _compilar_comando(delimitador):
+    return re.compile(
+        _PADRAO_COMANDO.format(
+            strings=_STRINGS,
+            delimitador=re.escape(delimitador),
+            inicio=re.escape(delimitador[0]),
+        ),
+        re.VERBOSE | re.DOTALL,
+    )
+
+def _remover_comentarios(comando):
+    if '--' not in comando and '#' not in comando and '/*' not in comando:
+        return comando
+    return _COMENTARIOS.sub(lambda m: m.group(1) or ' ', comando)
+
 def split_sql_statements(text):
+    """
+    Divide um script SQL em comandos, em tempo linear.
+    Remove comentários (-- seguido de espaço, # e /* */, inclusive no meio da linha), respeita
+    aspas simples, duplas e crases (com escape por barra ou aspa dobrada),
+    preserva comentários executáveis /*! */ e entende a diretiva DELIMITER
+    usada em scripts de procedures.
+    """
     commands = []
-    current_char_list = []
-    in_quote = None  # Pode ser ' ou "
-    escape = False
-
-    for char in text:
-        # Se o caractere anterior foi uma barra invertida, este é literal
-        if escape:
-            current_char_list.append(char)
-            escape = False
-            continue
-
-        if char == '\\':
-            escape = True
-            current_char_list.append(char)
-            continue
-
-        if in_quote:
-            current_char_list.append(char)
-            # Se encontrou a aspa de fechamento correspondente
-            if char == in_quote:
-                in_quote = None
-        else:
-            if char == "'" or char == '"':
-                in_quote = char
-                current_char_list.append(char)
-            elif char == ';':
-                # ACHOU UM FIM DE COMANDO REAL
-                cmd = "".join(current_char_list).strip()
-                if cmd:
-                    commands.append(cmd)
-                current_char_list = []
-            else:
-                current_char_list.append(char)
+    padrao = _compilar_comando(';')
+    # A diretiva DELIMITER só vale no início de linha; a quebra inicial
+    # permite reconhecê-la também na primeira linha do script
+    text = '\n' + text
+    pos = 0
+
+    while True:
+        m = padrao.match(text, pos)
+        cmd = _remover_comentarios(m.group('corpo')).strip()
+        if cmd:
+            commands.append(cmd)
+
+        if m.group('novo'):
+            padrao = _compilar_comando(m.group('novo'))
+        elif m.group('delimitador') is None:
+            # Fim do texto
+            break
+        pos = m.end()
+
+    return commands
+
+# Comandos de DML rodam em transação explícita, em lotes multi-statement
+PREFIXOS_DML = ("INSERT", "UPDATE", "DELETE", "REPLACE", "LOAD DATA")
+TAMANHO_LOTE_DML = int(os.getenv("TAMANHO_LOTE_DML", "50"))
+
+QUESTOES_TESTE = [
+    "Quais as 5 operadoras com maior crescimento percentual de despesas entre o primeiro e o último trimestre analisado?  ",
+    "Qual a distribuição de despesas por UF? Liste os 5 estados com maiores despesas totais.",
+    "Quantas operadoras tiveram despesas acima da média geral em pelo menos 2 dos 3 trimestres analisados?" 
+]
+
+def _tipo_comando(command):
+    inicio = re.sub(r"\s+", " ", command[:20].upper())
+    if inicio.startswith(PREFIXOS_DML):
+        return "dml"
+    if inicio.startswith(("SELECT", "WITH")):
+        return "consulta"
+    return "outro"
+
+def _resumo(command):
+    return re.sub(r"\s+", " ", command)[:60]
+
+def _registrar_tempo(tempos, command, inicio):
+    duracao = time.perf_counter() - inicio
+    tempos.append({"comando": _resumo(command), "segundos": round(duracao, 4)})
+    registrar_duracao("sql", duracao, comando=_resumo(command))
+    print(f"   [{duracao * 1000:9.1f} ms] {_resumo(command)}")
+
+def _mostrar_resultado(cursor, titulo):
+    print(f"\n[QUESTÃO] {titulo}")
     
-    # Adiciona o último comando se houver (caso não termine com ;)
-    cmd = "".join(current_char_list).strip()
-    if cmd:
-        commands.append(cmd)
+    results = cursor.fetchall()
+    if not results:
+        print("      (Nenhum dado retornado)")
+    else:
+        if cursor.description:
+            col_names = [i[0] for i in cursor.description]
+            print(f"Colunas: {col_names}")
         
-    return commands
+        for row in results[:5]: 
+            print(f"         {row}")
+        
+        if len(results) > 5:
+            print(f"      ... (Total: {len(results)} linhas)")
+
+def _executar_lote_dml(cursor, comandos, tempos):
+    # Um único round-trip por lote; LOAD DATA vai sozinho por causa do arquivo local
+    inicio = time.perf_counter()
+    if len(comandos) == 1 or any(c.upper().startswith("LOAD DATA") for c in comandos):
+        for command in comandos:
+            inicio = time.perf_counter()
+            cursor.execute(command)
+            _registrar_tempo(tempos, command, inicio)
+            if command.upper().startswith("LOAD DATA"):
+                print(" Dados importados com sucesso.")
+        return
+
+    cursor.execute(";\n".join(comandos))
+    # Cada nextset() aguarda o resultado do comando seguinte no servidor
+    _registrar_tempo(tempos, comandos[0], inicio)
+    for command in comandos[1:]:
+        inicio = time.perf_counter()
+        cursor.nextset()
+        _registrar_tempo(tempos, command, inicio)
+
+def _executar_transacao_dml(cursor, comandos, tempos):
+    # Agrupa comandos DML consecutivos numa transação explícita
+    lote = []
+    for command in comandos:
+        if command.upper().startswith("LOAD DATA"):
+            if lote:
+                _executar_lote_dml(cursor, lote, tempos)
+                lote = []
+            _executar_lote_dml(cursor, [command], tempos)
+        else:
+            lote.append(command)
+            if len(lote) >= TAMANHO_LOTE_DML:
+                _executar_lote_dml(cursor, lote, tempos)
+                lote = []
+    if lote:
+        _executar_lote_dml(cursor, lote, tempos)
+
+def _tabela_destino(command):
+    encontrado = re.search(r"\bINTO\s+TABLE\s+`?(\w+)", command, re.IGNORECASE)
+    return encontrado.group(1).lower() if encontrado else None
+
+def execute_sql_file(cursor, filename, ignorar_tabelas=()):
+    with etapa("sql_file", arquivo=filename) as medicao:
+        tempos = _executar_arquivo_sql(cursor, filename, ignorar_tabelas)
+        medicao.contexto["comandos"] = len(tempos)
+    return tempos
 
-def clean_comments(content):
-    """Remove linhas que são apenas comentários SQL (-- ou #)"""
-    lines = content.split('\n')
-    cleaned_lines = []
-    for line in lines:
-        stripped = line.strip()
-        if not stripped or stripped.startswith('--') or stripped.startswith('#'):
-            continue
-        cleaned_lines.append(line) # Mantém a linha original (com indentação)
-    return "\n".join(cleaned_lines)
-
-def execute_sql_file(cursor, filename):
+def _executar_arquivo_sql(cursor, filename, ignorar_tabelas):
     filepath = os.path.join(SQL_DIR, filename)
     print(f"Lendo arquivo: {filename}...")
     
@@ -96,68 +310,433 @@ def execute_sql_file(cursor, filename):
         with open(filepath, 'r', encoding='latin1') as f:
             raw_content = f.read()
 
-    # Limpa comentários de linha inteira
-    clean_content = clean_comments(raw_content)
-
-    # Usa o separador inteligente
-    commands = split_sql_statements(clean_content)
+    # Tokenizador remove comentários e separa os comandos
+    commands = split_sql_statements(raw_content)
+    if ignorar_tabelas:
+        # Tabelas carregadas direto dos DataFrames não passam pelo LOAD DATA do script
+        commands = [c for c in commands if _tabela_destino(c) not in ignorar_tabelas]
     
     print(f"   -> Encontrados {len(commands)} comandos.")
-    questoes_teste = [
-    "Quais as 5 operadoras com maior crescimento percentual de despesas entre o primeiro e o último trimestre analisado?  ",
-    "Qual a distribuição de despesas por UF? Liste os 5 estados com maiores despesas totais.",
-    "Quantas operadoras tiveram despesas acima da média geral em pelo menos 2 dos 3 trimestres analisados?" 
-]
     contador_pergunta = 0
-    #
+    tempos = []
+
+    # Agrupa comandos DML consecutivos para rodarem na mesma transação
+    grupos = []
     for command in commands:
-        if not command.strip():
-            continue
-            
+        tipo = _tipo_comando(command)
+        if tipo == "dml" and grupos and grupos[-1][0] == "dml":
+            grupos[-1][1].append(command)
+        else:
+            grupos.append((tipo, [command]))
+
+    for tipo, comandos in grupos:
         try:
-            # Tenta executar
+            if tipo == "dml":
+                cursor.execute("START TRANSACTION")
+                try:
+                    _executar_transacao_dml(cursor, comandos, tempos)
+                    cursor.execute("COMMIT")
+                except mysql.connector.Error:
+                    cursor.execute("ROLLBACK")
+                    print(f"    Transação desfeita ({len(comandos)} comandos DML).")
+                    raise
+                continue
+
+            command = comandos[0]
+            inicio = time.perf_counter()
             cursor.execute(command)
             
             # Se for SELECT ou WITH, mostra resultado
-            if command.upper().startswith("SELECT") or command.upper().startswith("WITH"):
-        # Tenta pegar a pergunta da lista, se acabar usa um título padrão
-                if contador_pergunta < len(questoes_teste):
-                    titulo = questoes_teste[contador_pergunta]
+            if tipo == "consulta":
+                # Tenta pegar a pergunta da lista, se acabar usa um título padrão
+                if contador_pergunta < len(QUESTOES_TESTE):
+                    titulo = QUESTOES_TESTE[contador_pergunta]
                 else:
                     titulo = f"Resultado da Query Extra {contador_pergunta + 1}:"
-                
-                print(f"\n[QUESTÃO] {titulo}")
-                
-                results = cursor.fetchall()
-                if not results:
-                    print("      (Nenhum dado retornado)")
-                else:
-                    if cursor.description:
-                        col_names = [i[0] for i in cursor.description]
-                        print(f"Colunas: {col_names}")
-                    
-                    for row in results[:5]: 
-                        print(f"         {row}")
-                    
-                    if len(results) > 5:
-                        print(f"      ... (Total: {len(results)} linhas)")
-                
+                _mostrar_resultado(cursor, titulo)
                 # Incrementa para a próxima query do arquivo
                 contador_pergunta += 1
-            
-            # Confirmação visual para comandos pesados
-            elif command.upper().startswith("LOAD DATA"):
-                print(" Dados importados com sucesso.")
+            _registrar_tempo(tempos, command, inicio)
 
         except mysql.connector.Error as err:
             # Ignora erros de "já existe"
             if err.errno in (1050, 1007): 
                 pass
             else:
-                print(f"    Erro no comando: {command[:50]}...")
+                print(f"    Erro no comando: {comandos[0][:50]}...")
                 print(f"      Mensagem: {err}")
 
-def run_load():
+    return tempos
+
+def preparar_despesas_detalhadas(df_enriquecido):
+    # Mesmas conversões que o LOAD DATA fazia com CAST/REPLACE/STR_TO_DATE
+    df = df_enriquecido[list(MAPA_DESPESAS_DETALHADAS)].rename(columns=MAPA_DESPESAS_DETALHADAS)
+    # CNPJ faz parte da chave natural; NULL quebraria a unicidade no MySQL
+    df["cnpj"] = df["cnpj"].fillna("")
+    for coluna in ("uf", "trimestre"):
+        df[coluna] = df[coluna].astype(object).replace(NAO_DISPONIVEL)
+    df["valor_despesa"] = df["valor_despesa"].astype(float)
+    # O consolidado é agrupado por (CNPJ, RazaoSocial): um CNPJ com duas razões
+    # sociais no CADOP gera duas linhas com a mesma chave natural, e o upsert
+    # gravaria uma por cima da outra. Soma os valores e fica com os campos
+    # cadastrais da primeira linha.
+    chave = list(CHAVE_NATURAL)
+    if df.duplicated(chave).any():
+        agregacoes = {c: "first" for c in df.columns if c not in chave}
+        agregacoes["valor_despesa"] = "sum"
+        colunas = list(df.columns)
+        df = df.groupby(chave, sort=False, dropna=False, as_index=False).agg(agregacoes)[colunas]
+    df["valor_despesa"] = df["valor_despesa"].round(2)
+    df["cnpj_valido"] = df["cnpj_valido"].astype(str)
+    df["data_evento"] = (
+        df["ano"].astype(str) + "-"
+        + df["trimestre"].astype(str).map(MES_INICIAL_TRIMESTRE).fillna("10") + "-01"
+    )
+    return df
+
+def preparar_despesas_agregadas(df_agg):
+    df = df_agg[list(MAPA_DESPESAS_AGREGADAS)].rename(columns=MAPA_DESPESAS_AGREGADAS)
+    df["uf"] = df["uf"].astype(object).replace(NAO_DISPONIVEL)
+    for coluna in ("total_despesas", "media_trimestral", "desvio_padrao"):
+        df[coluna] = df[coluna].astype(float).round(2)
+    return df
+
+def _lotes_de_linhas(df, tamanho_lote):
+    # Converte um lote por vez: tipos nativos do Python e NaN -> NULL
+    for inicio in range(0, len(df), tamanho_lote):
+        lote = df.iloc[inicio:inicio + tamanho_lote].astype(object)
+        lote = lote.where(lote.notna(), None)
+        yield list(lote.itertuples(index=False, name=None))
+
+def carregar_dataframe(cursor, df, tabela, tamanho_lote=TAMANHO_LOTE_CARGA):
+    """
+    Carrega um DataFrame numa tabela de staging (CREATE TABLE ... LIKE) com
+    executemany em lotes e troca a staging pela tabela final com um único
+    RENAME TABLE, que é atômico: as consultas veem a carga antiga ou a nova.
+    """
+    staging = f"{tabela}{SUFIXO_STAGING}"
+    antiga = f"{tabela}{SUFIXO_ANTIGA}"
+    colunas = ", ".join(df.columns)
+    marcadores = ", ".join(["%s"] * len(df.columns))
+    # IGNORE: chave repetida fica com a primeira linha (em despesas_agregadas, as
+    # operadoras sem registro 'N/D'; despesas_detalhadas já chega uma linha por chave)
+    sql = f"INSERT IGNORE INTO {staging} ({colunas}) VALUES ({marcadores})"
+
+    cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+    cursor.execute(f"CREATE TABLE {staging} LIKE {tabela}")
+
+    inicio = time.perf_counter()
+    with etapa("carregar_dataframe", tabela=tabela, tamanho_lote=tamanho_lote) as medicao:
+        cursor.execute("START TRANSACTION")
+        try:
+            for linhas in _lotes_de_linhas(df, tamanho_lote):
+                # O conector reescreve o executemany num único INSERT de várias linhas
+                cursor.executemany(sql, linhas)
+            cursor.execute("COMMIT")
+        except mysql.connector.Error:
+            cursor.execute("ROLLBACK")
+            cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+            raise
+        medicao.leu(linhas=len(df))
+        medicao.escreveu(linhas=len(df))
+    duracao = time.perf_counter() - inicio
+
+    cursor.execute(f"DROP TABLE IF EXISTS {antiga}")
+    cursor.execute(f"RENAME TABLE {tabela} TO {antiga}, {staging} TO {tabela}")
+    cursor.execute(f"DROP TABLE {antiga}")
+
+    linhas_s = len(df) / duracao if duracao > 0 else 0.0
+    print(f"   -> {tabela}: {len(df)} linhas em {duracao:.2f} s ({linhas_s:,.0f} linhas/s, lote {tamanho_lote}).")
+    return {"tabela": tabela, "linhas": len(df), "segundos": round(duracao, 4), "linhas_s": round(linhas_s, 1)}
+
+def carregar_dataframes(cursor, df_enriquecido, df_agg, tamanho_lote=TAMANHO_LOTE_CARGA):
+    # Recebe a saída de enrichment.executar_pipeline_completo
+    print(" Carga direta dos DataFrames (staging + RENAME)...")
+    dados = preparar_despesas_detalhadas(df_enriquecido)
+    # A staging copia as partições da tabela final (CREATE TABLE ... LIKE)
+    garantir_particoes(cursor, _contar_por_trimestre(dados))
+    resultados = [
+        carregar_dataframe(cursor, dados, "despesas_detalhadas", tamanho_lote),
+        carregar_dataframe(cursor, preparar_despesas_agregadas(df_agg), "despesas_agregadas", tamanho_lote),
+    ]
+    # Tabela inteira regravada: as impressões passam a refletir esta carga
+    cursor.execute("DELETE FROM controle_trimestres")
+    registrar_impressoes(cursor, impressoes_trimestres(dados), _contar_por_trimestre(dados))
+    return resultados
+
+def impressoes_trimestres(dados):
+    """
+    Impressão digital de cada trimestre de despesas_detalhadas já preparado:
+    soma dos hashes das linhas, que não depende da ordem.
+    """
+    hashes = pd.util.hash_pandas_object(dados, index=False)
+    somas = hashes.groupby([dados["ano"], dados["trimestre"]]).sum()
+    return {(int(ano), str(trimestre)): str(valor) for (ano, trimestre), valor in somas.items()}
+
+def ler_impressoes_carregadas(cursor):
+    cursor.execute("SELECT ano, trimestre, impressao FROM controle_trimestres")
+    return {(int(ano), trimestre): impressao for ano, trimestre, impressao in cursor.fetchall()}
+
+def registrar_impressoes(cursor, impressoes, linhas_por_trimestre):
+    if not impressoes:
+        return
+    cursor.executemany(
+        "REPLACE INTO controle_trimestres (ano, trimestre, impressao, linhas) VALUES (%s, %s, %s, %s)",
+        [(ano, tri, impressao, linhas_por_trimestre.get((ano, tri), 0)) for (ano, tri), impressao in impressoes.items()],
+    )
+
+def _contar_por_trimestre(dados):
+    return {(int(a), str(t)): int(n) for (a, t), n in dados.groupby(["ano", "trimestre"]).size().items()}
+
+def carregar_trimestre(cursor, dados_trimestre, ano, trimestre, id_carga, tamanho_lote=TAMANHO_LOTE_CARGA):
+    """
+    Regrava um trimestre de forma idempotente: upsert pela chave natural e
+    remoção das linhas que não vieram nesta carga. O custo é proporcional ao
+    tamanho do trimestre (idx_ano_trimestre), não ao da tabela.
+    """
+    colunas = list(dados_trimestre.columns) + ["id_carga"]
+    # Alias da linha nova (MySQL 8.0.19+): VALUES(coluna) no UPDATE está obsoleto desde o 8.0.20
+    atualizacoes = ", ".join(f"{c} = novo.{c}" for c in colunas if c not in CHAVE_NATURAL)
+    sql = (
+        f"INSERT INTO despesas_detalhadas ({', '.join(colunas)}) "
+        f"VALUES ({', '.join(['%s'] * len(colunas))}) AS novo "
+        f"ON DUPLICATE KEY UPDATE {atualizacoes}"
+    )
+    dados_trimestre = dados_trimestre.assign(id_carga=id_carga)
+
+    inicio = time.perf_counter()
+    with etapa("upsert_trimestre", ano=ano, trimestre=trimestre) as medicao:
+        cursor.execute("START TRANSACTION")
+        try:
+            for linhas in _lotes_de_linhas(dados_trimestre, tamanho_lote):
+                cursor.executemany(sql, linhas)
+            cursor.execute(
+                "DELETE FROM despesas_detalhadas WHERE ano = %s AND trimestre = %s "
+                "AND (id_carga IS NULL OR id_carga <> %s)",
+                (ano, trimestre, id_carga),
+            )
+            removidas = cursor.rowcount
+            cursor.execute("COMMIT")
+        except mysql.connector.Error:
+            cursor.execute("ROLLBACK")
+            raise
+        medicao.escreveu(linhas=len(dados_trimestre))
+    duracao = time.perf_counter() - inicio
+    print(f"   -> {trimestre}/{ano}: {len(dados_trimestre)} linhas gravadas, {removidas} removidas em {duracao:.2f} s.")
+    return {"ano": ano, "trimestre": trimestre, "linhas": len(dados_trimestre),
+            "removidas": removidas, "segundos": round(duracao, 4)}
+
+def carregar_incremental(cursor, df_enriquecido, df_agg, tamanho_lote=TAMANHO_LOTE_CARGA):
+    """
+    Carga idempotente: só os trimestres cuja impressão difere da registrada
+    em controle_trimestres são regravados; trimestres que sumiram da fonte
+    são apagados. Retorna a lista de (ano, trimestre) alterados.
+    """
+    dados = preparar_despesas_detalhadas(df_enriquecido)
+    impressoes = impressoes_trimestres(dados)
+    carregadas = ler_impressoes_carregadas(cursor)
+
+    alterados = sorted(k for k in impressoes if carregadas.get(k) != impressoes[k])
+    removidos = sorted(k for k in carregadas if k not in impressoes)
+    print(f" Carga incremental: {len(alterados)} de {len(impressoes)} trimestres alterados, {len(removidos)} removidos.")
+
+    garantir_particoes(cursor, alterados)
+    id_carga = time.time_ns()
+    grupos = dados.groupby(["ano", "trimestre"], sort=False)
+    for ano, trimestre in alterados:
+        carregar_trimestre(cursor, grupos.get_group((ano, trimestre)), ano, trimestre, id_carga, tamanho_lote)
+    for ano, trimestre in removidos:
+        cursor.execute("DELETE FROM despesas_detalhadas WHERE ano = %s AND trimestre = %s", (ano, trimestre))
+        cursor.execute("DELETE FROM controle_trimestres WHERE ano = %s AND trimestre = %s", (ano, trimestre))
+
+    # Impressões gravadas só depois dos trimestres: uma falha no meio refaz o trimestre na próxima execução
+    registrar_impressoes(cursor, {k: impressoes[k] for k in alterados}, _contar_por_trimestre(dados))
+
+    # despesas_agregadas tem uma linha por operadora: recarga completa via staging
+    carregar_dataframe(cursor, preparar_despesas_agregadas(df_agg), "despesas_agregadas", tamanho_lote)
+    return alterados + removidos
+
+def _existe_no_esquema(cursor, visao, coluna_nome, tabela, nome):
+    cursor.execute(
+        f"SELECT COUNT(*) FROM information_schema.{visao} "
+        f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND {coluna_nome} = %s",
+        (tabela, nome),
+    )
+    return cursor.fetchone()[0] > 0
+
+def migrar_despesas_detalhadas(cursor):
+    """
+    Bancos criados antes da carga incremental: o CREATE TABLE IF NOT EXISTS
+    do 01_ddl não altera a tabela existente. Acrescenta id_carga e a chave
+    natural, removendo antes as linhas repetidas na chave (fica a de maior
+    id, a da carga mais recente). Não faz nada se já estiver migrada.
+    """
+    if not _existe_no_esquema(cursor, "COLUMNS", "COLUMN_NAME", "despesas_detalhadas", "id_carga"):
+        cursor.execute("ALTER TABLE despesas_detalhadas ADD COLUMN id_carga BIGINT")
+        print(" despesas_detalhadas: coluna id_carga criada.")
+    if _existe_no_esquema(cursor, "STATISTICS", "INDEX_NAME", "despesas_detalhadas", "uk_operadora_periodo"):
+        return
+    mesma_chave = " AND ".join(f"recente.{c} = antiga.{c}" for c in CHAVE_NATURAL)
+    cursor.execute(
+        "DELETE antiga FROM despesas_detalhadas antiga "
+        f"JOIN despesas_detalhadas recente ON {mesma_chave} AND recente.id > antiga.id"
+    )
+    removidas = cursor.rowcount
+    cursor.execute(
+        f"ALTER TABLE despesas_detalhadas ADD UNIQUE KEY uk_operadora_periodo ({', '.join(CHAVE_NATURAL)})"
+    )
+    print(f" despesas_detalhadas: chave uk_operadora_periodo criada ({removidas} linhas repetidas removidas).")
+
+def _nome_particao(ano, trimestre):
+    return f"p{ano}_{trimestre}"
+
+def _trimestre_da_particao(nome):
+    # p2025_1T -> (2025, '1T'); None para p_anterior/p_futuro
+    encontrado = re.fullmatch(r"p(\d{4})_([1-4]T)", nome)
+    return (int(encontrado.group(1)), encontrado.group(2)) if encontrado else None
+
+def _proximo_trimestre(ano, trimestre):
+    numero = int(trimestre[0])
+    return (ano + 1, "1T") if numero == 4 else (ano, f"{numero + 1}T")
+
+def listar_particoes(cursor, tabela="despesas_detalhadas"):
+    # Lista vazia quando a tabela não é particionada
+    cursor.execute(
+        "SELECT PARTITION_NAME, TABLE_ROWS FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION",
+        (tabela,),
+    )
+    return cursor.fetchall()
+
+def particionar_despesas(cursor):
+    if listar_particoes(cursor):
+        print(" despesas_detalhadas já está particionada.")
+        return
+    execute_sql_file(cursor, SQL_FILE_PARTICIONAMENTO)
+
+def garantir_particoes(cursor, trimestres=None):
+    """
+    Cria as partições dos trimestres posteriores à última existente,
+    dividindo p_futuro (REORGANIZE PARTITION). Lacunas entre trimestres
+    também ganham partição, para que cada partição tenha um só trimestre.
+    Sem trimestres, usa os que já estão em p_futuro (carga via LOAD DATA).
+    Não faz nada se a tabela não for particionada.
+    """
+    particoes = [nome for nome, _ in listar_particoes(cursor)]
+    if not particoes:
+        return []
+    if trimestres is None:
+        cursor.execute(f"SELECT DISTINCT ano, trimestre FROM despesas_detalhadas PARTITION ({PARTICAO_FUTURO})")
+        trimestres = cursor.fetchall()
+
+    existentes = sorted(t for t in map(_trimestre_da_particao, particoes) if t)
+    ultimo = existentes[-1] if existentes else None
+    pedidos = sorted({(int(ano), str(trimestre)) for ano, trimestre in trimestres})
+    # Trimestre sem data válida ('ND') não tem limite de partição; como (ano, 'ND')
+    # ordena depois de (ano, '4T'), as linhas caem na partição do 4T do ano ou em p_futuro
+    sem_trimestre = [t for t in pedidos if not re.fullmatch(r"[1-4]T", t[1])]
+    if sem_trimestre:
+        invalidos = ", ".join(f"{trimestre}/{ano}" for ano, trimestre in sem_trimestre)
+        print(f" [AVISO] Trimestres inválidos sem partição própria: {invalidos}.")
+        pedidos = [t for t in pedidos if t not in sem_trimestre]
+    antigos = [t for t in pedidos if ultimo and t <= ultimo and t not in existentes]
+    if antigos:
+        print(f" [AVISO] {len(antigos)} trimestres anteriores à última partição ficam em partições já existentes.")
+    novos_pedidos = [t for t in pedidos if ultimo is None or t > ultimo]
+    if not novos_pedidos:
+        return []
+
+    novos = []
+    atual = _proximo_trimestre(*ultimo) if ultimo else novos_pedidos[0]
+    while atual <= novos_pedidos[-1]:
+        novos.append(atual)
+        atual = _proximo_trimestre(*atual)
+
+    definicoes = []
+    if ultimo is None and PARTICAO_ANTERIOR not in particoes:
+        ano, trimestre = novos[0]
+        definicoes.append(f"PARTITION {PARTICAO_ANTERIOR} VALUES LESS THAN ({ano}, '{trimestre}')")
+    for ano, trimestre in novos:
+        limite_ano, limite_trimestre = _proximo_trimestre(ano, trimestre)
+        definicoes.append(
+            f"PARTITION {_nome_particao(ano, trimestre)} VALUES LESS THAN ({limite_ano}, '{limite_trimestre}')"
+        )
+    definicoes.append(f"PARTITION {PARTICAO_FUTURO} VALUES LESS THAN (MAXVALUE, MAXVALUE)")
+
+    cursor.execute(
+        f"ALTER TABLE despesas_detalhadas REORGANIZE PARTITION {PARTICAO_FUTURO} INTO ({', '.join(definicoes)})"
+    )
+    print(f" Partições criadas: {', '.join(_nome_particao(*t) for t in novos)}")
+    return novos
+
+def remover_particoes_antigas(cursor, manter_trimestres, arquivar=False):
+    """
+    Mantém as partições dos últimos `manter_trimestres` trimestres. As mais
+    antigas são descartadas (DROP PARTITION) ou, com arquivar=True, movidas
+    antes para uma tabela despesas_arquivo_AAAA_nT via EXCHANGE PARTITION,
+    que só troca metadados. Retorna os trimestres removidos.
+    """
+    trimestres = sorted(t for t in (_trimestre_da_particao(nome) for nome, _ in listar_particoes(cursor)) if t)
+    # Sempre sobra ao menos um trimestre: é a última partição que delimita p_futuro
+    antigos = trimestres[:-max(manter_trimestres, 1)]
+    for ano, trimestre in antigos:
+        particao = _nome_particao(ano, trimestre)
+        if arquivar:
+            tabela = f"{PREFIXO_ARQUIVO}{ano}_{trimestre}"
+            cursor.execute(f"DROP TABLE IF EXISTS {tabela}")
+            cursor.execute(f"CREATE TABLE {tabela} LIKE despesas_detalhadas")
+            cursor.execute(f"ALTER TABLE {tabela} REMOVE PARTITIONING")
+            cursor.execute(f"ALTER TABLE despesas_detalhadas EXCHANGE PARTITION {particao} WITH TABLE {tabela}")
+            print(f"   -> {particao} arquivada em {tabela}.")
+        cursor.execute(f"ALTER TABLE despesas_detalhadas DROP PARTITION {particao}")
+        cursor.execute("DELETE FROM controle_trimestres WHERE ano = %s AND trimestre = %s", (ano, trimestre))
+    if antigos:
+        print(f" {len(antigos)} partições antigas removidas de despesas_detalhadas.")
+    return antigos
+
+def atualizar_rollups(cursor, trimestres=None):
+    """
+    Reconstrói os rollups numa transação: as consultas nunca veem tabela pela
+    metade. Com trimestres=[(ano, trimestre), ...], refaz só esses trimestres.
+    """
+    print(" Atualizando rollups trimestrais...")
+    with etapa("rollups", trimestres=len(trimestres) if trimestres is not None else "todos"):
+        cursor.execute("START TRANSACTION")
+        try:
+            if trimestres is None:
+                for comando in SQL_ROLLUPS:
+                    cursor.execute(comando)
+            else:
+                for ano, trimestre in trimestres:
+                    for comando in SQL_ROLLUPS_TRIMESTRE:
+                        cursor.execute(comando, {"ano": ano, "trimestre": trimestre})
+            cursor.execute("COMMIT")
+        except mysql.connector.Error:
+            cursor.execute("ROLLBACK")
+            raise
+    cursor.execute("SELECT COUNT(*) FROM despesas_trimestrais")
+    print(f"   -> {cursor.fetchone()[0]} linhas em despesas_trimestrais.")
+
+def registrar_geracao_carga(cursor):
+    # Sinaliza que os dados mudaram: a API invalida o cache ao ver nova geração
+    cursor.execute(
+        "INSERT INTO controle_carga (id, geracao) VALUES (1, 1) "
+        "ON DUPLICATE KEY UPDATE geracao = geracao + 1"
+    )
+    cursor.execute("SELECT geracao FROM controle_carga WHERE id = 1")
+    print(f" Geração de carga: {cursor.fetchone()[0]}")
+
+def run_load(dataframes=None, tamanho_lote=TAMANHO_LOTE_CARGA, incremental=False,
+             particionar=False, manter_trimestres=None, arquivar=False):
+    """
+    Executa os scripts SQL. Com dataframes=(df_enriquecido, df_agg), as
+    despesas são gravadas direto dos DataFrames e o script de importação
+    carrega apenas o CADOP. Com incremental=True (exige dataframes), só os
+    trimestres alterados são regravados. particionar aplica o DDL de
+    partições por trimestre; manter_trimestres descarta (ou arquiva) as
+    partições mais antigas depois da carga. Devolve False se a conexão falhar.
+    """
     print(" Iniciando Carga no Banco de Dados...")
     
     conn = None
@@ -165,14 +744,44 @@ def run_load():
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        for sql_file in SQL_FILES:
-            print(f"\n--- Executando {sql_file} ---")
-            execute_sql_file(cursor, sql_file)
-            
+        with etapa("carga", direta=dataframes is not None, incremental=incremental):
+            for sql_file in SQL_FILES:
+                print(f"\n--- Executando {sql_file} ---")
+                trimestres = None
+                if sql_file == SQL_FILE_IMPORTACAO and dataframes is not None:
+                    execute_sql_file(cursor, sql_file, ignorar_tabelas=set(TABELAS_CARGA_DIRETA))
+                    if incremental:
+                        trimestres = carregar_incremental(cursor, *dataframes, tamanho_lote=tamanho_lote)
+                    else:
+                        carregar_dataframes(cursor, *dataframes, tamanho_lote=tamanho_lote)
+                else:
+                    execute_sql_file(cursor, sql_file)
+                    if sql_file == SQL_FILE_IMPORTACAO:
+                        # LOAD DATA não registra impressões: a próxima carga incremental regrava tudo
+                        cursor.execute("DELETE FROM controle_trimestres")
+                        # Trimestres novos caíram em p_futuro; ganham partição própria
+                        garantir_particoes(cursor)
+
+                if sql_file == SQL_FILES[0]:
+                    migrar_despesas_detalhadas(cursor)
+                    if particionar:
+                        particionar_despesas(cursor)
+
+                # Rollups logo após a ingestão, antes das queries analíticas
+                if sql_file == SQL_FILE_IMPORTACAO:
+                    atualizar_rollups(cursor, trimestres)
+                    if manter_trimestres:
+                        removidos = remover_particoes_antigas(cursor, manter_trimestres, arquivar)
+                        if removidos:
+                            atualizar_rollups(cursor, removidos)
+
+            registrar_geracao_carga(cursor)
         print("\n Processo finalizado!")
+        return True
         
     except mysql.connector.Error as err:
         print(f" Erro fatal de conexão: {err}")
+        return False
     finally:
         if conn and conn.is_connected():
             cursor.close()
@@ -180,4 +789,27 @@ def run_load():
             print("Conexão encerrada.")
 
 if __name__ == "__main__":
-    run_load()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Carrega os dados processados no MySQL.")
+    parser.add_argument("--direto", action="store_true",
+                        help="Grava as despesas direto dos DataFrames do enrichment, sem LOAD DATA dos CSVs.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Com --direto, regrava só os trimestres alterados (upsert pela chave natural).")
+    parser.add_argument("--particionar", action="store_true",
+                        help="Particiona despesas_detalhadas por trimestre (04_ddl_particionamento.sql).")
+    parser.add_argument("--manter-trimestres", type=int,
+                        help="Em tabela particionada, mantém só as partições dos N trimestres mais recentes.")
+    parser.add_argument("--arquivar", action="store_true",
+                        help="Com --manter-trimestres, move as partições antigas para tabelas despesas_arquivo_*.")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE_CARGA,
+                        help="Linhas por executemany na carga direta.")
+    parser.add_argument("--formato", default="csv",
+                        help="Formato do consolidado lido pelo enrichment na carga direta.")
+    args = parser.parse_args()
+
+    dataframes = None
+    if args.direto or args.incremental:
+        sys.path.insert(0, os.path.join(BASE_DIR, "analysis"))
+        import enrichment
+        dataframes = enrichment.executar_pipeline_completo(incremental=args.incremental, formato=args.formato)
+    run_load(dataframes=dataframes, tamanho_lote=args.lote, incremental=args.incremental,
+             particionar=args.particionar, manter_trimestres=args.manter_trimestres, arquivar=args.arquivar)
\ No newline at end of file
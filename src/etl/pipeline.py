@@ -0,0 +1,229 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Orquestra o ETL inteiro num único processo, como um DAG de etapas:
+#
+#   download_cadop ──────┐
+#                        ├─> transformacao ─> enriquecimento ─> carga
+#   download_trimestres ─┘
+#
+# Etapas sem dependência pendente rodam ao mesmo tempo (os dois downloads; a
+# leitura do CADOP já corre junto com a dos trimestres dentro da
+# transformação). Cada etapa tem uma impressão digital (SHA-256 das suas
+# entradas, das opções que mudam a saída e das impressões das etapas
+# anteriores); se ela não mudou desde a última execução bem-sucedida e as
+# saídas existem, a etapa é pulada. Os módulos das etapas só são importados
+# depois de --raiz, porque leem os caminhos de caminhos.py ao serem importados.
+
+PASTA_ETL = os.path.dirname(os.path.abspath(__file__))
+ETAPAS = ('download_cadop', 'download_trimestres', 'transformacao', 'enriquecimento', 'carga')
+
+
+class Etapa:
+    # entradas() devolve o que identifica o trabalho da etapa (hashes de
+    # arquivos, opções); None indica etapa que sempre roda (downloads, que já
+    # evitam rebaixar arquivos inalterados pelo manifesto).
+    def __init__(self, nome, executar, dependencias=(), entradas=None, saidas=None):
+        self.nome = nome
+        self.executar = executar
+        self.dependencias = tuple(dependencias)
+        self.entradas = entradas
+        self.saidas = saidas or (lambda: [])
+
+
+def impressao_etapa(etapa_dag: Etapa, impressoes: dict) -> str | None:
+    if etapa_dag.entradas is None:
+        return None
+    conteudo = {
+        'etapa': etapa_dag.nome,
+        'entradas': etapa_dag.entradas(),
+        'dependencias': {d: impressoes.get(d) for d in etapa_dag.dependencias},
+    }
+    return hashlib.sha256(json.dumps(conteudo, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def hash_arquivos(caminhos_arquivos) -> dict:
+    # Hash do arquivo inteiro (o ZIP, não cada membro): é o que muda quando a ANS republica
+    import estado_incremental
+    return {os.path.basename(c): estado_incremental.hash_fonte(c) for c in sorted(set(caminhos_arquivos))}
+
+
+def executar_dag(etapas: list, selecionadas: set, forcar: bool = False, max_paralelo: int = 2) -> dict:
+    # Devolve o status de cada etapa: executada, pulada, ignorada, erro ou bloqueada
+    import estado_incremental
+
+    estado = estado_incremental.carregar_estado('pipeline')
+    gravadas = estado.get('etapas', {})
+    impressoes, resultados, status = {}, {}, {}
+    por_nome = {e.nome: e for e in etapas}
+    pendentes = [e.nome for e in etapas]
+    em_andamento = {}
+
+    def concluidas(e):
+        return all(status.get(d) in ('executada', 'pulada', 'ignorada') for d in e.dependencias)
+
+    with ThreadPoolExecutor(max_workers=max_paralelo) as executor:
+        while pendentes or em_andamento:
+            for nome in list(pendentes):
+                e = por_nome[nome]
+                if any(status.get(d) in ('erro', 'bloqueada') for d in e.dependencias):
+                    status[nome] = 'bloqueada'
+                    pendentes.remove(nome)
+                    print(f'[pipeline] {nome}: bloqueada (dependência falhou)')
+                    continue
+                if not concluidas(e):
+                    continue
+                pendentes.remove(nome)
+                impressao = impressao_etapa(e, impressoes)
+                impressoes[nome] = impressao if impressao is not None else gravadas.get(nome)
+                if nome not in selecionadas:
+                    status[nome] = 'ignorada'
+                    impressoes[nome] = gravadas.get(nome)
+                    print(f'[pipeline] {nome}: fora de --etapas')
+                    continue
+                saidas_ok = all(os.path.exists(s) for s in e.saidas())
+                if not forcar and impressao is not None and gravadas.get(nome) == impressao and saidas_ok:
+                    status[nome] = 'pulada'
+                    print(f'[pipeline] {nome}: entradas inalteradas, pulada')
+                    continue
+                print(f'[pipeline] {nome}: executando')
+                em_andamento[executor.submit(e.executar, resultados)] = nome
+
+            if not em_andamento:
+                continue
+            feitos, _ = wait(em_andamento, return_when=FIRST_COMPLETED)
+            for futuro in feitos:
+                nome = em_andamento.pop(futuro)
+                try:
+                    resultados[nome] = futuro.result()
+                except Exception as erro:
+                    status[nome] = 'erro'
+                    print(f'[pipeline] {nome}: erro: {erro}')
+                    continue
+                status[nome] = 'executada'
+                # Só grava a impressão depois do sucesso: uma falha refaz a etapa na próxima vez
+                if impressoes[nome] is not None:
+                    gravadas[nome] = impressoes[nome]
+                    estado_incremental.salvar_estado('pipeline', {'etapas': gravadas})
+    return status
+
+
+def montar_etapas(args) -> list:
+    import cadop
+    import caminhos
+    import estado_incremental
+    import extraction
+    import intermediario
+    import transformation
+    sys.path.insert(0, os.path.join(PASTA_ETL, 'analysis'))
+    import enrichment
+
+    formato = intermediario.resolver_formato(args.formato)
+    sessao = extraction.criar_sessao(args.downloads + 1)
+
+    def baixar_cadop(_):
+        resultado = extraction.baixar_cadastro_operadoras(sessao=sessao)
+        if resultado['status'] == 'erro' and not os.path.exists(cadop.caminho_cadop()):
+            print('Aviso: CADOP indisponível; a transformação usará os IDs da ANS.')
+        return resultado
+
+    def baixar_trimestres(_):
+        return extraction.baixar_arquivos_ans(extraction.obter_trimestres_recentes(),
+                                              workers=args.downloads, sessao=sessao)
+
+    def fontes_transformacao():
+        fontes = transformation.listar_arquivos_contabeis()
+        return {
+            'fontes': hash_arquivos(f[0] if isinstance(f, tuple) else f for f in fontes),
+            'cadop': estado_incremental.hash_fonte(cadop.caminho_cadop()),
+            'versao': estado_incremental.VERSAO_TRANSFORMACAO,
+            'formato': formato,
+        }
+
+    def saidas_transformacao():
+        if formato == intermediario.FORMATO_CSV:
+            return [transformation.ARQUIVO_ZIP_FINAL]
+        return [intermediario.caminho_colunar(enrichment.ARQUIVO_CONSOLIDADO, formato)]
+
+    def transformar(_):
+        df_final = transformation.transformar_dados(streaming=args.streaming, workers=args.workers,
+                                                    incremental=args.incremental, formato=formato)
+        if df_final is None:
+            raise RuntimeError('nenhum arquivo contábil consolidado')
+        return df_final
+
+    def enriquecer(_):
+        resultado = enrichment.executar_pipeline_completo(incremental=args.incremental, formato=formato)
+        if resultado is None:
+            raise RuntimeError('consolidado não encontrado')
+        return resultado
+
+    def carregar(resultados):
+        import load
+        # Enriquecimento pulado: relê o que ele gravou da última vez
+        dataframes = resultados.get('enriquecimento') or enrichment.ler_resultados(formato)
+        if not load.run_load(dataframes=dataframes, tamanho_lote=args.lote, incremental=args.incremental,
+                             particionar=args.particionar):
+            raise RuntimeError('carga no banco falhou')
+
+    return [
+        Etapa('download_cadop', baixar_cadop),
+        Etapa('download_trimestres', baixar_trimestres),
+        Etapa('transformacao', transformar, ('download_cadop', 'download_trimestres'),
+              entradas=fontes_transformacao, saidas=saidas_transformacao),
+        Etapa('enriquecimento', enriquecer, ('transformacao',),
+              entradas=lambda: {'cadop': estado_incremental.hash_fonte(cadop.caminho_cadop()),
+                                'formato': formato},
+              saidas=lambda: [enrichment.ARQUIVO_CONSOLIDADO, enrichment.ARQUIVO_AGREGADO]),
+        # A carga depende também do banco de destino: trocar DB_HOST/DB_NAME recarrega
+        Etapa('carga', carregar, ('enriquecimento',),
+              entradas=lambda: {'banco': [os.getenv('DB_HOST'), os.getenv('DB_NAME')],
+                                'particionar': args.particionar,
+                                'raiz': caminhos.RAIZ_DADOS}),
+    ]
+
+
+def main(args) -> int:
+    from instrumentacao import etapa
+
+    selecionadas = set(args.etapas)
+    if args.sem_download:
+        selecionadas -= {'download_cadop', 'download_trimestres'}
+    if args.sem_carga:
+        selecionadas.discard('carga')
+
+    with etapa('pipeline', etapas=sorted(selecionadas), forcar=args.forcar):
+        status = executar_dag(montar_etapas(args), selecionadas, forcar=args.forcar)
+
+    print('\n[pipeline] Resumo:')
+    for nome in ETAPAS:
+        print(f'  {nome:<20} {status.get(nome, "-")}')
+    return 1 if any(s in ('erro', 'bloqueada') for s in status.values()) else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Executa o ETL completo (download, transformação, enriquecimento e carga).')
+    parser.add_argument('--raiz', help='Pasta de dados (raw/, processed/, estado/, metricas/). Padrão: data/ do projeto.')
+    parser.add_argument('--etapas', nargs='+', choices=ETAPAS, default=list(ETAPAS),
+                        help='Etapas a executar; as demais usam os arquivos já existentes.')
+    parser.add_argument('--sem-download', action='store_true', help='Usa apenas os arquivos já baixados.')
+    parser.add_argument('--sem-carga', action='store_true', help='Não grava no banco.')
+    parser.add_argument('--forcar', action='store_true', help='Executa as etapas mesmo com entradas inalteradas.')
+    parser.add_argument('--downloads', type=int, default=4, help='Downloads simultâneos de trimestres.')
+    parser.add_argument('--workers', type=int, default=1, help='Processos da transformação (0 = todos os núcleos).')
+    parser.add_argument('--streaming', action='store_true', help='Transformação em blocos (menor uso de memória).')
+    parser.add_argument('--incremental', action='store_true', help='Transformação, enriquecimento e carga incrementais.')
+    parser.add_argument('--formato', choices=('csv', 'parquet', 'arrow'), default='csv',
+                        help='Formato intermediário entre as etapas.')
+    parser.add_argument('--lote', type=int, default=int(os.getenv('TAMANHO_LOTE_CARGA', '5000')),
+                        help='Linhas por executemany na carga.')
+    parser.add_argument('--particionar', action='store_true', help='Particiona despesas_detalhadas por trimestre.')
+    args = parser.parse_args()
+
+    if args.raiz:
+        os.environ['ETL_RAIZ_DADOS'] = os.path.abspath(args.raiz)
+    sys.exit(main(args))
@@ -1,138 +1,462 @@
+import numpy as np
 import pandas as pd
 import os
 import glob
 import zipfile
+import argparse
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
+import cadop
+import caminhos
+import estado_incremental
+import intermediario
+from instrumentacao import etapa
 
-PASTA_RAW = os.path.join('data', 'raw')
-PASTA_PROCESSED = os.path.join('data', 'processed')
+
+PASTA_RAW = caminhos.PASTA_RAW
+PASTA_PROCESSED = caminhos.PASTA_PROCESSED
 ARQUIVO_ZIP_FINAL = os.path.join(PASTA_PROCESSED, 'demonstracoes_contabeis_consolidadas.zip')
-CAMINHO_CADOP = os.path.join(PASTA_RAW, 'Relatorio_Cadop.csv')
 
+# Chaves do agrupamento final e colunas entregues no consolidado
+CHAVES_GRUPO = ['CNPJ', 'RazaoSocial', 'Trimestre', 'Ano']
+COLUNAS_SAIDA = CHAVES_GRUPO + ['ValorDespesas']
 
-def carregar_cadop() -> None:
-    if not os.path.exists(CAMINHO_CADOP):
-        print('Aviso: Arquivo Relatorio_Cadop.csv não encontrado. Usaremos IDs.')
-        return {}, {}
-    
-    try:
-        df_cadop = pd.read_csv(
-            CAMINHO_CADOP, 
-            sep=';', 
-            encoding='latin1',
-            usecols=['REGISTRO_OPERADORA', 'CNPJ', 'Razao_Social'],
-            dtype = {'REGISTRO_OPERADORA': str, 'CNPJ': str}
-        )
+# As somas parciais são feitas por registro ANS, sem depender do CADOP; o
+# nome e o CNPJ entram só no fim (aplicar_cadop), o que permite ler o CADOP
+# ao mesmo tempo que os arquivos trimestrais.
+CHAVES_REGISTRO = ['REG_ANS', 'Trimestre', 'Ano']
+COLUNAS_REGISTRO = CHAVES_REGISTRO + ['ValorDespesas']
 
-        mapa_nomes = df_cadop.set_index('REGISTRO_OPERADORA')['Razao_Social'].to_dict()
+# Quantidade de linhas lidas por vez no modo streaming
+TAMANHO_CHUNK = 200_000
 
+# Só estas colunas são lidas dos arquivos contábeis. REG_ANS, conta e data
+# viram categorias (poucos valores distintos, milhões de linhas); a conta
+# continua texto, sem perder zeros à esquerda.
+COLUNAS_LIDAS = ['DATA', 'REG_ANS', 'CD_CONTA_CONTABIL', 'VL_SALDO_FINAL']
+TIPOS_LIDOS = {'REG_ANS': 'category', 'CD_CONTA_CONTABIL': 'category', 'DATA': 'category'}
+TRIMESTRES = ['1T', '2T', '3T', '4T', 'N/D']
+# Ano usado quando a data é nula ou inválida (segurança)
+ANO_PADRAO = 2025
 
-        mapa_cnpjs = df_cadop.set_index('REGISTRO_OPERADORA')['CNPJ'].to_dict()
 
-        return mapa_nomes, mapa_cnpjs
-    
+def carregar_cadop() -> pd.DataFrame | None:
+    # Tabela REGISTRO_OPERADORA -> RazaoSocial, CNPJ do cache compartilhado com o enriquecimento
+    try:
+        dados = cadop.carregar()
     except Exception as e:
         print(f'Erro ao carregar o arquivo CADOP: {e}')
-        return {}, {}
-    
-def transformar_dados() -> None:
-    if not  os.path.exists(PASTA_PROCESSED):
-        os.makedirs(PASTA_PROCESSED)
+        return None
+    if dados is None:
+        print('Aviso: Arquivo Relatorio_Cadop.csv não encontrado. Usaremos IDs.')
+        return None
+    return dados.por_registro
+
 
-    mapa_nomes, mapa_cnpjs = carregar_cadop()
+def _eh_contabil(nome: str) -> bool:
+    return nome.lower().endswith('.csv') and 'cadop' not in nome.lower()
+
+
+def listar_arquivos_contabeis() -> list:
+    # Fontes contábeis: membros CSV dentro dos ZIPs baixados, lidos direto do
+    # ZIP como (caminho_zip, membro), e CSVs soltos em data/raw. Um CSV solto
+    # que também existe dentro de um ZIP (extração antiga) é ignorado para não
+    # somar o mesmo trimestre duas vezes.
+    fontes = []
+    membros_zip = set()
+
+    for caminho_zip in sorted(glob.glob(os.path.join(PASTA_RAW, '**', '*.zip'), recursive=True)):
+        try:
+            with zipfile.ZipFile(caminho_zip) as zf:
+                for membro in zf.namelist():
+                    if _eh_contabil(membro):
+                        fontes.append((caminho_zip, membro))
+                        membros_zip.add(os.path.basename(membro).lower())
+        except zipfile.BadZipFile:
+            print(f'Aviso: ZIP corrompido ignorado: {caminho_zip}')
 
     todos_csvs = glob.glob(os.path.join(PASTA_RAW, '**', '*.csv'), recursive=True)
-    arquivos_contabeis = [
+    fontes.extend(
         f for f in todos_csvs 
-        if 'Relatorio_cadop' not in f and 'cadop' not in f.lower()
-    ]
+        if _eh_contabil(os.path.basename(f)) and os.path.basename(f).lower() not in membros_zip
+    )
+    return fontes
 
-    if not arquivos_contabeis:
-        print('Nenhum arquivo contábil encontrado para transformação.')
-        return
-    
-    print(f'Processando {len(arquivos_contabeis)} arquivos contábeis...')
+
+def nome_fonte(fonte) -> str:
+    if isinstance(fonte, tuple):
+        caminho_zip, membro = fonte
+        return f'{os.path.basename(caminho_zip)}:{os.path.basename(membro)}'
+    return os.path.basename(fonte)
+
+
+def tamanho_fonte(fonte) -> int:
+    # Bytes lidos do disco: tamanho compactado para membros de ZIP
+    if isinstance(fonte, tuple):
+        caminho_zip, membro = fonte
+        with zipfile.ZipFile(caminho_zip) as zf:
+            return zf.getinfo(membro).compress_size
+    return os.path.getsize(fonte)
+
+
+@contextmanager
+def abrir_fonte(fonte):
+    # Membros de ZIP são descompactados em streaming, sem passar pelo disco
+    if isinstance(fonte, tuple):
+        caminho_zip, membro = fonte
+        with zipfile.ZipFile(caminho_zip) as zf, zf.open(membro) as f:
+            yield f
+    else:
+        yield fonte
+
+
+def _conta_de_despesa(contas: pd.Series) -> np.ndarray:
+    # Grupo 4 (despesas), testado uma vez por conta distinta; conta nula não entra
+    codigos, unicos = pd.factorize(contas)
+    despesa = np.append(pd.Index(unicos).astype(str).str.startswith('4'), False)
+    return despesa[codigos]
+
+
+def _ano_e_trimestre(datas: pd.Series) -> tuple[np.ndarray, pd.Categorical]:
+    # A coluna DATA tem poucos valores distintos por arquivo: cada data
+    # distinta é convertida uma vez e o trimestre sai de aritmética no mês
+    # (Mês 1-3=1T, 4-6=2T, etc.), sem função Python por linha.
+    codigos, unicos = pd.factorize(datas)
+    convertidas = pd.to_datetime(pd.Series(unicos, dtype=object), errors='coerce')
+    ano_unicos = convertidas.dt.year.fillna(ANO_PADRAO).astype('int64').to_numpy()
+    mes = convertidas.dt.month.to_numpy()
+    trimestre_unicos = np.where(np.isnan(mes), len(TRIMESTRES) - 1, (np.nan_to_num(mes) - 1) // 3).astype('int64')
+
+    # Data nula (código -1) recebe o ano padrão e 'N/D'
+    ano_unicos = np.append(ano_unicos, ANO_PADRAO)
+    trimestre_unicos = np.append(trimestre_unicos, len(TRIMESTRES) - 1)
+    return ano_unicos[codigos], pd.Categorical.from_codes(trimestre_unicos[codigos], TRIMESTRES)
+
+
+def preparar_lancamentos(df: pd.DataFrame, nome_arquivo: str) -> pd.DataFrame:
+    # Uma única passada: a máscara de despesas (grupo 4, valor não zerado) é
+    # calculada nas colunas originais e só as linhas aprovadas são copiadas.
+    # Lançamentos zerados são descartados e o valor é usado em absoluto, em
+    # centavos inteiros: a soma em int64 é exata e não depende da ordem em que
+    # blocos, arquivos e workers são mesclados (aplicar_cadop volta para reais).
+    valores = pd.to_numeric(df['VL_SALDO_FINAL'], errors='coerce')
+    mascara = _conta_de_despesa(df['CD_CONTA_CONTABIL']) & (valores.notna() & (valores != 0)).to_numpy()
+
+    if 'DATA' in df.columns:
+        ano, trimestre = _ano_e_trimestre(df['DATA'][mascara])
+    else:
+        # Se não tiver coluna DATA, tenta fallback pelo nome (mas DATA é o padrão)
+        print(f"Aviso: Arquivo {nome_arquivo} sem coluna DATA.")
+        ano = ANO_PADRAO
+        trimestre = pd.Categorical.from_codes(np.full(int(mascara.sum()), len(TRIMESTRES) - 1), TRIMESTRES)
+
+    return pd.DataFrame({
+        'REG_ANS': df['REG_ANS'][mascara],
+        'Trimestre': trimestre,
+        'Ano': ano,
+        'ValorDespesas': (valores[mascara].abs() * 100).round().astype('int64'),
+    }, index=df.index[mascara])
+
+
+def agrupar_despesas(df: pd.DataFrame, chaves: list = CHAVES_REGISTRO) -> pd.DataFrame:
+    # observed=True: com REG_ANS categórico, só as combinações presentes.
+    # As chaves voltam como texto para que as parciais de arquivos diferentes
+    # (categorias diferentes) se concatenem sem conversões.
+    agrupado = df.groupby(chaves, observed=True)['ValorDespesas'].sum().reset_index()
+    for col in chaves:
+        if isinstance(agrupado[col].dtype, pd.CategoricalDtype):
+            agrupado[col] = agrupado[col].astype(object)
+    return agrupado
+
+
+def aplicar_cadop(df_registro: pd.DataFrame | None, cadop_registro: pd.DataFrame | None) -> pd.DataFrame | None:
+    # Troca o registro ANS pelo nome e CNPJ do CADOP e reagrupa pelas chaves
+    # finais: registros diferentes podem apontar para o mesmo CNPJ/nome.
+    if df_registro is None:
+        return None
+    with etapa('aplicar_cadop') as medicao:
+        df = df_registro.copy()
+        if cadop_registro is None:
+            cadop_registro = pd.DataFrame(columns=['RazaoSocial', 'CNPJ'], dtype=object)
+        # Se não achou o nome (NaN), preenche com "Operadora + ID" (só nas linhas sem cadastro)
+        df['RazaoSocial'] = df['REG_ANS'].map(cadop_registro['RazaoSocial']).astype(object)
+        sem_nome = df['RazaoSocial'].isna()
+        df.loc[sem_nome, 'RazaoSocial'] = 'Operadora ' + df.loc[sem_nome, 'REG_ANS']
+        # Se não achou o CNPJ (NaN), usa o próprio ID da ANS provisoriamente
+        df['CNPJ'] = df['REG_ANS'].map(cadop_registro['CNPJ']).fillna(df['REG_ANS'])
+        agrupado = agrupar_despesas(df, CHAVES_GRUPO)
+        agrupado['ValorDespesas'] = agrupado['ValorDespesas'] / 100
+        medicao.leu(linhas=len(df_registro))
+        medicao.escreveu(linhas=len(agrupado))
+    return agrupado
+
+
+def _ler_csv_contabil(arquivo, chunksize: int | None = None):
+    return pd.read_csv(
+        arquivo,
+        sep=';',
+        encoding='latin1',
+        thousands='.',
+        usecols=lambda coluna: coluna in COLUNAS_LIDAS,
+        dtype=TIPOS_LIDOS,
+        chunksize=chunksize
+    )
+
+
+def ler_arquivo_contabil(fonte) -> pd.DataFrame:
+    with etapa('read_csv', fonte=nome_fonte(fonte)) as medicao, abrir_fonte(fonte) as arquivo:
+        df = _ler_csv_contabil(arquivo)
+        medicao.leu(linhas=len(df), bytes_=tamanho_fonte(fonte))
+        return df
+
+
+def ler_blocos_contabeis(fonte, tamanho_chunk: int):
+    with abrir_fonte(fonte) as arquivo, _ler_csv_contabil(arquivo, chunksize=tamanho_chunk) as leitor:
+        yield from leitor
+
+
+def somar_em_memoria(arquivos_contabeis: list) -> pd.DataFrame | None:
+    # Lê cada arquivo inteiro, já filtrado, e concatena tudo antes de agrupar
     lista_dfs = []
 
     for arquivo in arquivos_contabeis:
         try:
-            df = pd.read_csv(
-                arquivo,
-                sep=';',
-                encoding='latin1',
-                thousands='.',
-                dtype={'REG_ANS': str}
-
-            )
-
-            df['CD_CONTA_CONTABIL'] = df['CD_CONTA_CONTABIL'].astype(str)
-            df = df[df['CD_CONTA_CONTABIL'].str.startswith('4')]
-
-            df['RazaoSocial'] = df['REG_ANS'].map(mapa_nomes)
-            df['CNPJ'] = df['REG_ANS'].map(mapa_cnpjs)
-
-            # Se não achou o nome (NaN), preenche com "Operadora + ID"
-            df['RazaoSocial'] = df['RazaoSocial'].fillna('Operadora ' + df['REG_ANS'])
-            # Se não achou o CNPJ (NaN), usa o próprio ID da ANS provisoriamente
-            df['CNPJ'] = df['CNPJ'].fillna(df['REG_ANS'])
-
-            # Renomeia apenas a coluna de Valor
-            df = df.rename(columns={'VL_SALDO_FINAL': 'ValorDespesas'})
-            # Extrai Ano e Trimestre do nome do arquivo
-            if 'DATA' in df.columns:
-                # Converte para data
-                df['DATA'] = pd.to_datetime(df['DATA'], errors='coerce')
-                
-                # Extrai o Ano
-                df['Ano'] = df['DATA'].dt.year
-                
-                # Calcula o Trimestre baseado no mês (Mês 1-3=1T, 4-6=2T, etc.)
-                df['Trimestre'] = df['DATA'].dt.month.apply(lambda x: f"{(int(x)-1)//3 + 1}T" if pd.notnull(x) else "N/D")
-            else:
-                # Se não tiver coluna DATA, tenta fallback pelo nome (mas DATA é o padrão)
-                print(f"Aviso: Arquivo {os.path.basename(arquivo)} sem coluna DATA.")
-                df['Ano'] = 2025
-                df['Trimestre'] = 'N/D'
+            df = ler_arquivo_contabil(arquivo)
+            lista_dfs.append(preparar_lancamentos(df, nome_fonte(arquivo)))
+        except Exception as e:
+            print(f'Erro em {nome_fonte(arquivo)}: {e}')
 
-            # Preenche Ano nulo com 2025 (segurança)
-            df['Ano'] = df['Ano'].fillna(2025).astype(int)
+    if not lista_dfs:
+        return None
 
-            # Seleciona colunas
-            colunas = ['CNPJ', 'RazaoSocial', 'Trimestre', 'Ano', 'ValorDespesas']
-            for col in colunas:
-                if col not in df.columns: df[col] = 0
+    print('Consolidando dados...')
+    # Concatena todos os DataFrames em um único DataFrame
+    with etapa('concat') as medicao:
+        # Categorias de REG_ANS em comum, para o concat não cair para texto
+        categorias = sorted(set().union(*(d['REG_ANS'].cat.categories for d in lista_dfs)))
+        for d in lista_dfs:
+            d['REG_ANS'] = d['REG_ANS'].cat.set_categories(categorias)
+        df_final = pd.concat(lista_dfs, ignore_index=True)
+        medicao.escreveu(linhas=len(df_final))
 
-            lista_dfs.append(df[colunas])
+    # AGORA SIM fazemos o GroupBy no DataFrame final
+    print('📊 Agrupando valores...')
+    with etapa('groupby') as medicao:
+        agrupado = agrupar_despesas(df_final)
+        medicao.leu(linhas=len(df_final))
+        medicao.escreveu(linhas=len(agrupado))
+    return agrupado
 
-        except Exception as e:
-            print(f'Erro em {os.path.basename(arquivo)}: {e}')
-    # Concatenar e salvar o CSV final
-    if lista_dfs:
-        print('Consolidando dados...')
-        
-        # Concatena todos os DataFrames em um único DataFrame
-        df_final = pd.concat(lista_dfs, ignore_index=True)
 
-        # Tratamento numérico
-        df_final['ValorDespesas'] = pd.to_numeric(df_final['ValorDespesas'], errors='coerce').fillna(0)
-        df_final = df_final[df_final['ValorDespesas'] != 0]
-        df_final['ValorDespesas'] = df_final['ValorDespesas'].abs()
+def agregar_arquivo(arquivo, tamanho_chunk: int | None = None) -> pd.DataFrame | None:
+    # Gera a soma parcial de um único arquivo. Com tamanho_chunk, o arquivo é
+    # lido em blocos e cada bloco é somado à tabela parcial por
+    # (REG_ANS, Trimestre, Ano), sem manter as linhas brutas.
+    nome_arquivo = nome_fonte(arquivo)
+    try:
+        with etapa('agregar_arquivo', fonte=nome_arquivo) as medicao:
+            if tamanho_chunk is None:
+                df = ler_arquivo_contabil(arquivo)
+                medicao.leu(linhas=len(df), bytes_=tamanho_fonte(arquivo))
+                with etapa('groupby'):
+                    acumulado = agrupar_despesas(preparar_lancamentos(df, nome_arquivo))
+                medicao.escreveu(linhas=len(acumulado))
+                return acumulado
+
+            acumulado = None
+            for chunk in ler_blocos_contabeis(arquivo, tamanho_chunk):
+                medicao.leu(linhas=len(chunk))
+                parcial = agrupar_despesas(preparar_lancamentos(chunk, nome_arquivo))
+                if acumulado is None:
+                    acumulado = parcial
+                else:
+                    acumulado = agrupar_despesas(pd.concat([acumulado, parcial], ignore_index=True))
+            medicao.leu(bytes_=tamanho_fonte(arquivo))
+            medicao.escreveu(linhas=len(acumulado) if acumulado is not None else 0)
+            return acumulado
+    except Exception as e:
+        print(f'Erro em {nome_arquivo}: {e}')
+        return None
+
+
+def mesclar_parciais(parciais: list) -> pd.DataFrame | None:
+    # GroupBy final sobre as somas parciais de cada arquivo/worker
+    parciais = [p for p in parciais if p is not None]
+    if not parciais:
+        return None
+    with etapa('mesclar_parciais') as medicao:
+        medicao.leu(linhas=sum(len(p) for p in parciais))
+        mesclado = agrupar_despesas(pd.concat(parciais, ignore_index=True))
+        medicao.escreveu(linhas=len(mesclado))
+    return mesclado
+
+
+def somar_em_streaming(arquivos_contabeis: list, tamanho_chunk: int = TAMANHO_CHUNK) -> pd.DataFrame | None:
+    # O pico de memória passa a depender da quantidade de operadoras,
+    # e não do total de linhas brutas.
+    acumulado = None
+
+    for arquivo in arquivos_contabeis:
+        parcial = agregar_arquivo(arquivo, tamanho_chunk)
+        acumulado = mesclar_parciais([acumulado, parcial])
+
+    return acumulado
+
+
+def somar_em_paralelo(arquivos_contabeis: list, workers: int | None = None,
+                      tamanho_chunk: int | None = None) -> pd.DataFrame | None:
+    # Cada arquivo é lido, filtrado e agrupado num processo do pool.
+    # As parciais voltam na ordem dos arquivos e o GroupBy final as mescla.
+    # As somas são em centavos inteiros (preparar_lancamentos), então o
+    # resultado não depende da ordem de mescla (mesmo CSV do caminho serial).
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parciais = list(executor.map(
+            agregar_arquivo,
+            arquivos_contabeis,
+            [tamanho_chunk] * len(arquivos_contabeis)
+        ))
+
+    return mesclar_parciais(parciais)
+
+
+def somar_incremental(arquivos_contabeis: list, tamanho_chunk: int | None = None) -> pd.DataFrame | None:
+    # Reaproveita a soma parcial de cada fonte cujo conteúdo (SHA-256) não
+    # mudou desde a última execução; só fontes novas ou alteradas são lidas
+    # de novo. As parciais não dependem do CADOP, aplicado depois da mescla.
+    estado = estado_incremental.carregar_estado('transformacao')
+    fontes_estado = {}
+    parciais = []
+    reprocessadas = 0
+
+    for arquivo in arquivos_contabeis:
+        nome = nome_fonte(arquivo)
+        chave = estado_incremental.chave_parcial(
+            estado_incremental.VERSAO_TRANSFORMACAO, estado_incremental.hash_fonte(arquivo)
+        )
+        parcial = estado_incremental.carregar_parcial(chave) if estado.get('fontes', {}).get(nome) == chave else None
+
+        if parcial is None:
+            reprocessadas += 1
+            parcial = agregar_arquivo(arquivo, tamanho_chunk)
+            if parcial is None:
+                continue
+            estado_incremental.salvar_parcial(chave, parcial)
+
+        fontes_estado[nome] = chave
+        parciais.append(parcial)
+
+    print(f'Incremental: {reprocessadas} de {len(arquivos_contabeis)} fontes reprocessadas.')
+    estado_incremental.salvar_estado('transformacao', {'fontes': fontes_estado})
+    estado_incremental.limpar_parciais(set(fontes_estado.values()))
+
+    return mesclar_parciais(parciais)
+
+
+# Consolidado final (CNPJ, RazaoSocial, Trimestre, Ano) com o CADOP já carregado
+
+def consolidar_em_memoria(arquivos_contabeis: list,
+                          cadop_registro: pd.DataFrame | None = None) -> pd.DataFrame | None:
+    return aplicar_cadop(somar_em_memoria(arquivos_contabeis), cadop_registro)
 
-        # AGORA SIM fazemos o GroupBy no DataFrame final
-        print('📊 Agrupando valores...')
-        df_final = df_final.groupby(['CNPJ', 'RazaoSocial', 'Trimestre', 'Ano'])['ValorDespesas'].sum().reset_index()
 
-        # Salva CSV temporário
-        csv_path = os.path.join(PASTA_PROCESSED, 'consolidado.csv')
+def consolidar_em_streaming(arquivos_contabeis: list, cadop_registro: pd.DataFrame | None = None,
+                            tamanho_chunk: int = TAMANHO_CHUNK) -> pd.DataFrame | None:
+    return aplicar_cadop(somar_em_streaming(arquivos_contabeis, tamanho_chunk), cadop_registro)
+
+
+def consolidar_em_paralelo(arquivos_contabeis: list, cadop_registro: pd.DataFrame | None = None,
+                           workers: int | None = None, tamanho_chunk: int | None = None) -> pd.DataFrame | None:
+    return aplicar_cadop(somar_em_paralelo(arquivos_contabeis, workers, tamanho_chunk), cadop_registro)
+
+
+def consolidar_incremental(arquivos_contabeis: list, cadop_registro: pd.DataFrame | None = None,
+                           tamanho_chunk: int | None = None) -> pd.DataFrame | None:
+    return aplicar_cadop(somar_incremental(arquivos_contabeis, tamanho_chunk), cadop_registro)
+
+
+def salvar_consolidado(df_final: pd.DataFrame, formato: str = intermediario.FORMATO_CSV) -> None:
+    csv_path = os.path.join(PASTA_PROCESSED, 'consolidado.csv')
+
+    # No formato colunar o consolidado segue tipado para o enriquecimento,
+    # que gera o CSV final; aqui não há CSV nem ZIP intermediários.
+    if formato != intermediario.FORMATO_CSV:
+        with etapa(f'to_{formato}') as medicao:
+            caminho = intermediario.salvar_colunar(df_final, csv_path, formato)
+            medicao.escreveu(linhas=len(df_final), caminho=caminho)
+        print(f'Sucesso! Consolidado {formato} gerado em: {caminho}')
+        return
+
+    # Salva CSV temporário
+    with etapa('to_csv') as medicao:
         df_final.to_csv(csv_path, index=False, sep=';', encoding='utf-8', float_format='%.2f')
+        medicao.escreveu(linhas=len(df_final), caminho=csv_path)
 
-        # Cria ZIP
-        print(f'Compactando para {ARQUIVO_ZIP_FINAL}...')
+    # Cria ZIP
+    print(f'Compactando para {ARQUIVO_ZIP_FINAL}...')
+    with etapa('zip') as medicao:
         with zipfile.ZipFile(ARQUIVO_ZIP_FINAL, 'w', zipfile.ZIP_DEFLATED) as zf:
             zf.write(csv_path, arcname='consolidado_despesas.csv')
-        
-        print(f'Sucesso! Arquivo gerado em: {ARQUIVO_ZIP_FINAL}')
+        medicao.leu(caminho=csv_path)
+        medicao.escreveu(caminho=ARQUIVO_ZIP_FINAL)
+    
+    print(f'Sucesso! Arquivo gerado em: {ARQUIVO_ZIP_FINAL}')
+
+
+def transformar_dados(streaming: bool = False, tamanho_chunk: int = TAMANHO_CHUNK,
+                      workers: int = 1, incremental: bool = False,
+                      formato: str = intermediario.FORMATO_CSV) -> pd.DataFrame | None:
+    with etapa('transformacao', streaming=streaming, workers=workers, incremental=incremental,
+               formato=formato) as medicao:
+        if not  os.path.exists(PASTA_PROCESSED):
+            os.makedirs(PASTA_PROCESSED)
+
+        # O CADOP é lido numa thread enquanto os arquivos trimestrais são
+        # somados por registro; o cadastro só é necessário no fim.
+        with ThreadPoolExecutor(max_workers=1) as executor_cadop:
+            futuro_cadop = executor_cadop.submit(carregar_cadop)
+
+            arquivos_contabeis = listar_arquivos_contabeis()
+
+            if not arquivos_contabeis:
+                print('Nenhum arquivo contábil encontrado para transformação.')
+                return None
+
+            print(f'Processando {len(arquivos_contabeis)} arquivos contábeis...')
+
+            if incremental:
+                df_registro = somar_incremental(arquivos_contabeis, tamanho_chunk if streaming else None)
+            elif workers != 1:
+                print(f'Modo paralelo: {workers or os.cpu_count()} processos.')
+                df_registro = somar_em_paralelo(arquivos_contabeis, workers or None,
+                                                tamanho_chunk if streaming else None)
+            elif streaming:
+                print(f'Modo streaming: blocos de {tamanho_chunk} linhas.')
+                df_registro = somar_em_streaming(arquivos_contabeis, tamanho_chunk)
+            else:
+                df_registro = somar_em_memoria(arquivos_contabeis)
+
+            cadop_registro = futuro_cadop.result()
+
+        df_final = aplicar_cadop(df_registro, cadop_registro)
+
+        # Concatenar e salvar o CSV final
+        if df_final is not None:
+            salvar_consolidado(df_final, intermediario.resolver_formato(formato))
+            medicao.escreveu(linhas=len(df_final))
+
+    return df_final
         
 
 if __name__ == '__main__':
-    transformar_dados()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Consolida as demonstrações contábeis da ANS.')
+    parser.add_argument('--streaming', action='store_true', help='Lê os arquivos em blocos (menor uso de memória).')
+    parser.add_argument('--chunk', type=int, default=TAMANHO_CHUNK, help='Linhas por bloco no modo streaming.')
+    parser.add_argument('--workers', type=int, default=1, help='Processos em paralelo (0 = todos os núcleos).')
+    parser.add_argument('--incremental', action='store_true', help='Reprocessa apenas fontes novas ou alteradas.')
+    parser.add_argument('--formato', choices=intermediario.FORMATOS, default=intermediario.FORMATO_CSV,
+                        help='Formato do consolidado entregue ao enriquecimento.')
+    args = parser.parse_args()
+
+    transformar_dados(streaming=args.streaming, tamanho_chunk=args.chunk, workers=args.workers,
+                      incremental=args.incremental, formato=args.formato)
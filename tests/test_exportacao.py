@@ -0,0 +1,70 @@
+"""
+Memória da exportação em streaming (/api/exportacao/despesas): o pico de RSS
+do servidor acima do repouso não pode crescer com o tamanho da exportação.
+
+Reaproveita o bench_exportacao: SQLite sintético, API num processo separado
+e RSS amostrado durante o download. Compara a fatia do último ano com o
+período inteiro (4x mais linhas); uma exportação que acumulasse as linhas
+em memória passaria da tolerância já no tamanho padrão.
+
+    python -m pytest tests/test_exportacao.py
+    EXPORTACAO_TESTE_LINHAS=2000000 python -m pytest tests/test_exportacao.py
+"""
+import importlib.util
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+import bench_exportacao as bench  # noqa: E402
+
+LINHAS = int(os.environ.get('EXPORTACAO_TESTE_LINHAS', 400_000))
+ANOS = 4
+BLOCO = 10_000
+TOLERANCIA_MIB = 25.0
+FATIAS = {'último ano': {'ano_inicial': bench.ANO_FINAL}, 'tudo': {}}
+
+
+@pytest.fixture(scope='module')
+def api(tmp_path_factory):
+    pasta = tmp_path_factory.mktemp('exportacao')
+    caminho_banco = str(pasta / 'exportacao.db')
+    bench.popular(caminho_banco, LINHAS, ANOS)
+    banco = sqlite3.connect(caminho_banco)
+    esperado = {
+        nome: banco.execute('SELECT COUNT(*) FROM despesas_detalhadas WHERE ano >= ?',
+                            (filtro.get('ano_inicial', 0),)).fetchone()[0]
+        for nome, filtro in FATIAS.items()
+    }
+    banco.close()
+
+    processo, base = bench.subir_api(caminho_banco, BLOCO)
+    try:
+        yield processo, f'{base}/api/exportacao/despesas', str(pasta), esperado
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+@pytest.mark.parametrize('formato', ['csv', 'gzip', 'parquet'])
+def test_memoria_nao_cresce_com_a_exportacao(api, formato):
+    if formato == 'parquet' and importlib.util.find_spec('pyarrow') is None:
+        pytest.skip('pyarrow não instalado')
+    processo, url, pasta, esperado = api
+
+    # Aquecimento: imports (pyarrow) e primeira conexão antes de medir o repouso
+    bench.baixar(url, {'formato': formato, 'registro_ans': '300000'}, formato, processo.pid, pasta)
+    repouso = bench.rss_mb(processo.pid)
+
+    picos = {}
+    for nome, filtro in FATIAS.items():
+        r = bench.baixar(url, {'formato': formato, **filtro}, formato, processo.pid, pasta)
+        assert r['linhas'] == esperado[nome], f'{nome}: {r["linhas"]} linhas, esperado {esperado[nome]}'
+        picos[nome] = r['pico_mb'] - repouso
+
+    crescimento = picos['tudo'] - picos['último ano']
+    assert crescimento <= TOLERANCIA_MIB, (
+        f'pico cresceu {crescimento:.1f} MiB de {esperado["último ano"]:,} para {esperado["tudo"]:,} linhas'
+    )